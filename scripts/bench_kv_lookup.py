@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Benchmark for batched kv_store lookups
+
+Seeds a synthetic entity graph of N keys, each with --fanout related edges,
+into a scratch copy of kv_store (schema rem_bench), and compares one LOOKUP
+query per key against rem_kv_get_many() from
+migrations/009_kv_store_lookup_many.sql:
+
+- lookup: resolve K random keys (K from --keys), per key vs one batched call
+- traverse: breadth-first traversal from one key for 1..--hops hops, one
+  query per visited key vs one batched call per hop
+
+Latencies are medians over --repeat runs and include the client round-trip,
+which is what batching saves; run it from where the agents run to see
+realistic numbers. Both traversals must visit the same keys. The functions
+resolve kv_store through search_path, so the scratch table is used, and the
+schema is dropped at the end.
+
+Usage:
+    python scripts/bench_kv_lookup.py
+    python scripts/bench_kv_lookup.py --nodes 100000 --fanout 12 --hops 3
+
+Requires psycopg 3:
+    pip install "psycopg[binary]"
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+try:
+    import psycopg
+except ImportError:
+    psycopg = None
+
+TENANT_ID = 'bench'
+
+SEED_SQL = """
+INSERT INTO rem_bench.kv_store (entity_key, entity_type, entity_id, tenant_id, graph_edges)
+SELECT
+    'node-' || g,
+    'resources',
+    gen_random_uuid(),
+    %(tenant_id)s,
+    (SELECT jsonb_agg(jsonb_build_object(
+                'dst', 'node-' || (1 + (g * 7919 + j * 104729) %% %(nodes)s),
+                'rel_type', 'related', 'weight', 1.0, 'properties', '{}'::jsonb))
+     FROM generate_series(1, %(fanout)s) AS j
+     WHERE g > 0)
+FROM generate_series(1, %(nodes)s) AS g
+"""
+
+LOOKUP_SQL = """
+SELECT entity_type, entity_id, graph_edges FROM kv_store
+WHERE tenant_id = %s AND entity_key = %s
+"""
+
+GET_MANY_SQL = """
+SELECT entity_key, found, entity_type, entity_id, graph_edges
+FROM rem_kv_get_many(%s, %s)
+"""
+
+
+def edge_keys(graph_edges) -> list[str]:
+    return [edge['dst'] for edge in graph_edges or []]
+
+
+def lookup_per_key(conn, keys: list[str]) -> list:
+    """One round-trip per key; None for misses."""
+    rows = []
+    for key in keys:
+        rows.append(conn.execute(LOOKUP_SQL, (TENANT_ID, key)).fetchone())
+    return rows
+
+
+def lookup_batched(conn, keys: list[str]) -> list:
+    """One round-trip for all keys; rows in input order, found = false for misses."""
+    return conn.execute(GET_MANY_SQL, (TENANT_ID, keys)).fetchall()
+
+
+def traverse_per_key(conn, start: str, hops: int) -> tuple[set[str], int]:
+    """Breadth-first traversal resolving each key with its own query."""
+    visited = {start}
+    frontier = [start]
+    queries = 0
+    for _ in range(hops):
+        next_frontier = []
+        for key in frontier:
+            row = conn.execute(LOOKUP_SQL, (TENANT_ID, key)).fetchone()
+            queries += 1
+            if row is None:
+                continue
+            for dst in edge_keys(row[2]):
+                if dst not in visited:
+                    visited.add(dst)
+                    next_frontier.append(dst)
+        frontier = next_frontier
+    return visited, queries
+
+
+def traverse_batched(conn, start: str, hops: int) -> tuple[set[str], int]:
+    """Breadth-first traversal resolving each hop's frontier in one query."""
+    visited = {start}
+    frontier = [start]
+    queries = 0
+    for _ in range(hops):
+        if not frontier:
+            break
+        rows = conn.execute(GET_MANY_SQL, (TENANT_ID, frontier)).fetchall()
+        queries += 1
+        next_frontier = []
+        for _key, found, _type, _id, graph_edges in rows:
+            if not found:
+                continue
+            for dst in edge_keys(graph_edges):
+                if dst not in visited:
+                    visited.add(dst)
+                    next_frontier.append(dst)
+        frontier = next_frontier
+    return visited, queries
+
+
+def median_ms(fn, repeat: int) -> tuple[float, object]:
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark batched kv_store lookups')
+    parser.add_argument('--database-url', default=os.environ.get('POSTGRES__CONNECTION_STRING'),
+                        help='Postgres connection string (default: $POSTGRES__CONNECTION_STRING)')
+    parser.add_argument('--nodes', type=int, default=20000, help='Number of kv_store keys (default: 20000)')
+    parser.add_argument('--fanout', type=int, default=8, help='Edges per key (default: 8)')
+    parser.add_argument('--keys', default='1,10,50,100,500,1000',
+                        help='Comma-separated key counts for the lookup test (default: 1,10,50,100,500,1000)')
+    parser.add_argument('--hops', type=int, default=3, help='Maximum traversal depth (default: 3)')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement (default: 5)')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    if psycopg is None:
+        print("Error: psycopg is required: pip install 'psycopg[binary]'")
+        sys.exit(1)
+
+    if not args.database_url:
+        print("Error: --database-url or POSTGRES__CONNECTION_STRING is required")
+        sys.exit(1)
+
+    key_counts = [int(k) for k in args.keys.split(',')]
+    rng = random.Random(args.seed)
+
+    with psycopg.connect(args.database_url, autocommit=True) as conn:
+        conn.execute("DROP SCHEMA IF EXISTS rem_bench CASCADE")
+        conn.execute("CREATE SCHEMA rem_bench")
+        try:
+            conn.execute("CREATE TABLE rem_bench.kv_store (LIKE public.kv_store INCLUDING ALL)")
+            conn.execute(SEED_SQL, {'tenant_id': TENANT_ID, 'nodes': args.nodes, 'fanout': args.fanout})
+            conn.execute("ANALYZE rem_bench.kv_store")
+            conn.execute("SET search_path = rem_bench, public")
+
+            print(f"Synthetic graph: {args.nodes} keys, {args.fanout} edges per key")
+
+            print(f"\n{'keys':>6} {'per-key ms':>12} {'batched ms':>12} {'speedup':>9}")
+            for count in key_counts:
+                # Every tenth key misses, as stale edges would
+                keys = [
+                    f"missing-{i}" if i % 10 == 9 else f"node-{rng.randint(1, args.nodes)}"
+                    for i in range(count)
+                ]
+                per_key_ms, per_key_rows = median_ms(lambda: lookup_per_key(conn, keys), args.repeat)
+                batched_ms, batched_rows = median_ms(lambda: lookup_batched(conn, keys), args.repeat)
+                if [row is not None for row in per_key_rows] != [row[1] for row in batched_rows]:
+                    print(f"Error: per-key and batched lookups disagree for {count} keys")
+                    sys.exit(1)
+                print(f"{count:>6} {per_key_ms:>12.2f} {batched_ms:>12.2f} {per_key_ms / batched_ms:>8.1f}x")
+
+            start_key = f"node-{rng.randint(1, args.nodes)}"
+            print(f"\nTraverse from {start_key}")
+            print(f"{'hops':>6} {'keys':>7} {'per-key queries':>16} {'ms':>9} "
+                  f"{'batched queries':>16} {'ms':>9} {'speedup':>9}")
+            for hops in range(1, args.hops + 1):
+                per_key_ms, (per_key_keys, per_key_queries) = median_ms(
+                    lambda: traverse_per_key(conn, start_key, hops), args.repeat)
+                batched_ms, (batched_keys, batched_queries) = median_ms(
+                    lambda: traverse_batched(conn, start_key, hops), args.repeat)
+                if per_key_keys != batched_keys:
+                    print(f"Error: per-key and batched traversals disagree at {hops} hops")
+                    sys.exit(1)
+                print(f"{hops:>6} {len(batched_keys):>7} {per_key_queries:>16} {per_key_ms:>9.2f} "
+                      f"{batched_queries:>16} {batched_ms:>9.2f} {per_key_ms / batched_ms:>8.1f}x")
+        finally:
+            conn.execute("RESET search_path")
+            conn.execute("DROP SCHEMA rem_bench CASCADE")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark for wiki cross-reference and link resolution
+
+Builds a synthetic wiki of N module pages, each mentioning a handful of other
+modules, and compares the indexed single-pass resolver in generate_wiki_v2.py
+against the original per-match scan over all pages.
+
+The scan is O(matches x pages), so it is only timed on a sample of pages and
+extrapolated to the full wiki. The sample is also used to check that both
+implementations produce the same links and related lists.
+
+Usage:
+    python scripts/bench_wiki_links.py
+    python scripts/bench_wiki_links.py --pages 10000 --refs 20 --sample 100
+"""
+
+import argparse
+import random
+import re
+import time
+
+from generate_wiki_v2 import WikiPage, build_link_index, link_page_content
+
+
+def scan_cross_references(content: str, all_pages: list[WikiPage]) -> list[str]:
+    """Original implementation: scan all pages for every module reference."""
+    related = []
+    for match in re.finditer(r'Module\s+(\d+)', content, re.IGNORECASE):
+        module_num = int(match.group(1))
+        for page in all_pages:
+            if f'Module {module_num}' in page.title:
+                if page.entity_key not in related:
+                    related.append(page.entity_key)
+                break
+    return related
+
+
+def scan_wiki_links(content: str, all_pages: list[WikiPage], current_page: WikiPage) -> str:
+    """Original implementation: scan all pages for every module reference."""
+
+    def replace_module_ref(match):
+        module_num = match.group(1)
+        for page in all_pages:
+            if f'Module {module_num}' in page.title and page.entity_key != current_page.entity_key:
+                return f"[[{page.entity_key}|Module {module_num}]]"
+        return match.group(0)
+
+    return re.sub(r'Module\s+(\d+)', replace_module_ref, content)
+
+
+def build_synthetic_wiki(num_pages: int, refs_per_page: int, seed: int) -> list[WikiPage]:
+    """Create module pages whose content references random other modules."""
+    rng = random.Random(seed)
+    pages = []
+    for n in range(1, num_pages + 1):
+        sentences = [
+            f"As covered in Module {rng.randint(1, num_pages)}, this technique builds on earlier work."
+            for _ in range(refs_per_page)
+        ]
+        pages.append(WikiPage(
+            entity_key=f"synthetic-module-{n}",
+            title=f"Module {n}: Synthetic Topic {n}",
+            content=' '.join(sentences),
+            page_start=n,
+            page_end=n,
+            tags=['module'],
+        ))
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark wiki link resolution')
+    parser.add_argument('--pages', type=int, default=10000, help='Number of wiki pages (default: 10000)')
+    parser.add_argument('--refs', type=int, default=20, help='Module references per page (default: 20)')
+    parser.add_argument('--sample', type=int, default=100,
+                        help='Pages to time with the original scan (default: 100)')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    pages = build_synthetic_wiki(args.pages, args.refs, args.seed)
+    # Spread the sample across the wiki so it is not biased towards early pages
+    sample = pages[::max(1, len(pages) // args.sample)][:args.sample]
+
+    print(f"Synthetic wiki: {len(pages)} pages, {args.refs} module references per page")
+
+    start = time.perf_counter()
+    index = build_link_index(pages)
+    linked = [link_page_content(page.content, index, page) for page in pages]
+    indexed_total = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scanned = [
+        (scan_wiki_links(page.content, pages, page), scan_cross_references(page.content, pages))
+        for page in sample
+    ]
+    scan_sample = time.perf_counter() - start
+    scan_total = scan_sample / len(sample) * len(pages)
+
+    by_key = {page.entity_key: result for page, result in zip(pages, linked)}
+    mismatches = 0
+    for page, (content, related) in zip(sample, scanned):
+        new_content, new_related = by_key[page.entity_key]
+        if new_content != content or new_related != related:
+            mismatches += 1
+
+    print(f"\nIndexed single pass:  {indexed_total * 1000:10.1f} ms total "
+          f"({indexed_total / len(pages) * 1e6:.1f} us/page)")
+    print(f"Original scan:        {scan_total * 1000:10.1f} ms total, extrapolated from "
+          f"{len(sample)} pages ({scan_sample / len(sample) * 1e6:.1f} us/page)")
+    print(f"Speedup:              {scan_total / indexed_total:10.1f}x")
+    print(f"Sample mismatches:    {mismatches}")
+
+
+if __name__ == '__main__':
+    main()
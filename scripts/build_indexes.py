@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Background index builder
+
+Builds the HNSW indexes from src/rem/sql/background_indexes.sql after an
+initial data load. The SQL file stays the single source of truth: its
+CREATE INDEX CONCURRENTLY statements give the build order (priority) and the
+per-table m / ef_construction parameters, and any SET statements in it give
+default session settings (the shipped files have none, so builds use the
+server's settings unless --maintenance-work-mem / --parallel-workers are
+given).
+
+On top of running the file with psql, this script:
+- builds up to --concurrency indexes at once, each on its own connection,
+  starting them in file order
+- reports progress from pg_stat_progress_create_index every --interval
+  seconds (phase, tuples and blocks done per running build)
+- finds INVALID indexes left behind by interrupted concurrent builds, drops
+  them concurrently and builds them again (CREATE INDEX ... IF NOT EXISTS
+  would otherwise silently keep the broken index)
+
+Each concurrent build uses its own maintenance_work_mem, so budget
+concurrency x maintenance_work_mem of memory. Parallel builds
+(--parallel-workers > 0) use shared memory in /dev/shm, which Docker limits
+to 64MB unless the container is started with --shm-size.
+
+Usage:
+    python scripts/build_indexes.py
+    python scripts/build_indexes.py --concurrency 2 --maintenance-work-mem 2GB --parallel-workers 2
+    python scripts/build_indexes.py --only embeddings_resources --only embeddings_moments
+    python scripts/build_indexes.py --dry-run  # Show index states and the plan
+
+Requires psycopg 3:
+    pip install "psycopg[binary]"
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+
+try:
+    import psycopg
+    from psycopg import sql
+except ImportError:
+    psycopg = None
+
+DEFAULT_SQL_FILE = Path(__file__).resolve().parent.parent / 'src' / 'rem' / 'sql' / 'background_indexes.sql'
+
+CREATE_INDEX_PATTERN = re.compile(
+    r'CREATE\s+INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)\s+ON\s+(\w+)',
+    re.IGNORECASE,
+)
+SET_PATTERN = re.compile(r"SET\s+(\w+)\s*(?:=|TO)\s*'?([^';]+)'?", re.IGNORECASE)
+
+PROGRESS_SQL = """
+SELECT pid, phase, blocks_done, blocks_total, tuples_done, tuples_total
+FROM pg_stat_progress_create_index
+WHERE pid = ANY(%s)
+"""
+
+INDEX_STATE_SQL = """
+SELECT c.relname, i.indisvalid
+FROM pg_index i
+JOIN pg_class c ON c.oid = i.indexrelid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = current_schema()
+  AND c.relname = ANY(%s)
+"""
+
+
+@dataclass
+class IndexBuild:
+    """One CREATE INDEX statement from the background index file."""
+    name: str
+    table: str
+    statement: str
+    action: str = 'create'  # 'create', 'rebuild' (INVALID) or 'skip' (valid)
+
+
+def load_background_sql(path: Path) -> tuple[dict, list[IndexBuild]]:
+    """
+    Parse the background index file into session settings and index builds.
+
+    Returns ({setting: value}, builds in file order).
+    """
+    settings = {}
+    builds = []
+    text = '\n'.join(
+        line for line in path.read_text(encoding='utf-8').splitlines()
+        if not line.lstrip().startswith('--')
+    )
+    for statement in text.split(';'):
+        statement = statement.strip()
+        if not statement:
+            continue
+        match = CREATE_INDEX_PATTERN.match(statement)
+        if match:
+            builds.append(IndexBuild(name=match.group(1), table=match.group(2), statement=statement))
+            continue
+        match = SET_PATTERN.match(statement)
+        if match:
+            settings[match.group(1).lower()] = match.group(2).strip()
+    return settings, builds
+
+
+def plan_builds(conn, builds: list[IndexBuild]) -> list[IndexBuild]:
+    """Mark each build as create (missing), rebuild (INVALID) or skip (valid)."""
+    with conn.cursor() as cur:
+        cur.execute(INDEX_STATE_SQL, ([b.name for b in builds],))
+        valid = dict(cur.fetchall())
+    for build in builds:
+        if build.name not in valid:
+            build.action = 'create'
+        elif not valid[build.name]:
+            build.action = 'rebuild'
+        else:
+            build.action = 'skip'
+    return builds
+
+
+def run_build(database_url: str, build: IndexBuild, settings: dict, backends: dict) -> float:
+    """
+    Build one index on its own autocommit connection and return the seconds
+    taken. INVALID leftovers are dropped concurrently first. The backend pid
+    is registered in `backends` while the build runs, for progress reports.
+    """
+    with psycopg.connect(database_url, autocommit=True) as conn:
+        for name, value in settings.items():
+            conn.execute(sql.SQL('SET {} = {}').format(sql.Identifier(name), sql.Literal(value)))
+
+        backends[conn.info.backend_pid] = build.name
+        try:
+            started = time.perf_counter()
+            if build.action == 'rebuild':
+                conn.execute(sql.SQL('DROP INDEX CONCURRENTLY IF EXISTS {}').format(sql.Identifier(build.name)))
+            conn.execute(build.statement)
+            return time.perf_counter() - started
+        finally:
+            backends.pop(conn.info.backend_pid, None)
+
+
+def format_progress(name: str, phase: str, blocks_done: int, blocks_total: int,
+                    tuples_done: int, tuples_total: int) -> str:
+    """One progress line for a running build."""
+    if tuples_total:
+        detail = f" {100 * tuples_done / tuples_total:.0f}% ({tuples_done:,}/{tuples_total:,} tuples)"
+    elif blocks_total:
+        detail = f" {100 * blocks_done / blocks_total:.0f}% ({blocks_done:,}/{blocks_total:,} blocks)"
+    else:
+        detail = ''
+    return f"  {name}: {phase}{detail}"
+
+
+def report_progress(conn, backends: dict):
+    """Print pg_stat_progress_create_index for the builds started here."""
+    pids = list(backends)
+    if not pids:
+        return
+    with conn.cursor() as cur:
+        cur.execute(PROGRESS_SQL, (pids,))
+        for pid, *progress in cur.fetchall():
+            name = backends.get(pid)
+            if name:
+                print(format_progress(name, *progress), flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Build background HNSW indexes with progress reporting',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+    # Build missing or INVALID indexes one at a time, in priority order
+    python build_indexes.py
+
+    # Two builds at once, 2GB and two parallel workers each (4GB in total;
+    # parallel workers need --shm-size in Docker)
+    python build_indexes.py --concurrency 2 --maintenance-work-mem 2GB --parallel-workers 2
+
+    # Only some tables
+    python build_indexes.py --only embeddings_resources
+
+    # Show index states and what would be built
+    python build_indexes.py --dry-run
+
+    # Optional halfvec / binary-quantized indexes (pgvector 0.7+)
+    python build_indexes.py --sql-file src/rem/sql/quantized_indexes.sql
+
+    # Index for the optional unified embedding store
+    python build_indexes.py --sql-file src/rem/sql/embeddings_unified_indexes.sql
+        """
+    )
+
+    parser.add_argument('--database-url', default=os.environ.get('POSTGRES__CONNECTION_STRING'),
+                        help='Postgres connection string (default: $POSTGRES__CONNECTION_STRING)')
+    parser.add_argument('--sql-file', type=Path, default=DEFAULT_SQL_FILE,
+                        help='Background index file (default: src/rem/sql/background_indexes.sql)')
+    parser.add_argument('--concurrency', '-c', type=int, default=1,
+                        help='Number of indexes to build at once (default: 1)')
+    parser.add_argument('--maintenance-work-mem', default=None,
+                        help='maintenance_work_mem per build, e.g. 2GB (default: server setting)')
+    parser.add_argument('--parallel-workers', type=int, default=None,
+                        help='max_parallel_maintenance_workers per build (default: server setting)')
+    parser.add_argument('--only', action='append', metavar='TABLE',
+                        help='Only build indexes on this table (repeatable)')
+    parser.add_argument('--interval', type=float, default=10.0,
+                        help='Seconds between progress reports (default: 10)')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Show index states and the build plan without building')
+
+    args = parser.parse_args()
+
+    if psycopg is None:
+        print("Error: psycopg is required: pip install 'psycopg[binary]'")
+        sys.exit(1)
+
+    if not args.database_url:
+        print("Error: --database-url or POSTGRES__CONNECTION_STRING is required")
+        sys.exit(1)
+
+    if args.concurrency < 1:
+        print("Error: --concurrency must be at least 1")
+        sys.exit(1)
+
+    if not args.sql_file.exists():
+        print(f"Error: File not found: {args.sql_file}")
+        sys.exit(1)
+
+    settings, builds = load_background_sql(args.sql_file)
+    if args.maintenance_work_mem:
+        settings['maintenance_work_mem'] = args.maintenance_work_mem
+    if args.parallel_workers is not None:
+        settings['max_parallel_maintenance_workers'] = str(args.parallel_workers)
+
+    if args.only:
+        unknown = set(args.only) - {b.table for b in builds}
+        if unknown:
+            print(f"Error: No background index for: {', '.join(sorted(unknown))}")
+            sys.exit(1)
+        builds = [b for b in builds if b.table in args.only]
+
+    with psycopg.connect(args.database_url, autocommit=True) as monitor:
+        plan_builds(monitor, builds)
+
+        print(f"Settings: {', '.join(f'{k}={v}' for k, v in settings.items()) or 'server defaults'}")
+        for priority, build in enumerate(builds, 1):
+            print(f"  {priority}. {build.name} on {build.table}: {build.action}")
+
+        todo = [b for b in builds if b.action != 'skip']
+        if args.dry_run or not todo:
+            if not todo:
+                print("All background indexes are built and valid")
+            return
+
+        print(f"\nBuilding {len(todo)} indexes, {args.concurrency} at a time...")
+        backends = {}
+        failed = []
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            futures = {executor.submit(run_build, args.database_url, b, settings, backends): b for b in todo}
+            pending = set(futures)
+            last_report = time.monotonic()
+            while pending:
+                timeout = max(0.0, last_report + args.interval - time.monotonic())
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    build = futures[future]
+                    try:
+                        seconds = future.result()
+                        print(f"Built {build.name} in {seconds:.1f}s", flush=True)
+                    except psycopg.Error as e:
+                        failed.append(build.name)
+                        print(f"Failed {build.name}: {str(e).strip()}", flush=True)
+                # Report every --interval, even while other builds finish
+                if pending and time.monotonic() - last_report >= args.interval:
+                    report_progress(monitor, backends)
+                    last_report = time.monotonic()
+
+        # Interrupted or failed concurrent builds leave INVALID indexes behind
+        invalid = [b.name for b in plan_builds(monitor, todo) if b.action == 'rebuild']
+
+    print(f"\nBuilt {len(todo) - len(failed)} of {len(todo)} indexes "
+          f"in {time.perf_counter() - started:.1f}s")
+    if invalid:
+        print(f"INVALID (re-run to rebuild): {', '.join(invalid)}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+Bulk dataset loader for the datasets/ YAML format
+
+Loads files made of `{table, rows}` blocks (datasets/quickstart/sample_data.yaml,
+datasets/drugs.yaml, the domain *_engram.yaml scenarios, ...) into the REM
+entity tables with set-based statements instead of one upsert per row:
+
+1. the YAML is streamed: each `rows:` sequence is cut into batches of rows at
+   the text level and every batch is parsed with the libyaml C loader, so
+   memory stays bounded however large the file is (blocks whose rows are
+   written in flow style are parsed whole; a block without a table is an
+   error)
+2. each batch is written with COPY into a temporary staging table per entity
+   table (same column types, no indexes or triggers)
+3. at the end, every staging table is merged into its entity table with one
+   INSERT ... SELECT ... ON CONFLICT (id) DO UPDATE, so the kv_store
+   statement triggers (migrations/003_kv_store_statement_triggers.sql) fire
+   once per table on the whole set
+
+Row handling:
+- tenant_id / user_id default to --tenant-id / --user-id (tenant_id falls
+  back to the user id, then 'public')
+- rows without an id get a deterministic uuid5 of tenant, table and name,
+  the same scheme as wiki_sink.py, so re-loads update the same rows
+- fields that are not columns of the table are kept in `metadata`
+- when an id repeats, the last row wins; rows whose values are unchanged are
+  left alone; columns missing from a row get the column default
+- created_at is only set on insert; updated_at and deleted_at are managed by
+  the loader
+
+Everything is loaded in one transaction. YAML anchors and aliases that span
+rows are not supported (none of the datasets use them).
+
+Usage:
+    python scripts/bulk_load.py datasets/quickstart/sample_data.yaml
+    python scripts/bulk_load.py datasets/drugs.yaml datasets/therapy_docs.yaml --tenant-id public
+    python scripts/bulk_load.py datasets/domains/*/scenarios/*/*_engram.yaml --user-id demo
+
+Requires psycopg 3:
+    pip install "psycopg[binary]"
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator
+
+import yaml
+
+try:
+    import psycopg
+    from psycopg import sql
+    from psycopg.types.json import Jsonb
+except ImportError:
+    psycopg = None
+
+# libyaml bindings when PyYAML was built with them
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+DEFAULT_BATCH_ROWS = 2000
+MANAGED_COLUMNS = ('updated_at', 'deleted_at')
+INSERT_ONLY_COLUMNS = ('id', 'created_at')
+
+BLOCK_START = re.compile(r'- (?=\S)')
+ROWS_KEY = re.compile(r'  rows:\s*(#.*)?$')
+SEQUENCE_ITEM = re.compile(r'( *)- ')
+
+
+# ============================================================================
+# Streaming YAML reader
+# ============================================================================
+
+def parse_yaml(lines: list[str], indent: int = 0):
+    return yaml.load(''.join(line[indent:] if line.strip() else '\n' for line in lines), Loader=YAML_LOADER)
+
+
+def batches(rows: list, batch_rows: int) -> Iterator[list]:
+    for i in range(0, len(rows), batch_rows):
+        yield rows[i:i + batch_rows]
+
+
+def block_table(path: Path, block) -> str:
+    if not isinstance(block, dict) or not block.get('table'):
+        raise ValueError(f"{path}: block without a table")
+    return block['table']
+
+
+def iter_row_batches(path: Path, batch_rows: int = DEFAULT_BATCH_ROWS) -> Iterator[tuple[str, list[dict]]]:
+    """
+    Yield (table, rows) batches from a file of `- table: ...` / `rows:` blocks.
+
+    Blocks are recognised at the text level ("- " at column 0, "  rows:" as a
+    block key, one row per "- " item under it) and only the lines of one batch
+    are handed to the YAML parser at a time. A block whose rows are not a
+    block sequence (`rows: [...]`) is parsed whole, and rows that come before
+    the block's table are held until the table is known. Files that do not
+    start with a block are parsed whole. Every block must have a table.
+    """
+    with open(path) as f:
+        first = next((line for line in f if line.strip() and not line.startswith('#')), '')
+        f.seek(0)
+        if not BLOCK_START.match(first):
+            for block in yaml.load(f, Loader=YAML_LOADER) or []:
+                table = block_table(path, block)
+                for rows in batches(block.get('rows') or [], batch_rows):
+                    yield table, rows
+            return
+
+        header = []       # Block lines other than rows, re-indented to column 2
+        items = []        # Lines of the pending rows
+        item_count = 0
+        item_indent = None
+        in_block = False
+        in_rows = False
+        seen_rows = False
+        table = None
+
+        def header_block() -> dict:
+            block = parse_yaml(header, 2) or {}
+            if not isinstance(block, dict):
+                raise ValueError(f"{path}: unsupported block layout")
+            return block
+
+        def take_rows() -> list[dict]:
+            nonlocal items, item_count
+            rows = parse_yaml(items, item_indent) or []
+            items, item_count = [], 0
+            return rows
+
+        def end_block() -> Iterator[tuple[str, list[dict]]]:
+            block = header_block()
+            table = block_table(path, block)
+            if 'rows' in block:
+                if seen_rows:
+                    raise ValueError(f"{path}: {table}: more than one rows key in a block")
+                yield from ((table, rows) for rows in batches(block['rows'] or [], batch_rows))
+            if items:
+                yield from ((table, rows) for rows in batches(take_rows(), batch_rows))
+
+        for line in f:
+            if BLOCK_START.match(line):
+                if in_block:
+                    yield from end_block()
+                header, item_indent, in_block, in_rows, seen_rows, table = [], None, True, False, False, None
+                line = '  ' + line[2:]
+            elif not in_block:
+                if line.strip() and not line.startswith('#'):
+                    raise ValueError(f"{path}: unsupported layout at: {line.rstrip()}")
+                continue  # Comments and blank lines before the first block
+
+            if in_rows:
+                item = SEQUENCE_ITEM.match(line)
+                if item and item_indent is None:
+                    item_indent = len(item.group(1))
+                if item and len(item.group(1)) == item_indent:
+                    if item_count >= batch_rows:
+                        table = table or header_block().get('table')
+                        if table:  # Otherwise keep the rows until the table follows
+                            yield table, take_rows()
+                    item_count += 1
+                    items.append(line)
+                    continue
+                stripped = line.strip()
+                indent = len(line) - len(line.lstrip(' '))
+                if not stripped or stripped.startswith('#') or indent > 2:
+                    items.append(line)
+                    continue
+                in_rows = False  # Another key of the block follows the rows
+
+            if ROWS_KEY.match(line):
+                if seen_rows:
+                    raise ValueError(f"{path}: more than one rows key in a block")
+                in_rows, seen_rows, item_indent = True, True, None
+                continue
+            if not line.startswith((' ', '#')) and line.strip():
+                raise ValueError(f"{path}: unsupported layout at: {line.rstrip()}")
+            header.append(line)
+
+        if in_block:
+            yield from end_block()
+
+
+# ============================================================================
+# Staging and merge
+# ============================================================================
+
+@dataclass
+class Column:
+    name: str
+    type: str
+    default: str | None
+
+
+@dataclass
+class TableLoad:
+    """Staging state and counts for one entity table."""
+    table: str
+    columns: dict[str, Column]
+    stage: str
+    loaded: set[str] = field(default_factory=set)  # Columns present in at least one row
+    staged: int = 0
+    merged: int = 0
+    inserted: int = 0
+    updated: int = 0
+    merge_seconds: float = 0.0
+
+
+def table_columns(conn, table: str) -> dict[str, Column]:
+    """Insertable columns of a table (generated columns excluded), in table order."""
+    rows = conn.execute("""
+        SELECT a.attname, format_type(a.atttypid, a.atttypmod), pg_get_expr(d.adbin, d.adrelid)
+        FROM pg_attribute a
+        LEFT JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+        WHERE a.attrelid = to_regclass(%s) AND a.attnum > 0 AND NOT a.attisdropped AND a.attgenerated = ''
+        ORDER BY a.attnum
+    """, (table,)).fetchall()
+    return {name: Column(name, type_, default) for name, type_, default in rows}
+
+
+def start_table(conn, table: str) -> TableLoad:
+    columns = table_columns(conn, table)
+    if 'id' not in columns:
+        raise ValueError(f"Not an entity table: {table}")
+    columns = {name: column for name, column in columns.items() if name not in MANAGED_COLUMNS}
+    stage = f'bulk_load_{table}'
+    conn.execute(sql.SQL("CREATE TEMP TABLE {stage} (_seq BIGINT, {columns}) ON COMMIT DROP").format(
+        stage=sql.Identifier(stage),
+        columns=sql.SQL(', ').join(
+            sql.SQL("{} {}").format(sql.Identifier(c.name), sql.SQL(c.type)) for c in columns.values()),
+    ))
+    return TableLoad(table, columns, stage)
+
+
+def entity_id(tenant_id: str, table: str, row: dict) -> str:
+    """Deterministic id for a row without one (wiki_sink.resource_id for resources)."""
+    key = row.get('name') or json.dumps(row, sort_keys=True, default=str)
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"rem://{tenant_id}/{table}/{key}"))
+
+
+def copy_value(column: Column, value):
+    if value is None:
+        return None
+    if column.type == 'jsonb':
+        return Jsonb(value)
+    if isinstance(value, (dict, list)) and not column.type.endswith('[]'):
+        return json.dumps(value, default=str)
+    return value
+
+
+def stage_rows(conn, load: TableLoad, rows: list[dict], tenant_id: str | None, user_id: str | None):
+    """COPY a batch of dataset rows into the table's staging table."""
+    columns = list(load.columns.values())
+    with conn.cursor() as cur:
+        with cur.copy(sql.SQL("COPY {stage} ({columns}) FROM STDIN").format(
+                stage=sql.Identifier(load.stage),
+                columns=sql.SQL(', ').join(map(sql.Identifier, ['_seq'] + [c.name for c in columns])))) as copy:
+            for row in rows:
+                row = dict(row)
+                for name in MANAGED_COLUMNS:
+                    row.pop(name, None)
+                row['tenant_id'] = row.get('tenant_id') or tenant_id or user_id or 'public'
+                if user_id and not row.get('user_id'):
+                    row['user_id'] = user_id
+                row['id'] = str(row.get('id') or entity_id(row['tenant_id'], load.table, row))
+                extra = {name: row.pop(name) for name in list(row) if name not in load.columns}
+                if extra and 'metadata' in load.columns:
+                    row['metadata'] = {**extra, **(row.get('metadata') or {})}
+                load.loaded.update(row)
+                load.staged += 1
+                copy.write_row([load.staged] + [copy_value(c, row.get(c.name)) for c in columns])
+
+
+def merge_table(conn, load: TableLoad):
+    """
+    Merge the staging table into the entity table in one statement.
+
+    The last staged row per id wins; columns no row mentioned are left out of
+    the statement, and unchanged rows are not rewritten.
+    """
+    columns = [c for c in load.columns.values() if c.name in load.loaded]
+    updated = [c.name for c in columns if c.name not in INSERT_ONLY_COLUMNS]
+    target, stage = sql.Identifier(load.table), sql.Identifier(load.stage)
+
+    def value(column: Column) -> sql.Composable:
+        if column.default is None:
+            return sql.Identifier(column.name)
+        return sql.SQL("COALESCE({}, {})").format(sql.Identifier(column.name), sql.SQL(column.default))
+
+    query = sql.SQL("""
+        WITH merged AS (
+            INSERT INTO {target} AS t ({columns})
+            SELECT DISTINCT ON (id) {values} FROM {stage} ORDER BY id, _seq DESC
+            ON CONFLICT (id) DO UPDATE SET
+                {assignments}{separator}
+                updated_at = CURRENT_TIMESTAMP,
+                deleted_at = NULL
+            WHERE (t.deleted_at IS NOT NULL) OR ({current}) IS DISTINCT FROM ({excluded})
+            RETURNING (xmax = 0) AS inserted
+        )
+        SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) FROM merged
+    """).format(
+        target=target,
+        stage=stage,
+        columns=sql.SQL(', ').join(sql.Identifier(c.name) for c in columns),
+        values=sql.SQL(', ').join(value(c) for c in columns),
+        assignments=sql.SQL(',\n').join(
+            sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(name)) for name in updated),
+        separator=sql.SQL(',' if updated else ''),
+        current=sql.SQL(', ').join(sql.SQL("t.{}").format(sql.Identifier(name)) for name in updated or ['id']),
+        excluded=sql.SQL(', ').join(sql.SQL("EXCLUDED.{}").format(sql.Identifier(name)) for name in updated or ['id']),
+    )
+
+    started = time.perf_counter()
+    conn.execute(sql.SQL("ANALYZE {}").format(stage))
+    load.merged = conn.execute(
+        sql.SQL("SELECT count(DISTINCT id) FROM {}").format(stage)).fetchone()[0]
+    load.inserted, load.updated = conn.execute(query).fetchone()
+    load.merge_seconds = time.perf_counter() - started
+
+
+def rate(rows: int, seconds: float) -> str:
+    return f"{rows / seconds:,.0f} rows/s" if seconds > 0 else "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Bulk-load datasets/ YAML files with COPY and one merge per table',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+    # Quickstart data for its own tenant (tenant_id and user_id are in the file)
+    python bulk_load.py ../datasets/quickstart/sample_data.yaml
+
+    # Engram scenarios without tenant ids, for one user
+    python bulk_load.py ../datasets/domains/*/scenarios/*/*_engram.yaml --user-id demo
+        """
+    )
+
+    parser.add_argument('files', nargs='+', type=Path, help='Dataset YAML files')
+    parser.add_argument('--database-url', default=os.environ.get('POSTGRES__CONNECTION_STRING'),
+                        help='Postgres connection string (default: $POSTGRES__CONNECTION_STRING)')
+    parser.add_argument('--tenant-id', default=None,
+                        help='tenant_id for rows without one (default: --user-id, else public)')
+    parser.add_argument('--user-id', default=None, help='user_id for rows without one')
+    parser.add_argument('--batch-rows', type=int, default=DEFAULT_BATCH_ROWS,
+                        help=f'Rows parsed and copied per batch (default: {DEFAULT_BATCH_ROWS})')
+
+    args = parser.parse_args()
+
+    if psycopg is None:
+        print("Error: psycopg is required: pip install 'psycopg[binary]'")
+        sys.exit(1)
+
+    if not args.database_url:
+        print("Error: --database-url or POSTGRES__CONNECTION_STRING is required")
+        sys.exit(1)
+
+    for path in args.files:
+        if not path.exists():
+            print(f"Error: File not found: {path}")
+            sys.exit(1)
+
+    if YAML_LOADER is yaml.SafeLoader:
+        print("Warning: PyYAML has no libyaml bindings, parsing with the pure Python loader")
+
+    loads: dict[str, TableLoad] = {}
+    started = time.perf_counter()
+    with psycopg.connect(args.database_url) as conn:
+        for path in args.files:
+            file_started = time.perf_counter()
+            file_rows = 0
+            try:
+                for table, rows in iter_row_batches(path, args.batch_rows):
+                    if table not in loads:
+                        try:
+                            loads[table] = start_table(conn, table)
+                        except ValueError as e:
+                            print(f"Error: {path}: {e}")
+                            sys.exit(1)
+                    try:
+                        stage_rows(conn, loads[table], rows, args.tenant_id, args.user_id)
+                    except psycopg.DataError as e:
+                        print(f"Error: {path}: {table}: {str(e).splitlines()[0]} (nothing was loaded)")
+                        sys.exit(1)
+                    file_rows += len(rows)
+            except ValueError as e:
+                print(f"Error: {e} (nothing was loaded)")
+                sys.exit(1)
+            file_seconds = time.perf_counter() - file_started
+            print(f"Staged {file_rows} rows from {path} in {file_seconds:.1f}s ({rate(file_rows, file_seconds)})")
+        staged_seconds = time.perf_counter() - started
+
+        for load in loads.values():
+            merge_table(conn, load)
+            print(f"  {load.table}: {load.merged} rows, {load.inserted} inserted, {load.updated} updated, "
+                  f"{load.merged - load.inserted - load.updated} unchanged "
+                  f"in {load.merge_seconds:.1f}s ({rate(load.merged, load.merge_seconds)})")
+
+    total_seconds = time.perf_counter() - started
+    staged = sum(load.staged for load in loads.values())
+    print(f"\nLoaded {staged} rows into {len(loads)} tables in {total_seconds:.1f}s "
+          f"({rate(staged, total_seconds)}; staging {staged_seconds:.1f}s, "
+          f"merge {total_seconds - staged_seconds:.1f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Content-hash embedding cache for REM ingestion
+
+Writes embeddings_<table> rows for entity text without re-embedding text
+that has not changed (needs migrations/011_embedding_cache.sql):
+
+- rows whose stored content_hash and model match the text are skipped: no
+  provider call and no vector write
+- vectors for new text are reused from `embedding_cache`, keyed by
+  (model, sha256(text)), when any entity was embedded with the same text
+- only the remaining distinct texts are sent to the provider, in batches,
+  and their vectors are added to the cache
+
+Repeat loads of unchanged data therefore cost one hash lookup per row.
+
+Providers:
+- fake    deterministic unit vectors derived from the text hash, computed
+          locally (for tests, CI and trying the pipeline without an API key)
+- openai  OpenAI embeddings API (OPENAI_API_KEY)
+
+The command line embeds a text column of one entity table, e.g. after
+loading a dataset; generate_wiki_v2.py --embed uses embed_rows() for the
+pages it upserts.
+
+Usage:
+    python scripts/embedding_cache.py --table resources --provider fake
+    python scripts/embedding_cache.py --table moments --tenant-id acme
+    python scripts/embedding_cache.py --table resources --field content --provider openai
+
+Requires psycopg 3:
+    pip install "psycopg[binary]"
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import time
+import urllib.request
+from dataclasses import dataclass
+
+try:
+    import psycopg
+    from psycopg import sql
+except ImportError:
+    psycopg = None
+
+EMBEDDING_DIMENSIONS = 1536
+
+# Entity tables with an embeddings_<table> table, and the text field
+# embedded by default
+EMBEDDED_TABLES = (
+    'files', 'image_resources', 'messages', 'moments', 'ontology_configs',
+    'resources', 'schemas', 'sessions', 'users',
+)
+DEFAULT_FIELDS = {
+    'moments': 'summary', 'users': 'summary',
+    'ontology_configs': 'description', 'sessions': 'description',
+}
+
+UPSERT_EMBEDDING_SQL = """
+INSERT INTO {table} (entity_id, field_name, provider, model, embedding, content_hash)
+VALUES (%s, %s, %s, %s, %s::vector, %s)
+ON CONFLICT (entity_id, field_name, provider) DO UPDATE SET
+    model = EXCLUDED.model,
+    embedding = EXCLUDED.embedding,
+    content_hash = EXCLUDED.content_hash,
+    updated_at = CURRENT_TIMESTAMP
+"""
+
+
+def content_hash(text: str) -> str:
+    """Hex sha256 of the UTF-8 text, as stored in content_hash."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def vector_literal(values: list[float]) -> str:
+    """pgvector text representation, so vectors can be sent without the pgvector package."""
+    return '[' + ','.join(f'{v:.8g}' for v in values) + ']'
+
+
+class FakeEmbeddingProvider:
+    """Deterministic local embeddings: equal texts always get equal vectors."""
+
+    name = 'fake'
+
+    def __init__(self, model: str = 'fake-embedding', dimensions: int = EMBEDDING_DIMENSIONS):
+        self.model = model
+        self.dimensions = dimensions
+        self.calls = 0
+        self.texts = 0
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        self.calls += 1
+        self.texts += len(texts)
+        return [self._vector(text) for text in texts]
+
+    def _vector(self, text: str) -> list[float]:
+        rng = random.Random(hashlib.sha256(text.encode('utf-8')).digest())
+        values = [rng.gauss(0.0, 1.0) for _ in range(self.dimensions)]
+        norm = math.sqrt(sum(v * v for v in values))
+        return [v / norm for v in values]
+
+
+class OpenAIEmbeddingProvider:
+    """OpenAI embeddings API over plain HTTPS."""
+
+    name = 'openai'
+    url = 'https://api.openai.com/v1/embeddings'
+
+    def __init__(self, model: str = 'text-embedding-3-small', api_key: str | None = None):
+        self.model = model
+        self.api_key = api_key or os.environ.get('OPENAI_API_KEY')
+        self.calls = 0
+        self.texts = 0
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        if not self.api_key:
+            raise RuntimeError("OPENAI_API_KEY is required for the openai embedding provider")
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps({'model': self.model, 'input': texts}).encode('utf-8'),
+            headers={'Authorization': f'Bearer {self.api_key}', 'Content-Type': 'application/json'},
+        )
+        with urllib.request.urlopen(request, timeout=120) as response:
+            data = json.load(response)['data']
+        self.calls += 1
+        self.texts += len(texts)
+        return [item['embedding'] for item in sorted(data, key=lambda item: item['index'])]
+
+
+PROVIDERS = {
+    'fake': FakeEmbeddingProvider,
+    'openai': OpenAIEmbeddingProvider,
+}
+
+
+def get_provider(name: str, model: str | None = None):
+    """Create an embedding provider by name, with its default model unless one is given."""
+    provider_class = PROVIDERS[name]
+    return provider_class(model=model) if model else provider_class()
+
+
+@dataclass
+class EmbedStats:
+    unchanged: int = 0   # content_hash and model already current: nothing written
+    cache_hits: int = 0  # vector reused from embedding_cache
+    embedded: int = 0    # distinct texts sent to the provider
+    written: int = 0     # embeddings rows inserted or updated
+
+    def __str__(self) -> str:
+        return (f"{self.unchanged} unchanged, {self.cache_hits} from cache, "
+                f"{self.embedded} embedded, {self.written} rows written")
+
+
+def embed_rows(conn, table: str, rows: list[tuple], provider, batch_size: int = 100) -> EmbedStats:
+    """
+    Write embeddings_<table> rows for (entity_id, field_name, text) tuples.
+
+    Empty texts are skipped; when a (entity_id, field_name) pair repeats, the
+    last text wins. The caller owns the transaction.
+    """
+    if table not in EMBEDDED_TABLES:
+        raise ValueError(f"No embeddings table for: {table}")
+
+    embeddings_table = sql.Identifier(f'embeddings_{table}')
+    pending = {}
+    for entity_id, field_name, text in rows:
+        if text:
+            pending[(str(entity_id), field_name)] = content_hash(text), text
+
+    stats = EmbedStats()
+    if not pending:
+        return stats
+
+    with conn.cursor() as cur:
+        cur.execute(
+            sql.SQL("""
+                SELECT entity_id::text, field_name, content_hash
+                FROM {table}
+                WHERE provider = %s AND model = %s AND entity_id = ANY(%s::uuid[])
+            """).format(table=embeddings_table),
+            (provider.name, provider.model, list({entity_id for entity_id, _ in pending})),
+        )
+        for entity_id, field_name, stored_hash in cur.fetchall():
+            current = pending.get((entity_id, field_name))
+            if current and current[0] == stored_hash:
+                del pending[(entity_id, field_name)]
+                stats.unchanged += 1
+
+        texts = {digest: text for digest, text in pending.values()}
+        vectors = {}
+        if texts:
+            cur.execute(
+                "SELECT content_hash, embedding::text FROM embedding_cache "
+                "WHERE model = %s AND content_hash = ANY(%s)",
+                (provider.model, list(texts)),
+            )
+            vectors = dict(cur.fetchall())
+        stats.cache_hits = sum(1 for digest, _ in pending.values() if digest in vectors)
+
+        missing = [digest for digest in texts if digest not in vectors]
+        for i in range(0, len(missing), batch_size):
+            batch = missing[i:i + batch_size]
+            embedded = [vector_literal(v) for v in provider.embed([texts[digest] for digest in batch])]
+            cur.executemany(
+                "INSERT INTO embedding_cache (model, content_hash, provider, embedding) "
+                "VALUES (%s, %s, %s, %s::vector) ON CONFLICT (model, content_hash) DO NOTHING",
+                [(provider.model, digest, provider.name, vector) for digest, vector in zip(batch, embedded)],
+            )
+            vectors.update(zip(batch, embedded))
+            stats.embedded += len(batch)
+
+        cur.executemany(
+            sql.SQL(UPSERT_EMBEDDING_SQL).format(table=embeddings_table),
+            [
+                (entity_id, field_name, provider.name, provider.model, vectors[digest], digest)
+                for (entity_id, field_name), (digest, _) in pending.items()
+            ],
+        )
+        stats.written = len(pending)
+
+    return stats
+
+
+def load_entity_texts(conn, table: str, field: str, tenant_id: str | None) -> list[tuple]:
+    """(id, field, text) for the live rows of an entity table."""
+    query = sql.SQL("SELECT id::text, {field}::text FROM {table} WHERE deleted_at IS NULL").format(
+        field=sql.Identifier(field), table=sql.Identifier(table))
+    params = ()
+    if tenant_id:
+        query += sql.SQL(" AND tenant_id = %s")
+        params = (tenant_id,)
+    with conn.cursor() as cur:
+        cur.execute(query, params)
+        return [(entity_id, field, text) for entity_id, text in cur.fetchall()]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Embed entity text, skipping unchanged text and reusing cached vectors',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+    # Embed resources.content with the local fake provider
+    python embedding_cache.py --table resources --provider fake
+
+    # Moment summaries of one tenant with OpenAI
+    python embedding_cache.py --table moments --tenant-id acme --provider openai
+        """
+    )
+
+    parser.add_argument('--database-url', default=os.environ.get('POSTGRES__CONNECTION_STRING'),
+                        help='Postgres connection string (default: $POSTGRES__CONNECTION_STRING)')
+    parser.add_argument('--table', required=True, choices=EMBEDDED_TABLES,
+                        help='Entity table to embed')
+    parser.add_argument('--field', default=None,
+                        help='Text column to embed (default: summary for moments and users, '
+                             'description for ontology_configs and sessions, content otherwise)')
+    parser.add_argument('--tenant-id', default=None, help='Only embed rows of this tenant')
+    parser.add_argument('--provider', choices=sorted(PROVIDERS), default='openai',
+                        help='Embedding provider (default: openai)')
+    parser.add_argument('--model', default=None, help="Embedding model (default: the provider's default)")
+    parser.add_argument('--batch-size', type=int, default=100,
+                        help='Texts per provider call (default: 100)')
+
+    args = parser.parse_args()
+
+    if psycopg is None:
+        print("Error: psycopg is required: pip install 'psycopg[binary]'")
+        sys.exit(1)
+
+    if not args.database_url:
+        print("Error: --database-url or POSTGRES__CONNECTION_STRING is required")
+        sys.exit(1)
+
+    field = args.field or DEFAULT_FIELDS.get(args.table, 'content')
+    provider = get_provider(args.provider, args.model)
+
+    started = time.perf_counter()
+    with psycopg.connect(args.database_url) as conn:
+        rows = load_entity_texts(conn, args.table, field, args.tenant_id)
+        print(f"Embedding {args.table}.{field} for {len(rows)} rows "
+              f"({provider.name}/{provider.model})")
+        stats = embed_rows(conn, args.table, rows, provider, args.batch_size)
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"  {stats}")
+    print(f"  {provider.calls} provider calls in {elapsed_ms:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
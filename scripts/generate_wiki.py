@@ -12,11 +12,14 @@ Usage:
 """
 
 import argparse
+import os
 import re
 import yaml
 from pathlib import Path
 from dataclasses import dataclass, field
 
+from wiki_writer import render_pages, write_pages_atomically
+
 
 @dataclass
 class WikiPage:
@@ -314,25 +317,24 @@ def generate_frontmatter(page: WikiPage) -> str:
     return yaml.dump(fm, default_flow_style=False, sort_keys=False, allow_unicode=True)
 
 
-def write_wiki_page(output_dir: Path, page: WikiPage):
-    """Write a wiki page to disk."""
-    # Determine output path from entity key
+def wiki_page_path(page: WikiPage) -> Path:
+    """Determine a page's path, relative to the output directory, from its entity key."""
     key_parts = page.entity_key.split('/')
-    if len(key_parts) > 1:
-        # Create subdirectory structure
-        subdir = output_dir / '/'.join(key_parts[1:-1]) if len(key_parts) > 2 else output_dir
-        subdir.mkdir(parents=True, exist_ok=True)
-        filename = f"{key_parts[-1]}.md"
-        output_path = subdir / filename
-    else:
-        output_path = output_dir / f"{key_parts[0]}.md"
-
-    # Build page content
+    return Path(*key_parts[1:-1], f"{key_parts[-1]}.md")
+
+
+def render_wiki_page(page: WikiPage) -> tuple[str, str]:
+    """Render a wiki page to its relative path and full file content."""
     frontmatter = generate_frontmatter(page)
     full_content = f"---\n{frontmatter}---\n\n# {page.title}\n\n{page.content}"
+    return str(wiki_page_path(page)), full_content
 
-    output_path.write_text(full_content)
-    return output_path
+
+def write_wiki_page(output_dir: Path, page: WikiPage):
+    """Write a single wiki page to disk."""
+    rel_path, full_content = render_wiki_page(page)
+    write_pages_atomically(output_dir, [(rel_path, full_content)])
+    return output_dir / rel_path
 
 
 def build_parent_child_relationships(pages: list[WikiPage]):
@@ -347,8 +349,8 @@ def build_parent_child_relationships(pages: list[WikiPage]):
                 parent_page.children.append(page.entity_key)
 
 
-def generate_index_page(wiki_root: str, pages: list[WikiPage], output_dir: Path):
-    """Generate the root index page."""
+def build_index_page(wiki_root: str, pages: list[WikiPage]) -> WikiPage:
+    """Build the root index page."""
     # Group pages by section
     sections = {}
     for page in pages:
@@ -397,7 +399,6 @@ def generate_index_page(wiki_root: str, pages: list[WikiPage], output_dir: Path)
         tags=['index', 'cbt', 'manual']
     )
 
-    write_wiki_page(output_dir, index_page)
     return index_page
 
 
@@ -412,6 +413,8 @@ def main():
                         help='Output directory for wiki (default: parent of chunks_dir)')
     parser.add_argument('--wiki-root', '-r', type=str, default='cbt-manual',
                         help='Root entity key for the wiki (default: cbt-manual)')
+    parser.add_argument('--workers', '-w', type=int, default=os.cpu_count() or 1,
+                        help='Worker processes for rendering pages (default: CPU count)')
 
     args = parser.parse_args()
 
@@ -451,24 +454,23 @@ def main():
         # Add wiki links
         page.content = add_wiki_links(page.content, pages, page)
 
-    # Write pages
-    print(f"Writing wiki pages to {output_dir}")
-    written = []
-    for page in pages:
-        path = write_wiki_page(output_dir, page)
-        written.append(path)
-        print(f"  Created: {path.relative_to(output_dir)}")
+    # Render all pages, then write them as one batch
+    index_page = build_index_page(args.wiki_root, pages)
+    rendered = render_pages(pages + [index_page], render_wiki_page, args.workers)
 
-    # Generate index
-    index_page = generate_index_page(args.wiki_root, pages, output_dir)
+    print(f"Writing wiki pages to {output_dir}")
+    written, unchanged = write_pages_atomically(output_dir, rendered)
+    for rel_path, _ in rendered[:-1]:
+        print(f"  Created: {rel_path}")
     print(f"  Created: _index.md")
+    print(f"  Updated {len(written)} files, {len(unchanged)} unchanged")
 
     # Generate concepts index (extracted key concepts)
     concepts_dir = output_dir / 'concepts'
     concepts_dir.mkdir(exist_ok=True)
 
     print(f"\nWiki generated successfully!")
-    print(f"  Total pages: {len(written) + 1}")
+    print(f"  Total pages: {len(rendered)}")
     print(f"  Output directory: {output_dir}")
 
 
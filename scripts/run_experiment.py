@@ -0,0 +1,1123 @@
+#!/usr/bin/env python3
+"""
+Concurrent experiment runner
+
+Runs every ground-truth row of an experiment through the agent and then the
+evaluator (judge). Each graded row is appended to results/{run}/results.jsonl
+as soon as it is done; summary metrics go to results/{run}/metrics.json and
+run metadata to results/{run}/run_info.json.
+
+experiment.yaml gives the agent and evaluator schemas (agent_schema_ref /
+evaluator_schema_ref, or agent / evaluator names), resolved as
+agents/<name>.yaml and evaluators/<name>.yaml, and the dataset
+(datasets.ground_truth.path, default ground-truth/dataset.jsonl, .csv or
+.yaml). Models are "<provider>:<model>" strings as in LLM__DEFAULT_MODEL and
+EVALUATOR_MODEL, called through an OpenAI-compatible chat completions API.
+
+Rows are processed concurrently:
+- each provider has its own limit on in-flight requests (--concurrency), so
+  the agent call for one row overlaps the judge calls of earlier rows
+- 429, 5xx, timeouts and connection errors are retried with exponential
+  backoff and jitter (Retry-After is honoured), up to --max-retries times
+- rows are logged in dataset order whatever order they finish in, so
+  results.jsonl and metrics.json are stable across runs and concurrency
+  settings
+
+Long runs are streamed and checkpointed:
+- the dataset is read lazily and only a bounded window of rows is in flight,
+  so memory stays flat however large the dataset is
+- metrics (per-property means, pass rate, the experiment's scoring_weights
+  split and per-category / per-difficulty breakdowns) are updated as each row
+  is logged, and metrics.json is rewritten with status "running" every
+  --progress-every rows
+- --resume --run-name NAME replays results.jsonl and continues after the
+  last complete row of an interrupted run
+
+Evaluators can declare deterministic checks under `code_evaluators` (tool
+call present, label matches, distance to a ground-truth number, weighted
+totals, pass conditions). They run in code before and after the judge, the
+judge is only asked for the remaining subjective properties, and
+metrics.json tags every property with its annotator_kind (CODE or LLM, as
+in the feedbacks table).
+
+Model responses are cached in a SQLite file (default
+<experiment>/.cache/responses.sqlite), keyed by a hash of the resolved agent
+or evaluator schema, the model, the messages and the sampling parameters.
+A re-run after changing only the evaluator re-uses every agent response and
+only calls the judge; metrics.json reports the hit rate per stage. The file
+is capped at --cache-max-mb, evicting least recently used responses.
+
+Wall-clock time drops roughly by the concurrency factor until the provider's
+rate limits are reached. Point a provider at scripts/stub_llm_server.py to
+try it locally:
+
+    python scripts/stub_llm_server.py --port 8089 --latency 0.2 &
+    python scripts/run_experiment.py qa-assistant-dual-eval \\
+        --base-url openai=http://127.0.0.1:8089/v1 --concurrency 32
+
+Usage:
+    python scripts/run_experiment.py qa-assistant-dual-eval
+    python scripts/run_experiment.py experiments/qa-assistant-dual-eval --concurrency openai=16
+    python scripts/run_experiment.py qa-assistant-dual-eval --limit 50 --run-name smoke
+    python scripts/run_experiment.py qa-assistant-dual-eval --run-name nightly --resume
+    python scripts/run_experiment.py qa-assistant-dual-eval --no-cache
+
+Uses httpx when installed (pip install httpx), otherwise urllib in a thread
+pool sized to the concurrency limits.
+"""
+
+import argparse
+import asyncio
+import csv
+import itertools
+import hashlib
+import json
+import operator
+import os
+import random
+import sqlite3
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator
+
+import yaml
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+DEFAULT_MODEL = 'openai:gpt-4.1'
+DEFAULT_CONCURRENCY = 8
+DEFAULT_BASE_URLS = {'openai': 'https://api.openai.com/v1'}
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+MAX_AGENT_TURNS = 4
+DEFAULT_CACHE_MAX_MB = 1024
+GROUP_FIELDS = ('category', 'difficulty')  # Row (or row metadata) fields with per-value metric breakdowns
+JUDGE_SCHEMA_MARKER = '\n\nRespond with a single JSON object with these properties:\n'
+
+
+# ============================================================================
+# Experiment files
+# ============================================================================
+
+def load_yaml(path: Path) -> dict:
+    with open(path) as f:
+        return yaml.safe_load(f)
+
+
+def schema_name(config: dict, kind: str) -> str | None:
+    """Agent or evaluator name from <kind>_schema_ref or the short <kind> key."""
+    ref = config.get(f'{kind}_schema_ref')
+    if isinstance(ref, dict):
+        return ref.get('name')
+    return config.get(kind)
+
+
+def dataset_path(experiment_dir: Path, config: dict) -> Path:
+    ground_truth = (config.get('datasets') or {}).get('ground_truth') or {}
+    if ground_truth.get('path'):
+        return experiment_dir / ground_truth['path']
+    for suffix in ('jsonl', 'csv', 'yaml'):
+        path = experiment_dir / 'ground-truth' / f'dataset.{suffix}'
+        if path.exists():
+            return path
+    raise FileNotFoundError(f"No ground-truth dataset in {experiment_dir / 'ground-truth'}")
+
+
+def iter_dataset(path: Path) -> Iterator[dict]:
+    """
+    Rows of a jsonl, csv or yaml dataset; a JSON `metadata` column in csv is decoded.
+
+    jsonl and csv are read one row at a time; yaml is parsed whole.
+    """
+    if path.suffix == '.jsonl':
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif path.suffix == '.csv':
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f):
+                if row.get('metadata'):
+                    row['metadata'] = json.loads(row['metadata'])
+                yield row
+    else:
+        yield from load_yaml(path) or []
+
+
+# ============================================================================
+# Chat client
+# ============================================================================
+
+@dataclass
+class ModelRef:
+    provider: str
+    model: str
+
+    @classmethod
+    def parse(cls, value: str) -> 'ModelRef':
+        provider, sep, model = value.partition(':')
+        if not sep:
+            provider, model = 'openai', value
+        return cls(provider, model)
+
+    def __str__(self) -> str:
+        return f'{self.provider}:{self.model}'
+
+
+@dataclass
+class ProviderStats:
+    requests: int = 0
+    retries: int = 0
+    failures: int = 0
+    busy_seconds: float = 0.0
+
+
+class RetryableError(Exception):
+    def __init__(self, message: str, retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+
+    def summary(self) -> dict:
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0}
+
+
+class ResponseCache:
+    """
+    Content-addressed chat completion messages in SQLite.
+
+    Entries are evicted least recently used first once their total size
+    exceeds max_bytes (down to 90% of it).
+    """
+
+    def __init__(self, path: Path, max_bytes: int):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.db = sqlite3.connect(path, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.execute("PRAGMA synchronous = NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)")
+        self.size = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        self.evicted = 0
+
+    @staticmethod
+    def key(scope: str, provider: str, payload: dict) -> str:
+        canonical = json.dumps({'scope': scope, 'provider': provider, 'request': payload},
+                               sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> dict | None:
+        row = self.db.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self.db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, key: str, message: dict):
+        response = json.dumps(message)
+        now = time.time()
+        previous = self.db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        self.db.execute(
+            "INSERT OR REPLACE INTO responses (key, response, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (key, response, len(response), now, now),
+        )
+        self.size += len(response) - (previous[0] if previous else 0)
+        if self.size > self.max_bytes:
+            self.evict(int(self.max_bytes * 0.9))
+
+    def evict(self, target_bytes: int):
+        while self.size > target_bytes:
+            oldest = self.db.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at LIMIT 500").fetchall()
+            if not oldest:
+                break
+            self.db.executemany("DELETE FROM responses WHERE key = ?", [(key,) for key, _ in oldest])
+            self.size -= sum(size for _, size in oldest)
+            self.evicted += len(oldest)
+
+    def close(self):
+        self.db.close()
+
+
+class ChatClient:
+    """OpenAI-compatible chat completions with per-provider concurrency limits, retries and caching."""
+
+    def __init__(self, base_urls: dict[str, str], limits: dict[str, int], default_limit: int,
+                 max_retries: int = 5, timeout: float = 120.0, backoff: float = 1.0, max_backoff: float = 60.0,
+                 cache: ResponseCache | None = None):
+        self.base_urls = base_urls
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.limits = dict(limits)
+        self.default_limit = default_limit
+        self.semaphores: dict[str, asyncio.Semaphore] = {}
+        self.stats: dict[str, ProviderStats] = {}
+        self.cache = cache
+        self.cache_stats: dict[str, CacheStats] = {}
+        self.http = None
+        self.executor = None
+
+    async def __aenter__(self):
+        total = sum(self.limits.values()) + self.default_limit
+        if httpx is not None:
+            self.http = httpx.AsyncClient(timeout=self.timeout,
+                                          limits=httpx.Limits(max_connections=total))
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=total)
+        return self
+
+    async def __aexit__(self, *exc):
+        if self.http is not None:
+            await self.http.aclose()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+
+    def _semaphore(self, provider: str) -> asyncio.Semaphore:
+        if provider not in self.semaphores:
+            self.semaphores[provider] = asyncio.Semaphore(self.limits.get(provider, self.default_limit))
+            self.stats[provider] = ProviderStats()
+        return self.semaphores[provider]
+
+    def _endpoint(self, provider: str) -> tuple[str, dict]:
+        base_url = (self.base_urls.get(provider) or os.environ.get(f'{provider.upper()}_BASE_URL')
+                    or DEFAULT_BASE_URLS.get(provider))
+        if not base_url:
+            raise ValueError(f"No base URL for provider {provider}: use --base-url {provider}=URL "
+                             f"or {provider.upper()}_BASE_URL")
+        headers = {'Content-Type': 'application/json'}
+        api_key = os.environ.get(f'{provider.upper()}_API_KEY')
+        if api_key:
+            headers['Authorization'] = f'Bearer {api_key}'
+        return base_url.rstrip('/') + '/chat/completions', headers
+
+    async def _post(self, url: str, headers: dict, payload: dict) -> dict:
+        if self.http is not None:
+            try:
+                response = await self.http.post(url, headers=headers, json=payload)
+            except httpx.TransportError as e:
+                raise RetryableError(f"{type(e).__name__}: {e}")
+            if response.status_code in RETRYABLE_STATUS:
+                raise RetryableError(f"HTTP {response.status_code}",
+                                     parse_retry_after(response.headers.get('retry-after')))
+            response.raise_for_status()
+            return response.json()
+
+        def post():
+            request = urllib.request.Request(url, data=json.dumps(payload).encode('utf-8'), headers=headers)
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    return json.load(response)
+            except urllib.error.HTTPError as e:
+                if e.code in RETRYABLE_STATUS:
+                    raise RetryableError(f"HTTP {e.code}", parse_retry_after(e.headers.get('Retry-After')))
+                raise
+            except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+                raise RetryableError(f"{type(e).__name__}: {e}")
+
+        return await asyncio.get_running_loop().run_in_executor(self.executor, post)
+
+    async def complete(self, model: ModelRef, messages: list[dict], scope: str = '', stage: str = '',
+                       **options) -> dict:
+        """
+        Return the first choice's message, retrying transient failures.
+
+        scope identifies what produced the prompt (e.g. a schema hash) and is
+        part of the cache key; cache hits and misses are counted per stage.
+        """
+        url, headers = self._endpoint(model.provider)
+        payload = {'model': model.model, 'messages': messages, **options}
+        semaphore = self._semaphore(model.provider)
+        stats = self.stats[model.provider]
+
+        cache_key = None
+        if self.cache is not None:
+            cache_stats = self.cache_stats.setdefault(stage, CacheStats())
+            cache_key = ResponseCache.key(scope, model.provider, payload)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                cache_stats.hits += 1
+                return cached
+            cache_stats.misses += 1
+
+        for attempt in range(self.max_retries + 1):
+            async with semaphore:
+                started = time.perf_counter()
+                stats.requests += 1
+                try:
+                    body = await self._post(url, headers, payload)
+                    message = body['choices'][0]['message']
+                    if cache_key is not None:
+                        self.cache.put(cache_key, message)
+                    return message
+                except RetryableError as e:
+                    error = e
+                finally:
+                    stats.busy_seconds += time.perf_counter() - started
+            if attempt == self.max_retries:
+                break
+            # Back off outside the semaphore so other rows can use the slot
+            stats.retries += 1
+            delay = error.retry_after or min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+            await asyncio.sleep(delay)
+
+        stats.failures += 1
+        raise RuntimeError(f"{model}: giving up after {self.max_retries + 1} attempts ({error})")
+
+
+# ============================================================================
+# Agent and judge
+# ============================================================================
+
+@dataclass
+class Stage:
+    """A model call step: the agent or the evaluator, with its resolved schema."""
+    name: str
+    model: ModelRef
+    schema_name: str
+    schema: dict
+    scope: str = ''
+
+    def __post_init__(self):
+        canonical = json.dumps(self.schema, sort_keys=True, default=str)
+        self.scope = hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def agent_tools(agent_schema: dict) -> list[dict]:
+    """Function tools for the tools listed in the agent schema."""
+    return [
+        {
+            'type': 'function',
+            'function': {
+                'name': tool['name'],
+                'description': tool.get('description', ''),
+                'parameters': tool.get('parameters') or {'type': 'object', 'additionalProperties': True},
+            },
+        }
+        for tool in (agent_schema.get('json_schema_extra') or {}).get('tools', [])
+    ]
+
+
+async def run_agent(client: ChatClient, agent: Stage, row: dict) -> dict:
+    """
+    Ask the agent the row's input, acknowledging tool calls until it answers.
+
+    Returns the final answer text and every tool call made, in order.
+    """
+    messages = [
+        {'role': 'system', 'content': agent.schema.get('description', '')},
+        {'role': 'user', 'content': str(row['input'])},
+    ]
+    tools = agent_tools(agent.schema)
+    tool_calls = []
+    for _ in range(MAX_AGENT_TURNS):
+        message = await client.complete(agent.model, messages, scope=agent.scope, stage=agent.name,
+                                        **({'tools': tools} if tools else {}))
+        calls = message.get('tool_calls') or []
+        if not calls:
+            return {'answer': message.get('content') or '', 'tool_calls': tool_calls}
+        messages.append({'role': 'assistant', 'content': message.get('content'), 'tool_calls': calls})
+        for call in calls:
+            function = call.get('function', {})
+            try:
+                arguments = json.loads(function.get('arguments') or '{}')
+            except json.JSONDecodeError:
+                arguments = function.get('arguments')
+            tool_calls.append({'name': function.get('name'), 'arguments': arguments,
+                               'before_answer': not message.get('content')})
+            messages.append({'role': 'tool', 'tool_call_id': call.get('id'), 'content': '{"status": "ok"}'})
+    return {'answer': '', 'tool_calls': tool_calls}
+
+
+def judge_case(row: dict, agent_output: dict) -> dict:
+    """What the evaluator sees for one row."""
+    return {
+        'input': row['input'],
+        'ground_truth': {key: value for key, value in row.items() if key != 'input'},
+        'agent_response': agent_output['answer'],
+        'tool_calls': agent_output['tool_calls'],
+    }
+
+
+async def run_judge(client: ChatClient, judge: Stage, case: dict, skip: set[str],
+                    code_evaluations: dict | None = None) -> dict:
+    """
+    Score one case with the evaluator schema; returns the judge's JSON object.
+
+    Properties in `skip` are left out of the requested schema and dropped from
+    the answer; code_evaluations already computed are shown to the judge.
+    """
+    properties = {name: spec for name, spec in (judge.schema.get('properties') or {}).items()
+                  if name not in skip}
+    instructions = judge.schema.get('description', '')
+    if code_evaluations:
+        instructions += ("\n\nThe case's code_evaluations were computed deterministically; "
+                         "take them as given and do not score them again.")
+        case = {**case, 'code_evaluations': code_evaluations}
+    instructions += JUDGE_SCHEMA_MARKER + json.dumps(properties, indent=2)
+    message = await client.complete(
+        judge.model,
+        [{'role': 'system', 'content': instructions}, {'role': 'user', 'content': json.dumps(case)}],
+        scope=judge.scope,
+        stage=judge.name,
+        response_format={'type': 'json_object'},
+        temperature=0,
+    )
+    scores = json.loads(message.get('content') or '{}')
+    return {name: value for name, value in scores.items() if name not in skip}
+
+
+# ============================================================================
+# Code evaluators
+# ============================================================================
+
+COMPARISONS = {
+    '>=': operator.ge, '>': operator.gt, '<=': operator.le, '<': operator.lt,
+    '==': operator.eq, '!=': operator.ne,
+}
+OUTPUT_OPTIONS = ('property', 'position', 'compliance', 'error', 'score')
+
+
+def argument(arguments, path: str):
+    """Value at a dotted path (e.g. extra.category) of tool call arguments."""
+    value = arguments
+    for part in path.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def normalize_label(value) -> str:
+    return str(value).strip().lower().replace(' ', '_').replace('-', '_')
+
+
+def tool_arguments(case: dict, tool: str) -> dict | None:
+    """Arguments of the first call to `tool`, or None if it was not called."""
+    for call in case['tool_calls']:
+        if call.get('name') == tool:
+            return call['arguments'] if isinstance(call.get('arguments'), dict) else {}
+    return None
+
+
+def check_tool_call(case: dict, evaluation: dict, options: dict) -> dict:
+    """
+    Whether the tool was called before the answer, and with every required argument.
+
+    An argument counts as missing only when absent or null; judging empty or
+    weak values (e.g. no key facts) is left to other properties.
+    """
+    call = next((c for c in case['tool_calls'] if c.get('name') == options['tool']), None)
+    if call is None:
+        present, position, compliance = False, 'not_found', 0.0
+    else:
+        arguments = call['arguments'] if isinstance(call.get('arguments'), dict) else {}
+        missing = [path for path in options.get('required', []) if argument(arguments, path) is None]
+        present = call.get('before_answer', True)
+        position = 'first' if present else 'after_response'
+        compliance = 1.0 if present and not missing else 0.7
+    return {options['property']: present, options['position']: position, options['compliance']: compliance}
+
+
+def check_tool_argument(case: dict, evaluation: dict, options: dict) -> dict:
+    """A tool call argument, e.g. the reported confidence; `default` if not called."""
+    arguments = tool_arguments(case, options['tool'])
+    value = argument(arguments, options['field']) if arguments is not None else None
+    return {options['property']: value if value is not None else options.get('default')}
+
+
+def check_match(case: dict, evaluation: dict, options: dict) -> dict:
+    """Label equality, ignoring case and separators, against a ground-truth field or another property."""
+    value = evaluation.get(options['field'])
+    other = case['ground_truth'].get(options['expected']) if 'expected' in options \
+        else evaluation.get(options['equals'])
+    return {options['property']: value is not None and other is not None
+            and normalize_label(value) == normalize_label(other)}
+
+
+def check_distance(case: dict, evaluation: dict, options: dict) -> dict:
+    """Absolute error against a ground-truth number, and 1 - error / tolerance as a score."""
+    value, expected = evaluation.get(options['field']), case['ground_truth'].get(options['expected'])
+    try:
+        error = abs(float(value) - float(expected))
+    except (TypeError, ValueError):
+        return {options['error']: None, options['score']: 0.0}
+    score = max(0.0, 1.0 - error / options.get('tolerance', 1.0))
+    return {options['error']: round(error, 4), options['score']: round(score, 4)}
+
+
+def check_weighted_sum(case: dict, evaluation: dict, options: dict) -> dict:
+    """Weighted sum of number and boolean properties; None if any is missing."""
+    values = [evaluation.get(name) for name in options['weights']]
+    if not all(isinstance(value, (int, float)) for value in values):
+        return {options['property']: None}
+    total = sum(weight * float(value) for weight, value in zip(options['weights'].values(), values))
+    return {options['property']: round(total, 4)}
+
+
+def check_all_of(case: dict, evaluation: dict, options: dict) -> dict:
+    """True when every {field, operator, threshold} condition holds."""
+    def holds(condition):
+        value = evaluation.get(condition['field'])
+        try:
+            return value is not None and COMPARISONS[condition['operator']](value, condition['threshold'])
+        except TypeError:
+            return False
+    return {options['property']: all(holds(condition) for condition in options['conditions'])}
+
+
+CODE_CHECKS = {
+    'tool_call': check_tool_call,
+    'tool_argument': check_tool_argument,
+    'match': check_match,
+    'distance': check_distance,
+    'weighted_sum': check_weighted_sum,
+    'all_of': check_all_of,
+}
+
+
+@dataclass
+class CodeEvaluators:
+    """
+    Deterministic checks from the evaluator's `code_evaluators` section.
+
+    `before_judge` checks see the agent output and ground truth, and the judge
+    is not asked for the properties they produce; `after_judge` checks can
+    also combine the judge's scores (weighted totals, pass/fail).
+    """
+    before_judge: list[dict] = field(default_factory=list)
+    after_judge: list[dict] = field(default_factory=list)
+
+    @classmethod
+    def from_schema(cls, evaluator_schema: dict) -> 'CodeEvaluators':
+        section = evaluator_schema.get('code_evaluators') or {}
+        evaluators = cls(section.get('before_judge') or [], section.get('after_judge') or [])
+        for spec in evaluators.before_judge + evaluators.after_judge:
+            if spec.get('check') not in CODE_CHECKS:
+                raise ValueError(f"Unknown code evaluator check: {spec.get('check')}")
+        return evaluators
+
+    @property
+    def outputs(self) -> set[str]:
+        return {spec[option] for spec in self.before_judge + self.after_judge
+                for option in OUTPUT_OPTIONS if option in spec}
+
+    def annotator_kind(self, evaluator_schema: dict) -> dict:
+        """CODE or LLM (the feedbacks.annotator_kind values) for each evaluator property."""
+        outputs = self.outputs
+        return {name: 'CODE' if name in outputs else 'LLM'
+                for name in (evaluator_schema.get('properties') or {})}
+
+    @staticmethod
+    def run(specs: list[dict], case: dict, evaluation: dict) -> dict:
+        evaluation = dict(evaluation)
+        for spec in specs:
+            evaluation.update(CODE_CHECKS[spec['check']](case, evaluation, spec))
+        return evaluation
+
+
+@dataclass
+class RowResult:
+    index: int
+    id: object
+    groups: dict = field(default_factory=dict)
+    status: str = 'ok'
+    evaluation: dict = field(default_factory=dict)
+    agent_output: dict | None = None
+    error: str | None = None
+    seconds: float = 0.0
+
+    def record(self, save_traces: bool) -> dict:
+        """The results.jsonl line for this row."""
+        return {
+            'index': self.index,
+            'id': self.id,
+            **self.groups,
+            'status': self.status,
+            **({'error': self.error} if self.error else {}),
+            'evaluation': self.evaluation,
+            **({'agent_output': self.agent_output} if save_traces else {}),
+            'seconds': round(self.seconds, 3),
+        }
+
+
+async def run_row(client: ChatClient, index: int, row: dict, agent: Stage, judge: Stage,
+                  code: CodeEvaluators) -> RowResult:
+    metadata = row.get('metadata') if isinstance(row.get('metadata'), dict) else {}
+    groups = {name: row.get(name, metadata.get(name)) for name in GROUP_FIELDS}
+    result = RowResult(index=index, id=row.get('id', index + 1),
+                       groups={name: value for name, value in groups.items() if value is not None})
+    started = time.perf_counter()
+    try:
+        result.agent_output = await run_agent(client, agent, row)
+        case = judge_case(row, result.agent_output)
+        evaluation = code.run(code.before_judge, case, {})
+        skip = code.outputs
+        if set(judge.schema.get('properties') or {}) - skip:
+            evaluation.update(await run_judge(client, judge, case, skip, evaluation))
+        result.evaluation = code.run(code.after_judge, case, evaluation)
+    except Exception as e:
+        result.status = 'error'
+        result.error = f"{type(e).__name__}: {e}"
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+# ============================================================================
+# Metrics
+# ============================================================================
+
+class Mean:
+    def __init__(self):
+        self.total = 0.0
+        self.count = 0
+
+    def add(self, value):
+        if isinstance(value, (int, float)):
+            self.total += float(value)
+            self.count += 1
+
+    @property
+    def value(self) -> float | None:
+        return round(self.total / self.count, 4) if self.count else None
+
+
+class GroupMetrics:
+    """Row counts, pass rate and weighted score for one slice of the dataset."""
+
+    def __init__(self):
+        self.rows = 0
+        self.failed = 0
+        self.passed = Mean()
+        self.weighted_score = Mean()
+
+    def summary(self) -> dict:
+        return {
+            'rows': self.rows,
+            'completed': self.rows - self.failed,
+            'pass_rate': self.passed.value,
+            'weighted_score': self.weighted_score.value,
+        }
+
+
+class RunningMetrics:
+    """
+    Experiment metrics updated one results.jsonl record at a time.
+
+    Memory depends on the number of evaluator properties and group values,
+    not on the number of rows:
+    - the mean of each numeric and boolean evaluator property over scored
+      rows, in schema order
+    - the pass rate, from the evaluator's primary label (default `pass`)
+    - the experiment's metadata.scoring_weights split, e.g. text_response and
+      metadata, averaging the <name>_score properties and their weighted sum
+    - the same pass rate and weighted score per value of each GROUP_FIELDS
+      dataset column
+    """
+
+    def __init__(self, evaluator_schema: dict, scoring_weights: dict | None = None):
+        self.properties = [name for name, spec in (evaluator_schema.get('properties') or {}).items()
+                           if spec.get('type') in ('number', 'integer', 'boolean')]
+        self.pass_field = (evaluator_schema.get('phoenix_config') or {}).get('primary_label', 'pass')
+        self.scoring_weights = scoring_weights or {}
+        self.overall = GroupMetrics()
+        self.means = {name: Mean() for name in self.properties}
+        self.component_means = {name: Mean() for name in self.scoring_weights}
+        self.groups = {name: {} for name in GROUP_FIELDS}
+
+    def weighted_score(self, evaluation: dict) -> float | None:
+        scores = [(weight, evaluation.get(f'{name}_score')) for name, weight in self.scoring_weights.items()]
+        if not scores or not all(isinstance(score, (int, float)) for _, score in scores):
+            return None
+        return sum(weight * score for weight, score in scores)
+
+    def add(self, record: dict):
+        evaluation = record.get('evaluation') or {}
+        slices = [self.overall] + [
+            self.groups[name].setdefault(str(record[name]), GroupMetrics())
+            for name in GROUP_FIELDS if name in record
+        ]
+        scored = record.get('status') == 'ok'
+        weighted = self.weighted_score(evaluation) if scored else None
+        for group in slices:
+            group.rows += 1
+            if not scored:
+                group.failed += 1
+                continue
+            group.passed.add(evaluation.get(self.pass_field))
+            group.weighted_score.add(weighted)
+        if scored:
+            for name, mean in self.means.items():
+                mean.add(evaluation.get(name))
+            for name, mean in self.component_means.items():
+                mean.add(evaluation.get(f'{name}_score'))
+
+    def summary(self) -> dict:
+        summary = {
+            'rows': self.overall.rows,
+            'completed': self.overall.rows - self.overall.failed,
+            'failed': self.overall.failed,
+            'metrics': {name: mean.value for name, mean in self.means.items() if mean.count},
+            'pass_rate': self.overall.passed.value,
+        }
+        if self.scoring_weights:
+            summary['scoring'] = {
+                'weights': self.scoring_weights,
+                **{name: mean.value for name, mean in self.component_means.items()},
+                'weighted_score': self.overall.weighted_score.value,
+            }
+        for name, groups in self.groups.items():
+            if groups:
+                summary[f'by_{name}'] = {value: group.summary() for value, group in sorted(groups.items())}
+        return summary
+
+
+class ResultsLog:
+    """
+    Append-only results.jsonl, one graded row per line in dataset order.
+
+    Opening an existing log replays it into the metrics and drops a torn
+    last line, so a run can resume after the last complete row.
+    """
+
+    def __init__(self, path: Path, metrics: RunningMetrics):
+        self.path = path
+        self.metrics = metrics
+        self.rows = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        valid_bytes = 0
+        if path.exists():
+            with open(path, 'rb') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    if not line.endswith(b'\n') or record.get('index') != self.rows:
+                        break
+                    metrics.add(record)
+                    self.rows += 1
+                    valid_bytes += len(line)
+        self.file = open(path, 'ab')
+        self.file.truncate(valid_bytes)
+
+    def append(self, record: dict):
+        self.file.write(json.dumps(record).encode('utf-8') + b'\n')
+        self.file.flush()
+        self.metrics.add(record)
+        self.rows += 1
+
+    def close(self):
+        self.file.close()
+
+
+def write_json(path: Path, data: dict):
+    """Write via a temporary file, so readers never see a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=2)
+        f.write('\n')
+    os.replace(tmp, path)
+
+
+def resolve_experiment(value: str) -> Path:
+    path = Path(value)
+    if path.is_dir():
+        return path
+    experiments_home = Path(os.environ.get('EXPERIMENTS_HOME', REPO_ROOT / 'experiments'))
+    return experiments_home / value
+
+
+def parse_provider_options(values: list[str], cast) -> tuple[dict, object]:
+    """Split PROVIDER=VALUE options from a bare default VALUE."""
+    per_provider, default = {}, None
+    for value in values or []:
+        provider, sep, setting = value.partition('=')
+        if sep:
+            per_provider[provider] = cast(setting)
+        else:
+            default = cast(value)
+    return per_provider, default
+
+
+async def run_experiment(args, experiment_dir: Path, config: dict) -> int:
+    agent_name = schema_name(config, 'agent')
+    evaluator_name = schema_name(config, 'evaluator')
+    agent_schema = load_yaml(args.agents_dir / f'{agent_name}.yaml')
+    evaluator_schema = load_yaml(args.evaluators_dir / f'{evaluator_name}.yaml')
+    data_path = dataset_path(experiment_dir, config)
+
+    agent_model = ModelRef.parse(args.agent_model)
+    evaluator_model = ModelRef.parse(args.evaluator_model or args.agent_model)
+    agent = Stage('agent', agent_model, agent_name, agent_schema)
+    judge = Stage('judge', evaluator_model, evaluator_name, evaluator_schema)
+    code = CodeEvaluators() if args.no_code_evaluators else CodeEvaluators.from_schema(evaluator_schema)
+    annotator_kind = code.annotator_kind(evaluator_schema)
+    limits, default_limit = parse_provider_options(args.concurrency, int)
+    base_urls, _ = parse_provider_options(args.base_url, str)
+    if default_limit is None:
+        default_limit = DEFAULT_CONCURRENCY
+
+    run_name = args.run_name or datetime.now().strftime('%Y%m%d-%H%M%S')
+    results_config = config.get('results') or {}
+    save_traces = results_config.get('save_traces', False)
+    run_dir = experiment_dir / results_config.get('base_path', 'results/') / run_name
+    metrics_file = run_dir / results_config.get('metrics_file', 'metrics.json')
+    results_file = run_dir / 'results.jsonl'
+    if results_file.exists() and not args.resume:
+        print(f"Error: {results_file} already exists: use --resume to continue the run, or another --run-name")
+        sys.exit(1)
+
+    scoring_weights = (config.get('metadata') or {}).get('scoring_weights')
+    log = ResultsLog(results_file, RunningMetrics(evaluator_schema, scoring_weights))
+    resumed = log.rows
+
+    print(f"Experiment {config.get('name', experiment_dir.name)}: {data_path}")
+    print(f"  agent {agent_name} ({agent_model}), evaluator {evaluator_name} ({evaluator_model})")
+    if code.outputs:
+        llm_properties = [name for name, kind in annotator_kind.items() if kind == 'LLM']
+        print(f"  {len(annotator_kind) - len(llm_properties)} properties scored in code, "
+              f"{len(llm_properties)} by the judge")
+    if resumed:
+        print(f"  resuming after {resumed} rows in {results_file}")
+
+    cache = None
+    if not args.no_cache:
+        cache = ResponseCache(args.cache or experiment_dir / '.cache' / 'responses.sqlite',
+                              args.cache_max_mb * 1024 * 1024)
+        print(f"  response cache {cache.path}")
+
+    # Rows are started in dataset order and written in dataset order, at most
+    # `window` ahead of the oldest unfinished row: enough to keep every
+    # provider's slots busy while a slow row holds up the log
+    window = 4 * max(limits.get(stage.model.provider, default_limit) for stage in (agent, judge))
+    in_flight = deque()
+    row_seconds = 0.0
+
+    def summary(status: str) -> dict:
+        cache_hits = sum(stats.hits for stats in client.cache_stats.values())
+        cache_lookups = cache_hits + sum(stats.misses for stats in client.cache_stats.values())
+        return {
+            'experiment': config.get('name', experiment_dir.name),
+            'run': run_name,
+            'status': status,
+            **log.metrics.summary(),
+            'cache_hit_rate': round(cache_hits / cache_lookups, 4) if cache_lookups else 0.0,
+            'cache': {stage: stats.summary() for stage, stats in sorted(client.cache_stats.items())},
+            'annotator_kind': annotator_kind,
+            'results_file': results_file.name,
+        }
+
+    async def write_oldest():
+        nonlocal row_seconds
+        result = await in_flight.popleft()
+        log.append(result.record(save_traces))
+        row_seconds += result.seconds
+        done = log.rows - resumed
+        if done % args.progress_every == 0:
+            print(f"  {log.rows} rows ({time.perf_counter() - started:.1f}s)")
+            write_json(metrics_file, summary('running'))
+
+    started_at = datetime.now(timezone.utc)
+    started = time.perf_counter()
+    async with ChatClient(base_urls, limits, default_limit, max_retries=args.max_retries,
+                          timeout=args.timeout, cache=cache) as client:
+        rows = itertools.islice(iter_dataset(data_path), resumed, args.limit)
+        for index, row in enumerate(rows, start=resumed):
+            in_flight.append(asyncio.create_task(run_row(client, index, row, agent, judge, code)))
+            if len(in_flight) >= window:
+                await write_oldest()
+        while in_flight:
+            await write_oldest()
+    wall_clock = time.perf_counter() - started
+    log.close()
+
+    metrics = summary('completed')
+    run_info = {
+        'experiment': metrics['experiment'],
+        'run': run_name,
+        'started_at': started_at.isoformat(),
+        'finished_at': datetime.now(timezone.utc).isoformat(),
+        'wall_clock_seconds': round(wall_clock, 3),
+        'resumed_after_rows': resumed,
+        'dataset': str(data_path),
+        'agent': {'schema': agent_name, 'model': str(agent_model), 'schema_hash': agent.scope},
+        'evaluator': {'schema': evaluator_name, 'model': str(evaluator_model), 'schema_hash': judge.scope},
+        'concurrency': {provider: limits.get(provider, default_limit) for provider in sorted(client.stats)},
+        'providers': {
+            provider: {
+                'requests': stats.requests,
+                'retries': stats.retries,
+                'failures': stats.failures,
+                'busy_seconds': round(stats.busy_seconds, 3),
+            }
+            for provider, stats in sorted(client.stats.items())
+        },
+        'http_client': 'httpx' if httpx is not None else 'urllib',
+        'cache': {
+            'path': str(cache.path),
+            'size_bytes': cache.size,
+            'max_bytes': cache.max_bytes,
+            'evicted': cache.evicted,
+        } if cache is not None else None,
+    }
+    if cache is not None:
+        cache.close()
+
+    write_json(metrics_file, metrics)
+    write_json(run_dir / 'run_info.json', run_info)
+
+    print(f"\n{metrics['completed']}/{metrics['rows']} rows scored, {log.rows - resumed} in {wall_clock:.1f}s "
+          f"({row_seconds / max(wall_clock, 1e-9):.1f} rows in flight on average)")
+    for name, value in metrics['metrics'].items():
+        print(f"  {name}: {value}")
+    print(f"  pass rate: {metrics['pass_rate']}")
+    if 'scoring' in metrics:
+        print(f"  weighted score: {metrics['scoring']['weighted_score']}")
+    if cache is not None:
+        stages = ', '.join(f"{stage} {stats.hits}/{stats.hits + stats.misses}"
+                           for stage, stats in sorted(client.cache_stats.items()))
+        print(f"  cache hit rate: {metrics['cache_hit_rate']:.1%} ({stages})")
+    if metrics['failed']:
+        print(f"  {metrics['failed']} rows failed: see \"status\" in {results_file}")
+    print(f"Wrote {results_file}, {metrics_file} and {run_dir / 'run_info.json'}")
+    return 1 if metrics['failed'] else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Run an experiment with bounded concurrent agent and judge calls',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+    # 16 requests in flight per provider
+    python run_experiment.py qa-assistant-dual-eval --concurrency 16
+
+    # Judge on a self-hosted OpenAI-compatible server with its own limit
+    python run_experiment.py qa-assistant-dual-eval --concurrency openai=32 --concurrency local=4 \\
+        --evaluator-model local:llama-3.1-70b --base-url local=http://localhost:8000/v1
+
+    # Re-score with a changed evaluator: agent responses come from the cache
+    python run_experiment.py qa-assistant-dual-eval --run-name judge-v2
+
+    # Local stub server
+    python stub_llm_server.py --port 8089 &
+    python run_experiment.py qa-assistant-dual-eval --base-url openai=http://127.0.0.1:8089/v1
+        """
+    )
+
+    parser.add_argument('experiment', help='Experiment directory, or a name under $EXPERIMENTS_HOME (default: experiments/)')
+    parser.add_argument('--agent-model', default=os.environ.get('LLM__DEFAULT_MODEL', DEFAULT_MODEL),
+                        help='Agent model as provider:model (default: $LLM__DEFAULT_MODEL or openai:gpt-4.1)')
+    parser.add_argument('--evaluator-model', default=os.environ.get('EVALUATOR_MODEL'),
+                        help='Judge model as provider:model (default: $EVALUATOR_MODEL or the agent model)')
+    parser.add_argument('--concurrency', '-c', action='append', metavar='[PROVIDER=]N',
+                        help=f'In-flight requests per provider (repeatable; default: {DEFAULT_CONCURRENCY})')
+    parser.add_argument('--base-url', action='append', metavar='PROVIDER=URL',
+                        help='OpenAI-compatible API base URL for a provider (default: $<PROVIDER>_BASE_URL)')
+    parser.add_argument('--max-retries', type=int, default=5,
+                        help='Retries per request on 429, 5xx and connection errors (default: 5)')
+    parser.add_argument('--timeout', type=float, default=120.0, help='Request timeout in seconds (default: 120)')
+    parser.add_argument('--limit', type=int, default=None, help='Only run the first N rows')
+    parser.add_argument('--run-name', default=None, help='Results folder name (default: timestamp)')
+    parser.add_argument('--agents-dir', type=Path, default=REPO_ROOT / 'agents')
+    parser.add_argument('--evaluators-dir', type=Path, default=REPO_ROOT / 'evaluators')
+    parser.add_argument('--cache', type=Path, default=None,
+                        help='Response cache file (default: <experiment>/.cache/responses.sqlite)')
+    parser.add_argument('--no-cache', action='store_true', help='Always call the models')
+    parser.add_argument('--cache-max-mb', type=int, default=DEFAULT_CACHE_MAX_MB,
+                        help=f'Evict least recently used responses above this size (default: {DEFAULT_CACHE_MAX_MB})')
+    parser.add_argument('--no-code-evaluators', action='store_true',
+                        help="Ask the judge for every property, ignoring the evaluator's code_evaluators")
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue the --run-name run after the last row in its results.jsonl')
+    parser.add_argument('--progress-every', type=int, default=100,
+                        help='Print progress and checkpoint metrics.json every N rows (default: 100)')
+
+    args = parser.parse_args()
+
+    if args.resume and not args.run_name:
+        print("Error: --resume requires --run-name")
+        sys.exit(1)
+
+    if args.progress_every < 1:
+        print("Error: --progress-every must be at least 1")
+        sys.exit(1)
+
+    try:
+        limits, default_limit = parse_provider_options(args.concurrency, int)
+    except ValueError as e:
+        print(f"Error: --concurrency: {e}")
+        sys.exit(1)
+    for provider, limit in [*limits.items(), (None, default_limit)]:
+        if limit is not None and limit < 1:
+            print(f"Error: --concurrency {provider + '=' if provider else ''}{limit}: must be at least 1")
+            sys.exit(1)
+    if args.max_retries < 0:
+        print("Error: --max-retries must be at least 0")
+        sys.exit(1)
+    if args.timeout <= 0:
+        print("Error: --timeout must be greater than 0")
+        sys.exit(1)
+
+    experiment_dir = resolve_experiment(args.experiment)
+    config_file = experiment_dir / 'experiment.yaml'
+    if not config_file.exists():
+        print(f"Error: File not found: {config_file}")
+        sys.exit(1)
+
+    config = load_yaml(config_file)
+    for kind, directory in (('agent', args.agents_dir), ('evaluator', args.evaluators_dir)):
+        name = schema_name(config, kind)
+        if not name or not (directory / f'{name}.yaml').exists():
+            print(f"Error: {kind} schema not found: {directory / f'{name}.yaml'}")
+            sys.exit(1)
+
+    try:
+        CodeEvaluators.from_schema(load_yaml(args.evaluators_dir / f"{schema_name(config, 'evaluator')}.yaml"))
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    sys.exit(asyncio.run(run_experiment(args, experiment_dir, config)))
+
+
+if __name__ == '__main__':
+    main()
@@ -9,53 +9,88 @@ Usage:
     python scripts/split_pdf.py input.pdf --output-dir chunks/
     python scripts/split_pdf.py input.pdf --output-dir chunks/ --format markdown
     python scripts/split_pdf.py input.pdf --pages 1-10  # Extract specific pages
+    python scripts/split_pdf.py input.pdf --output-dir chunks/ --workers 8
+    python scripts/split_pdf.py input.pdf --output-dir chunks/ --jsonl  # Stream page records
+    python scripts/split_pdf.py input.pdf --output-dir chunks/ --force  # Ignore _manifest.json
+
+Re-runs only re-extract pages whose entry in the output directory's
+_manifest.json no longer matches (PDF hash, library, library version and
+per-page file hash). Page files with identical bytes are never rewritten.
 """
 
 import argparse
+import hashlib
+import heapq
+import importlib.metadata
+import importlib.util
+import io
+import json
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+MANIFEST_FILE = '_manifest.json'
+
 
 def check_dependencies():
-    """Check and report on available PDF processing libraries."""
-    available = {}
+    """
+    Check and report on available PDF processing libraries.
 
-    try:
-        import pypdf
-        available['pypdf'] = True
-    except ImportError:
-        available['pypdf'] = False
+    Uses import specs rather than importing, so a cached re-run does not pay
+    for loading libraries it never calls.
+    """
+    return {lib: importlib.util.find_spec(lib) is not None for lib in ('pypdf', 'pymupdf', 'pdfplumber')}
 
-    try:
-        import pymupdf  # fitz
-        available['pymupdf'] = True
-    except ImportError:
-        available['pymupdf'] = False
 
-    try:
+def open_document(lib: str, input_path: Path):
+    """Open a PDF with the given library and return its document handle."""
+    if lib == 'pymupdf':
+        import pymupdf
+        return pymupdf.open(input_path)
+    if lib == 'pdfplumber':
         import pdfplumber
-        available['pdfplumber'] = True
-    except ImportError:
-        available['pdfplumber'] = False
+        return pdfplumber.open(input_path)
+    from pypdf import PdfReader
+    return PdfReader(input_path)
 
-    return available
 
+def close_document(handle):
+    """Close a handle returned by open_document."""
+    close = getattr(handle, 'close', None)
+    if close:
+        close()
 
-def split_with_pypdf(input_path: Path, output_dir: Path, pages: list[int] | None = None):
-    """Split PDF using pypdf (pure Python, no dependencies)."""
-    from pypdf import PdfReader, PdfWriter
 
-    reader = PdfReader(input_path)
+def write_page_file(output_path: Path, data: bytes) -> str:
+    """
+    Write a page file and return the sha256 of its contents.
+
+    Files whose bytes are already identical on disk are left alone, so
+    unchanged pages keep their mtimes.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    try:
+        if output_path.stat().st_size == len(data) and output_path.read_bytes() == data:
+            return digest
+    except FileNotFoundError:
+        pass
+    output_path.write_bytes(data)
+    return digest
+
+
+def iter_split_with_pypdf(reader, input_path: Path, output_dir: Path, pages: list[int] | None = None):
+    """Yield a record for each single-page PDF as soon as it is written."""
+    from pypdf import PdfWriter
+
     total_pages = len(reader.pages)
 
     if pages is None:
-        pages = list(range(total_pages))
+        pages = range(total_pages)
 
-    results = []
     for i in pages:
         if i >= total_pages:
-            print(f"Warning: Page {i+1} does not exist (total: {total_pages})")
+            print(f"Warning: Page {i+1} does not exist (total: {total_pages})", file=sys.stderr)
             continue
 
         # Save individual page as PDF
@@ -63,29 +98,25 @@ def split_with_pypdf(input_path: Path, output_dir: Path, pages: list[int] | None
         writer.add_page(reader.pages[i])
 
         output_path = output_dir / f"page_{i+1:04d}.pdf"
-        with open(output_path, 'wb') as f:
-            writer.write(f)
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        digest = write_page_file(output_path, buffer.getvalue())
 
-        results.append({
+        yield {
             'page': i + 1,
             'path': output_path,
-            'format': 'pdf'
-        })
-
-    return results, total_pages
-
+            'format': 'pdf',
+            'sha256': digest
+        }
 
-def extract_text_with_pypdf(input_path: Path, output_dir: Path, pages: list[int] | None = None):
-    """Extract text from PDF pages using pypdf."""
-    from pypdf import PdfReader
 
-    reader = PdfReader(input_path)
+def iter_text_with_pypdf(reader, input_path: Path, output_dir: Path, pages: list[int] | None = None):
+    """Yield a record for each page extracted with pypdf as soon as it is written."""
     total_pages = len(reader.pages)
 
     if pages is None:
-        pages = list(range(total_pages))
+        pages = range(total_pages)
 
-    results = []
     for i in pages:
         if i >= total_pages:
             continue
@@ -93,34 +124,30 @@ def extract_text_with_pypdf(input_path: Path, output_dir: Path, pages: list[int]
         text = reader.pages[i].extract_text() or ""
 
         output_path = output_dir / f"page_{i+1:04d}.md"
-        with open(output_path, 'w', encoding='utf-8') as f:
+        with io.StringIO() as f:
             f.write(f"---\n")
             f.write(f"page: {i + 1}\n")
             f.write(f"source: {input_path.name}\n")
             f.write(f"---\n\n")
             f.write(text)
+            digest = write_page_file(output_path, f.getvalue().encode('utf-8'))
 
-        results.append({
+        yield {
             'page': i + 1,
             'path': output_path,
             'format': 'markdown',
-            'text_length': len(text)
-        })
-
-    return results, total_pages
-
+            'text_length': len(text),
+            'sha256': digest
+        }
 
-def extract_text_with_pymupdf(input_path: Path, output_dir: Path, pages: list[int] | None = None):
-    """Extract text from PDF pages using PyMuPDF (better quality)."""
-    import pymupdf
 
-    doc = pymupdf.open(input_path)
+def iter_text_with_pymupdf(doc, input_path: Path, output_dir: Path, pages: list[int] | None = None):
+    """Yield a record for each page extracted with PyMuPDF as soon as it is written."""
     total_pages = len(doc)
 
     if pages is None:
-        pages = list(range(total_pages))
+        pages = range(total_pages)
 
-    results = []
     for i in pages:
         if i >= total_pages:
             continue
@@ -129,99 +156,285 @@ def extract_text_with_pymupdf(input_path: Path, output_dir: Path, pages: list[in
         text = page.get_text()
 
         output_path = output_dir / f"page_{i+1:04d}.md"
-        with open(output_path, 'w', encoding='utf-8') as f:
+        with io.StringIO() as f:
+            f.write(f"---\n")
+            f.write(f"page: {i + 1}\n")
+            f.write(f"source: {input_path.name}\n")
+            f.write(f"---\n\n")
+            f.write(text)
+            digest = write_page_file(output_path, f.getvalue().encode('utf-8'))
+
+        yield {
+            'page': i + 1,
+            'path': output_path,
+            'format': 'markdown',
+            'text_length': len(text),
+            'sha256': digest
+        }
+
+
+def iter_text_with_pdfplumber(pdf, input_path: Path, output_dir: Path, pages: list[int] | None = None):
+    """Yield a record for each page extracted with pdfplumber as soon as it is written."""
+    total_pages = len(pdf.pages)
+
+    if pages is None:
+        pages = range(total_pages)
+
+    for i in pages:
+        if i >= total_pages:
+            continue
+
+        page = pdf.pages[i]
+        text = page.extract_text() or ""
+
+        # Also try to extract tables
+        tables = page.extract_tables()
+
+        output_path = output_dir / f"page_{i+1:04d}.md"
+        with io.StringIO() as f:
             f.write(f"---\n")
             f.write(f"page: {i + 1}\n")
             f.write(f"source: {input_path.name}\n")
+            f.write(f"has_tables: {len(tables) > 0}\n")
             f.write(f"---\n\n")
             f.write(text)
 
-        results.append({
+            if tables:
+                f.write("\n\n## Tables\n\n")
+                for idx, table in enumerate(tables):
+                    f.write(f"### Table {idx + 1}\n\n")
+                    for row in table:
+                        f.write("| " + " | ".join(str(cell or '') for cell in row) + " |\n")
+                    f.write("\n")
+
+            digest = write_page_file(output_path, f.getvalue().encode('utf-8'))
+
+        # pdfplumber caches parsed layout objects per page; drop them so
+        # memory stays flat on long documents
+        page.flush_cache()
+
+        yield {
             'page': i + 1,
             'path': output_path,
             'format': 'markdown',
-            'text_length': len(text)
-        })
+            'text_length': len(text),
+            'tables': len(tables),
+            'sha256': digest
+        }
+
+
+# Page iterators keyed by (format, library)
+PAGE_ITERATORS = {
+    ('pdf', 'pypdf'): iter_split_with_pypdf,
+    ('markdown', 'pypdf'): iter_text_with_pypdf,
+    ('markdown', 'pymupdf'): iter_text_with_pymupdf,
+    ('markdown', 'pdfplumber'): iter_text_with_pdfplumber,
+}
+
+
+def stream_pages(handle, lib: str, input_path: Path, output_dir: Path,
+                 pages: list[int] | None = None, fmt: str = 'markdown'):
+    """
+    Yield page records one at a time from an open document.
+
+    Nothing is accumulated between pages, so memory use does not grow with
+    page count and callers can start on page 1 while later pages are still
+    being extracted.
+    """
+    iterator = PAGE_ITERATORS[('pdf' if fmt == 'pdf' else 'markdown', lib)]
+    yield from iterator(handle, input_path, output_dir, pages)
+
 
-    doc.close()
+def _extract_all(lib: str, fmt: str, input_path: Path, output_dir: Path, pages: list[int] | None):
+    """Open a document, extract the requested pages and return (results, total_pages)."""
+    handle = open_document(lib, input_path)
+    try:
+        results = list(stream_pages(handle, lib, input_path, output_dir, pages, fmt))
+        total_pages = len(handle) if lib == 'pymupdf' else len(handle.pages)
+    finally:
+        close_document(handle)
     return results, total_pages
 
 
+def split_with_pypdf(input_path: Path, output_dir: Path, pages: list[int] | None = None):
+    """Split PDF using pypdf (pure Python, no dependencies)."""
+    return _extract_all('pypdf', 'pdf', input_path, output_dir, pages)
+
+
+def extract_text_with_pypdf(input_path: Path, output_dir: Path, pages: list[int] | None = None):
+    """Extract text from PDF pages using pypdf."""
+    return _extract_all('pypdf', 'markdown', input_path, output_dir, pages)
+
+
+def extract_text_with_pymupdf(input_path: Path, output_dir: Path, pages: list[int] | None = None):
+    """Extract text from PDF pages using PyMuPDF (better quality)."""
+    return _extract_all('pymupdf', 'markdown', input_path, output_dir, pages)
+
+
 def extract_text_with_pdfplumber(input_path: Path, output_dir: Path, pages: list[int] | None = None):
     """Extract text from PDF pages using pdfplumber (best for tables)."""
-    import pdfplumber
-
-    results = []
-    with pdfplumber.open(input_path) as pdf:
-        total_pages = len(pdf.pages)
-
-        if pages is None:
-            pages = list(range(total_pages))
-
-        for i in pages:
-            if i >= total_pages:
-                continue
-
-            page = pdf.pages[i]
-            text = page.extract_text() or ""
-
-            # Also try to extract tables
-            tables = page.extract_tables()
-
-            output_path = output_dir / f"page_{i+1:04d}.md"
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(f"---\n")
-                f.write(f"page: {i + 1}\n")
-                f.write(f"source: {input_path.name}\n")
-                f.write(f"has_tables: {len(tables) > 0}\n")
-                f.write(f"---\n\n")
-                f.write(text)
-
-                if tables:
-                    f.write("\n\n## Tables\n\n")
-                    for idx, table in enumerate(tables):
-                        f.write(f"### Table {idx + 1}\n\n")
-                        for row in table:
-                            f.write("| " + " | ".join(str(cell or '') for cell in row) + " |\n")
-                        f.write("\n")
-
-            results.append({
-                'page': i + 1,
-                'path': output_path,
-                'format': 'markdown',
-                'text_length': len(text),
-                'tables': len(tables)
-            })
+    return _extract_all('pdfplumber', 'markdown', input_path, output_dir, pages)
+
+
+def split_page_batches(pages: list[int], workers: int) -> list[list[int]]:
+    """Split pages into contiguous, order-preserving batches for a worker pool."""
+    if not pages:
+        return []
+    # A few batches per worker keeps the pool busy when some pages are slow
+    batch_size = max(1, -(-len(pages) // (workers * 4)))
+    return [pages[i:i + batch_size] for i in range(0, len(pages), batch_size)]
+
+
+def iter_in_parallel(extract_fn, input_path: Path, output_dir: Path,
+                     pages: list[int] | None, total_pages: int, workers: int):
+    """
+    Run an extractor across a process pool, yielding records in page order.
+
+    Each batch is handed to `extract_fn` in a worker process, which opens its
+    own document handle. Batches are yielded in submission order, so the
+    records match a serial run exactly.
+    """
+    if pages is None:
+        pages = list(range(total_pages))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(extract_fn, input_path, output_dir, batch)
+            for batch in split_page_batches(pages, workers)
+        ]
+        for future in futures:
+            batch_results, _ = future.result()
+            yield from batch_results
 
+
+def extract_in_parallel(extract_fn, input_path: Path, output_dir: Path,
+                        pages: list[int] | None, total_pages: int, workers: int):
+    """Run an extractor across a process pool and return (results, total_pages)."""
+    results = list(iter_in_parallel(extract_fn, input_path, output_dir, pages, total_pages, workers))
     return results, total_pages
 
 
-def get_pdf_info(input_path: Path):
-    """Get basic PDF info without loading entire document."""
+def read_toc(input_path: Path) -> list:
+    """Table of contents as (level, title, page) via pymupdf, empty without it."""
+    if not check_dependencies().get('pymupdf'):
+        return []
+    import pymupdf
+    with pymupdf.open(input_path) as doc:
+        return doc.get_toc()
+
+
+def document_info(handle, lib: str, input_path: Path) -> dict:
+    """
+    Read page count, metadata and TOC from a handle returned by open_document.
+
+    pypdf and pdfplumber don't easily expose the TOC, so for their handles it
+    is still read with pymupdf when installed. The TOC, and so _toc.md, is
+    then the same whatever library or worker count extracts the pages.
+    """
+    if lib == 'pymupdf':
+        return {
+            'total_pages': len(handle),
+            'metadata': handle.metadata,
+            'toc': handle.get_toc()  # Table of contents if available
+        }
+    return {
+        'total_pages': len(handle.pages),
+        'metadata': dict(handle.metadata) if handle.metadata else {},
+        'toc': read_toc(input_path)
+    }
+
+
+def get_pdf_info(input_path: Path, handle=None, lib: str | None = None):
+    """
+    Get basic PDF info without loading entire document.
+
+    An already-open `handle` from `open_document` is read with its own `lib`
+    instead of opening the file again; without one, the file is opened with
+    pymupdf, else pypdf.
+    """
+    if handle is not None:
+        return document_info(handle, lib, input_path)
+
     available = check_dependencies()
+    lib = next((name for name in ('pymupdf', 'pypdf') if available.get(name)), None)
+    if lib is None:
+        raise RuntimeError("No PDF library available. Install: pip install pypdf")
+
+    doc = open_document(lib, input_path)
+    try:
+        return document_info(doc, lib, input_path)
+    finally:
+        close_document(doc)
+
+
+def file_sha256(path: Path) -> str:
+    """Hash a file in blocks without reading it into memory at once."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def library_version(lib: str) -> str:
+    """Return the installed version of a PDF library."""
+    try:
+        return importlib.metadata.version(lib)
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def load_manifest(output_dir: Path) -> dict:
+    """Load the extraction manifest from an output directory (empty if missing)."""
+    try:
+        return json.loads((output_dir / MANIFEST_FILE).read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_manifest(output_dir: Path, manifest: dict):
+    """Write the extraction manifest atomically."""
+    manifest_path = output_dir / MANIFEST_FILE
+    tmp_path = manifest_path.with_suffix('.tmp')
+    tmp_path.write_text(json.dumps(manifest, indent=2))
+    os.replace(tmp_path, manifest_path)
+
+
+def manifest_entry(record: dict) -> dict:
+    """Convert a page record into its manifest entry."""
+    entry = {k: v for k, v in record.items() if k not in ('page', 'path', 'cached')}
+    entry['file'] = record['path'].name
+    return entry
 
-    if available.get('pymupdf'):
-        import pymupdf
-        doc = pymupdf.open(input_path)
-        info = {
-            'total_pages': len(doc),
-            'metadata': doc.metadata,
-            'toc': doc.get_toc()  # Table of contents if available
-        }
-        doc.close()
-        return info
-
-    if available.get('pypdf'):
-        from pypdf import PdfReader
-        reader = PdfReader(input_path)
-        info = {
-            'total_pages': len(reader.pages),
-            'metadata': dict(reader.metadata) if reader.metadata else {},
-            'toc': []  # pypdf doesn't easily expose TOC
-        }
-        return info
 
-    raise RuntimeError("No PDF library available. Install: pip install pypdf")
+def cached_record(manifest: dict, output_dir: Path, page_index: int) -> dict | None:
+    """
+    Return the cached record for a page if its file is still on disk unchanged.
+
+    The caller is responsible for checking that the manifest was produced from
+    the same PDF, library and library version.
+    """
+    entry = manifest.get('pages', {}).get(str(page_index + 1))
+    if not entry:
+        return None
+
+    path = output_dir / entry['file']
+    try:
+        if file_sha256(path) != entry['sha256']:
+            return None
+    except FileNotFoundError:
+        return None
+
+    record = {'page': page_index + 1, 'path': path}
+    record.update((k, v) for k, v in entry.items() if k != 'file')
+    record['cached'] = True
+    return record
+
+
+def page_record_json(record: dict, index: int, count: int) -> str:
+    """Serialize a page record as a JSONL progress line."""
+    data = {**record, 'path': str(record['path']), 'index': index, 'count': count}
+    return json.dumps(data)
 
 
 def parse_page_range(page_str: str, total_pages: int) -> list[int]:
@@ -257,6 +470,12 @@ Examples:
 
     # Extract specific pages
     python split_pdf.py document.pdf --output-dir chunks/ --pages 1,5,10-15
+
+    # Extract across 8 worker processes
+    python split_pdf.py document.pdf --output-dir chunks/ --workers 8
+
+    # Stream JSONL progress records to a downstream step
+    python split_pdf.py document.pdf --output-dir chunks/ --jsonl | next_step
         """
     )
 
@@ -272,49 +491,55 @@ Examples:
     parser.add_argument('--library', '-l',
                         choices=['auto', 'pypdf', 'pymupdf', 'pdfplumber'],
                         default='auto', help='PDF library to use (default: auto)')
+    parser.add_argument('--workers', '-w', type=int, default=1,
+                        help='Number of worker processes for extraction (default: 1)')
+    parser.add_argument('--force', action='store_true',
+                        help=f'Ignore {MANIFEST_FILE} and re-extract every page')
+    parser.add_argument('--jsonl', action='store_true',
+                        help='Print one JSON record per page to stdout as it is written '
+                             '(other output goes to stderr)')
 
     args = parser.parse_args()
 
+    # Keep stdout clean for JSONL consumers
+    log_file = sys.stderr if args.jsonl else sys.stdout
+
+    def log(*values):
+        print(*values, file=log_file)
+
+    if args.workers < 1:
+        log("Error: --workers must be at least 1")
+        sys.exit(1)
+
     if not args.input.exists():
-        print(f"Error: File not found: {args.input}")
+        log(f"Error: File not found: {args.input}")
         sys.exit(1)
 
     # Check available libraries
     available = check_dependencies()
-    print(f"Available PDF libraries: {[k for k, v in available.items() if v]}")
+    log(f"Available PDF libraries: {[k for k, v in available.items() if v]}")
 
     if not any(available.values()):
-        print("Error: No PDF library installed.")
-        print("Install one of: pip install pypdf pymupdf pdfplumber")
+        log("Error: No PDF library installed.")
+        log("Install one of: pip install pypdf pymupdf pdfplumber")
         sys.exit(1)
 
     # Show info only
     if args.info:
         info = get_pdf_info(args.input)
-        print(f"\nPDF Info: {args.input}")
-        print(f"  Total pages: {info['total_pages']}")
-        print(f"  Metadata: {info.get('metadata', {})}")
+        log(f"\nPDF Info: {args.input}")
+        log(f"  Total pages: {info['total_pages']}")
+        log(f"  Metadata: {info.get('metadata', {})}")
         if info.get('toc'):
-            print(f"\n  Table of Contents:")
+            log(f"\n  Table of Contents:")
             for level, title, page in info['toc']:
                 indent = "  " * level
-                print(f"    {indent}{title} (page {page})")
+                log(f"    {indent}{title} (page {page})")
         return
 
     # Create output directory
     args.output_dir.mkdir(parents=True, exist_ok=True)
 
-    # Get total pages first
-    info = get_pdf_info(args.input)
-    total_pages = info['total_pages']
-    print(f"PDF has {total_pages} pages")
-
-    # Parse page range
-    pages = None
-    if args.pages:
-        pages = parse_page_range(args.pages, total_pages)
-        print(f"Processing pages: {[p+1 for p in pages]}")
-
     # Select library and function
     if args.library == 'auto':
         # Prefer pymupdf > pdfplumber > pypdf for text extraction
@@ -330,50 +555,128 @@ Examples:
     else:
         lib = args.library
         if not available.get(lib):
-            print(f"Error: {lib} not installed")
+            log(f"Error: {lib} not installed")
             sys.exit(1)
 
-    print(f"Using library: {lib}")
-
-    # Process
     if args.format == 'pdf':
         if lib != 'pypdf':
-            print("Note: PDF splitting only supported with pypdf, switching...")
-        results, total = split_with_pypdf(args.input, args.output_dir, pages)
+            log("Note: PDF splitting only supported with pypdf, switching...")
+        lib = 'pypdf'
+        extract_fn = split_with_pypdf
+    elif lib == 'pymupdf':
+        extract_fn = extract_text_with_pymupdf
+    elif lib == 'pdfplumber':
+        extract_fn = extract_text_with_pdfplumber
     else:
-        if lib == 'pymupdf':
-            results, total = extract_text_with_pymupdf(args.input, args.output_dir, pages)
-        elif lib == 'pdfplumber':
-            results, total = extract_text_with_pdfplumber(args.input, args.output_dir, pages)
-        else:
-            results, total = extract_text_with_pypdf(args.input, args.output_dir, pages)
+        extract_fn = extract_text_with_pypdf
+
+    # The manifest is only trusted for the same PDF bytes, library and version
+    fmt = 'pdf' if args.format == 'pdf' else 'markdown'
+    cache_key = {
+        'source': args.input.name,
+        'pdf_sha256': file_sha256(args.input),
+        'library': lib,
+        'library_version': library_version(lib),
+        'format': fmt,
+    }
+    manifest = load_manifest(args.output_dir)
+    use_cache = not args.force and all(manifest.get(k) == v for k, v in cache_key.items())
+
+    handle = None
+    if use_cache:
+        info = {'total_pages': manifest['total_pages'], 'toc': manifest['toc']}
+    else:
+        # Open the document once and read page count and TOC from the same handle
+        if args.workers == 1:
+            handle = open_document(lib, args.input)
+        info = get_pdf_info(args.input, handle, lib)
+    total_pages = info['total_pages']
+    log(f"PDF has {total_pages} pages")
+
+    # Parse page range
+    pages = None
+    if args.pages:
+        pages = parse_page_range(args.pages, total_pages)
+        log(f"Processing pages: {[p+1 for p in pages]}")
+
+    log(f"Using library: {lib}")
+
+    requested = pages if pages is not None else list(range(total_pages))
+    cached = {}
+    if use_cache:
+        for i in requested:
+            record = cached_record(manifest, args.output_dir, i)
+            if record:
+                cached[i] = record
+    pending = [i for i in requested if i not in cached]
+    if cached:
+        log(f"Unchanged pages (cached): {len(cached)}")
+
+    # Process
+    if not pending:
+        extracted = iter(())
+    elif args.workers > 1:
+        log(f"Using {args.workers} worker processes")
+        extracted = iter_in_parallel(
+            extract_fn, args.input, args.output_dir, pending, total_pages, args.workers
+        )
+    else:
+        if handle is None:
+            handle = open_document(lib, args.input)
+        extracted = stream_pages(handle, lib, args.input, args.output_dir, pending, fmt)
+    records = heapq.merge(cached.values(), extracted, key=lambda r: r['page'])
+
+    # Consume records as they are written; only the first few are kept for the summary
+    entries = manifest.get('pages', {}) if use_cache else {}
+    count = len(requested)
+    processed = 0
+    first_results = []
+    try:
+        for record in records:
+            if args.jsonl:
+                print(page_record_json(record, processed, count), flush=True)
+            if len(first_results) < 5:
+                first_results.append(record)
+            entries[str(record['page'])] = manifest_entry(record)
+            processed += 1
+    finally:
+        if handle is not None:
+            close_document(handle)
+
+    save_manifest(args.output_dir, {
+        **cache_key,
+        'total_pages': total_pages,
+        'toc': info.get('toc') or [],
+        'pages': entries,
+    })
 
     # Summary
-    print(f"\nProcessed {len(results)} pages")
-    print(f"Output directory: {args.output_dir}")
+    log(f"\nProcessed {processed} pages ({len(cached)} unchanged)")
+    log(f"Output directory: {args.output_dir}")
 
-    if results:
-        print(f"\nFirst few files:")
-        for r in results[:5]:
+    if first_results:
+        log(f"\nFirst few files:")
+        for r in first_results:
             extra = ""
             if 'text_length' in r:
                 extra = f" ({r['text_length']} chars)"
             if r.get('tables'):
                 extra += f" [{r['tables']} tables]"
-            print(f"  {r['path'].name}{extra}")
-        if len(results) > 5:
-            print(f"  ... and {len(results) - 5} more")
+            log(f"  {r['path'].name}{extra}")
+        if processed > 5:
+            log(f"  ... and {processed - 5} more")
 
     # Save TOC if available
     if info.get('toc'):
         toc_path = args.output_dir / '_toc.md'
-        with open(toc_path, 'w') as f:
+        with io.StringIO() as f:
             f.write(f"# Table of Contents\n\n")
             f.write(f"Source: {args.input.name}\n\n")
             for level, title, page in info['toc']:
                 indent = "  " * (level - 1)
                 f.write(f"{indent}- [{title}](page_{page:04d}.md) (page {page})\n")
-        print(f"\nTable of contents saved to: {toc_path}")
+            write_page_file(toc_path, f.getvalue().encode('utf-8'))
+        log(f"\nTable of contents saved to: {toc_path}")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Stub OpenAI-compatible LLM server for running experiments locally
+
+Serves POST /v1/chat/completions with canned, deterministic responses after
+a fixed --latency, so run_experiment.py can be exercised (and its
+concurrency measured) without API keys or cost:
+
+- requests with tools: the first turn calls register_metadata, the turn
+  after the tool result answers with text
+- requests with response_format json_object (the judge): a JSON object
+  with every score field of the evaluator schema filled in, derived from a
+  hash of the request so reruns give identical metrics
+- anything else: a short text answer
+
+--error-rate makes that fraction of requests fail with 429 (and a
+Retry-After header) to exercise retries. Every request is handled on its own
+thread, so throughput is only bounded by the client.
+
+Usage:
+    python scripts/stub_llm_server.py --port 8089
+    python scripts/stub_llm_server.py --port 8089 --latency 0.5 --error-rate 0.05
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from run_experiment import JUDGE_SCHEMA_MARKER
+
+
+def stable_fraction(text: str, salt: str = '') -> float:
+    """Deterministic value in [0, 1) for a string."""
+    digest = hashlib.sha256((salt + text).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') / 2 ** 64
+
+
+def judge_response(request_text: str, properties: dict) -> dict:
+    """Fill every property of the evaluator schema with a plausible value."""
+    result = {}
+    for name, spec in properties.items():
+        kind = spec.get('type')
+        value = stable_fraction(request_text, name)
+        if kind == 'number':
+            result[name] = round(0.5 + value / 2, 3)
+        elif kind == 'integer':
+            result[name] = int(value * 10)
+        elif kind == 'boolean':
+            result[name] = value > 0.2
+        elif kind == 'array':
+            result[name] = []
+        elif 'enum' in spec:
+            result[name] = spec['enum'][int(value * len(spec['enum']))]
+        else:
+            result[name] = f'stub {name}'
+    return result
+
+
+def completion(request: dict) -> dict:
+    messages = request.get('messages', [])
+    last = messages[-1] if messages else {}
+    request_text = json.dumps(messages, sort_keys=True)
+    message = {'role': 'assistant', 'content': None}
+
+    if (request.get('response_format') or {}).get('type') == 'json_object':
+        # The judge appends the evaluator properties as JSON to its instructions
+        system = messages[0].get('content', '') if messages else ''
+        _, marker, schema = system.rpartition(JUDGE_SCHEMA_MARKER)
+        properties = json.loads(schema) if marker else {}
+        message['content'] = json.dumps(judge_response(request_text, properties))
+    elif request.get('tools') and last.get('role') != 'tool':
+        tool = request['tools'][0]['function']['name']
+        arguments = {
+            'confidence': round(0.6 + stable_fraction(request_text) * 0.4, 2),
+            'risk_level': 'green',
+            'risk_reasoning': 'Stub answer',
+            'extra': {'category': 'general', 'tone': 'educational', 'key_facts': []},
+        }
+        message['tool_calls'] = [{
+            'id': 'call_' + hashlib.sha256(request_text.encode('utf-8')).hexdigest()[:12],
+            'type': 'function',
+            'function': {'name': tool, 'arguments': json.dumps(arguments)},
+        }]
+    else:
+        question = next((m.get('content') for m in reversed(messages) if m.get('role') == 'user'), '')
+        message['content'] = f"Stub answer to: {question}"
+
+    return {
+        'id': 'chatcmpl-stub',
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': request.get('model', 'stub'),
+        'choices': [{'index': 0, 'message': message,
+                     'finish_reason': 'tool_calls' if message.get('tool_calls') else 'stop'}],
+        'usage': {'prompt_tokens': len(request_text) // 4, 'completion_tokens': 20,
+                  'total_tokens': len(request_text) // 4 + 20},
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 0.2
+    error_rate = 0.0
+    requests = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self.send_error(404)
+            return
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        with StubHandler.lock:
+            StubHandler.requests += 1
+        time.sleep(self.latency)
+
+        if random.random() < self.error_rate:
+            self.send_response(429)
+            self.send_header('Retry-After', '0.1')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        payload = json.dumps(completion(json.loads(body))).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # Room for many concurrent client connections
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stub OpenAI-compatible chat completions server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.2, help='Seconds per request (default: 0.2)')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='Fraction of requests answered with 429 (default: 0)')
+    args = parser.parse_args()
+
+    StubHandler.latency = args.latency
+    StubHandler.error_rate = args.error_rate
+    server = StubServer((args.host, args.port), StubHandler)
+    print(f"Stub LLM server on http://{args.host}:{args.port}/v1 "
+          f"(latency {args.latency}s, error rate {args.error_rate})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Served {StubHandler.requests} requests")
+
+
+if __name__ == '__main__':
+    main()
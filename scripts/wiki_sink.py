@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Postgres sink for generated wiki pages
+
+Upserts wiki pages straight into the REM `resources` table, so a wiki can be
+loaded without writing markdown to disk and running a separate load pass.
+
+Mapping (one row per page):
+- id          deterministic uuid5 of tenant + entity key, so re-runs update
+              the same rows
+- name        entity_key (the kv_store trigger uses it as the LOOKUP key)
+- uri         page filename relative to the wiki root
+- ordinal     first source page
+- content     markdown body (title heading + content, no frontmatter)
+- category    'wiki'
+- metadata    frontmatter fields (entity_key, title, parent, source, ...)
+- graph_edges parent / child / related edges keyed by entity_key
+- tags        page tags
+
+Rows are sent as multi-row `INSERT ... ON CONFLICT (id) DO UPDATE` statements
+in one transaction. Rows whose values are unchanged are left alone, so the
+kv_store trigger only fires for pages that actually changed.
+
+With an embedding provider (see embedding_cache.py), page content is also
+embedded into embeddings_resources; pages whose content hash is unchanged
+are skipped without calling the provider.
+
+Requires psycopg 3:
+    pip install "psycopg[binary]"
+"""
+
+import json
+import uuid
+
+from embedding_cache import EmbedStats, embed_rows
+
+try:
+    import psycopg
+except ImportError:
+    psycopg = None
+
+
+RESOURCE_COLUMNS = ('id', 'tenant_id', 'name', 'uri', 'ordinal', 'content', 'category', 'metadata', 'graph_edges', 'tags')
+ROW_PLACEHOLDER = '(%s, %s, %s, %s, %s, %s, %s, %s::jsonb, %s::jsonb, %s)'
+UPDATE_COLUMNS = RESOURCE_COLUMNS[2:]
+
+UPSERT_SQL = """
+INSERT INTO resources ({columns})
+VALUES {{values}}
+ON CONFLICT (id) DO UPDATE SET
+    {assignments},
+    updated_at = CURRENT_TIMESTAMP,
+    deleted_at = NULL
+WHERE ({current}, resources.deleted_at) IS DISTINCT FROM ({excluded}, NULL)
+RETURNING (xmax = 0) AS inserted
+""".format(
+    columns=', '.join(RESOURCE_COLUMNS),
+    assignments=',\n    '.join(f"{c} = EXCLUDED.{c}" for c in UPDATE_COLUMNS),
+    current=', '.join(f"resources.{c}" for c in UPDATE_COLUMNS),
+    excluded=', '.join(f"EXCLUDED.{c}" for c in UPDATE_COLUMNS),
+)
+
+
+def check_available() -> str | None:
+    """Return an error message if the sink cannot be used."""
+    if psycopg is None:
+        return "psycopg is required for the postgres sink: pip install 'psycopg[binary]'"
+    return None
+
+
+def resource_id(tenant_id: str, entity_key: str) -> str:
+    """Deterministic resource id for a wiki page."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"rem://{tenant_id}/resources/{entity_key}"))
+
+
+def page_graph_edges(page) -> list[dict]:
+    """Map a page's parent, children and related keys to graph edges."""
+    edges = []
+    if page.parent:
+        edges.append({'dst': page.parent, 'rel_type': 'parent', 'weight': 1.0, 'properties': {}})
+    for child in page.children:
+        edges.append({'dst': child, 'rel_type': 'child', 'weight': 1.0, 'properties': {}})
+    for related in page.related:
+        if related != page.entity_key:
+            edges.append({'dst': related, 'rel_type': 'related', 'weight': 1.0, 'properties': {}})
+    return edges
+
+
+def resource_row(page, tenant_id: str, metadata: dict, content: str) -> tuple:
+    """Build a `resources` row (in RESOURCE_COLUMNS order) for a wiki page."""
+    return (
+        resource_id(tenant_id, page.entity_key),
+        tenant_id,
+        page.entity_key,
+        page.filename,
+        page.page_start,
+        content,
+        'wiki',
+        json.dumps(metadata),
+        json.dumps(page_graph_edges(page)),
+        list(page.tags),
+    )
+
+
+def upsert_resources(conn, rows: list[tuple], batch_size: int = 500) -> tuple[int, int, int]:
+    """
+    Upsert rows into `resources` with multi-row INSERT ... ON CONFLICT.
+
+    When several rows share an id, the last one wins. The caller owns the
+    transaction. Returns (inserted, updated, unchanged) counts.
+    """
+    rows = list({row[0]: row for row in rows}.values())
+    inserted = updated = 0
+    with conn.cursor() as cur:
+        for i in range(0, len(rows), batch_size):
+            batch = rows[i:i + batch_size]
+            sql = UPSERT_SQL.format(values=', '.join([ROW_PLACEHOLDER] * len(batch)))
+            cur.execute(sql, [value for row in batch for value in row])
+            for (was_inserted,) in cur.fetchall():
+                if was_inserted:
+                    inserted += 1
+                else:
+                    updated += 1
+    return inserted, updated, len(rows) - inserted - updated
+
+
+def write_pages_to_postgres(database_url: str, rows: list[tuple], batch_size: int = 500) -> tuple[int, int, int]:
+    """Upsert resource rows in a single transaction."""
+    with psycopg.connect(database_url) as conn:
+        return upsert_resources(conn, rows, batch_size)
+
+
+def embed_pages_in_postgres(database_url: str, rows: list[tuple], provider) -> EmbedStats:
+    """Embed the content of resource rows in a single transaction."""
+    id_index, content_index = RESOURCE_COLUMNS.index('id'), RESOURCE_COLUMNS.index('content')
+    with psycopg.connect(database_url) as conn:
+        return embed_rows(conn, 'resources', [(row[id_index], 'content', row[content_index]) for row in rows],
+                          provider)
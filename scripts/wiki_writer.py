@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Rendering and write helpers shared by the wiki generators
+
+Pages are rendered (frontmatter + body) up front, optionally across a process
+pool, and then written as one batch:
+
+- Pages whose rendered bytes already match the file on disk are skipped, so
+  their mtimes do not change and file watchers / re-ingest jobs stay quiet.
+- Changed pages are first written and fsynced into a staging directory inside
+  the output directory. Only when every page has been staged are they moved
+  into place with os.replace, so a failure while rendering or staging leaves
+  the existing wiki untouched.
+
+The output directory also holds unrelated content (e.g. chunks/), so the swap
+is done per file rather than by renaming the whole directory; each file
+replacement is atomic.
+"""
+
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Below this many pages, starting worker processes costs more than it saves
+PARALLEL_MIN_PAGES = 64
+
+
+def render_pages(pages: list, render_fn, workers: int = 1) -> list[tuple[str, str]]:
+    """
+    Render pages to (relative_path, text) pairs, preserving input order.
+
+    `render_fn` must be a module-level function so it can be sent to worker
+    processes when `workers` > 1.
+    """
+    if workers <= 1 or len(pages) < PARALLEL_MIN_PAGES:
+        return [render_fn(page) for page in pages]
+
+    chunksize = max(1, len(pages) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(render_fn, pages, chunksize=chunksize))
+
+
+def _unchanged_on_disk(path: Path, data: bytes) -> bool:
+    """Check whether a file already holds exactly these bytes."""
+    try:
+        return path.stat().st_size == len(data) and path.read_bytes() == data
+    except FileNotFoundError:
+        return False
+
+
+def write_pages_atomically(output_dir: Path, rendered: list[tuple[str, str]]) -> tuple[list[str], list[str]]:
+    """
+    Stage changed pages in a temp directory and move them into place.
+
+    When two pages render to the same path, the later one wins, matching the
+    behaviour of writing them one after another.
+
+    Returns (written, unchanged) lists of relative paths.
+    """
+    final = {}
+    for rel_path, text in rendered:
+        final[str(rel_path)] = text.encode('utf-8')
+
+    changed = []
+    unchanged = []
+    for rel_path, data in final.items():
+        if _unchanged_on_disk(output_dir / rel_path, data):
+            unchanged.append(rel_path)
+        else:
+            changed.append((rel_path, data))
+
+    if not changed:
+        return [], unchanged
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    staging_dir = Path(tempfile.mkdtemp(prefix='.wiki-staging-', dir=output_dir))
+    try:
+        staged = []
+        for i, (rel_path, data) in enumerate(changed):
+            staged_path = staging_dir / f"{i:06d}.md"
+            with open(staged_path, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            staged.append((staged_path, output_dir / rel_path))
+
+        for staged_path, target in staged:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(staged_path, target)
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+    return [rel_path for rel_path, _ in changed], unchanged
@@ -1,47 +1,79 @@
 -- Background index creation
 -- Run AFTER initial data load to avoid blocking writes
+--
+-- Statements are in build priority order: the most queried tables first, so
+-- search on them is fast as early as possible. m and ef_construction are set
+-- per table; larger values give better recall at the cost of build time and
+-- index size.
+--
+-- Run with psql, or with scripts/build_indexes.py to build several indexes
+-- at once, report progress and rebuild INVALID indexes left behind by
+-- interrupted builds:
+--
+--   python scripts/build_indexes.py --concurrency 2
+--
+-- Builds use the server's maintenance_work_mem and
+-- max_parallel_maintenance_workers. HNSW builds are much faster when the
+-- graph fits in maintenance_work_mem; raise it per build with
+-- build_indexes.py, budgeting concurrency x maintenance_work_mem of memory:
+--
+--   python scripts/build_indexes.py --concurrency 2 \
+--       --maintenance-work-mem 2GB --parallel-workers 2
+--
+-- Parallel builds allocate shared memory in /dev/shm, which is 64MB by
+-- default in Docker: start the container with --shm-size (e.g. 2g) or keep
+-- --parallel-workers 0.
+
+-- HNSW vector index for embeddings_resources
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_resources_vector_hnsw
+ON embeddings_resources
+USING hnsw (embedding vector_cosine_ops)
+WITH (m = 24, ef_construction = 128);
+
+-- HNSW vector index for embeddings_moments
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_moments_vector_hnsw
+ON embeddings_moments
+USING hnsw (embedding vector_cosine_ops)
+WITH (m = 16, ef_construction = 100);
+
+-- HNSW vector index for embeddings_messages
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_messages_vector_hnsw
+ON embeddings_messages
+USING hnsw (embedding vector_cosine_ops)
+WITH (m = 16, ef_construction = 100);
+
+-- HNSW vector index for embeddings_sessions
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_sessions_vector_hnsw
+ON embeddings_sessions
+USING hnsw (embedding vector_cosine_ops)
+WITH (m = 16, ef_construction = 64);
 
 -- HNSW vector index for embeddings_files
 CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_files_vector_hnsw
 ON embeddings_files
-USING hnsw (embedding vector_cosine_ops);
+USING hnsw (embedding vector_cosine_ops)
+WITH (m = 16, ef_construction = 64);
 
 -- HNSW vector index for embeddings_image_resources
 CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_image_resources_vector_hnsw
 ON embeddings_image_resources
-USING hnsw (embedding vector_cosine_ops);
-
--- HNSW vector index for embeddings_messages
-CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_messages_vector_hnsw
-ON embeddings_messages
-USING hnsw (embedding vector_cosine_ops);
-
--- HNSW vector index for embeddings_moments
-CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_moments_vector_hnsw
-ON embeddings_moments
-USING hnsw (embedding vector_cosine_ops);
+USING hnsw (embedding vector_cosine_ops)
+WITH (m = 16, ef_construction = 64);
 
 -- HNSW vector index for embeddings_ontology_configs
 CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_ontology_configs_vector_hnsw
 ON embeddings_ontology_configs
-USING hnsw (embedding vector_cosine_ops);
-
--- HNSW vector index for embeddings_resources
-CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_resources_vector_hnsw
-ON embeddings_resources
-USING hnsw (embedding vector_cosine_ops);
+USING hnsw (embedding vector_cosine_ops)
+WITH (m = 16, ef_construction = 64);
 
 -- HNSW vector index for embeddings_schemas
 CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_schemas_vector_hnsw
 ON embeddings_schemas
-USING hnsw (embedding vector_cosine_ops);
-
--- HNSW vector index for embeddings_sessions
-CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_sessions_vector_hnsw
-ON embeddings_sessions
-USING hnsw (embedding vector_cosine_ops);
+USING hnsw (embedding vector_cosine_ops)
+WITH (m = 16, ef_construction = 64);
 
 -- HNSW vector index for embeddings_users
 CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_users_vector_hnsw
 ON embeddings_users
-USING hnsw (embedding vector_cosine_ops);
+USING hnsw (embedding vector_cosine_ops)
+WITH (m = 16, ef_construction = 64);
@@ -0,0 +1,165 @@
+-- Quantized embedding search benchmark: recall@k and latency vs exact search
+--
+-- Seeds :rows 1536-dimensional embeddings (default 100k) into a scratch copy
+-- of `embeddings_resources` in the rem_bench schema, drawn around :clusters
+-- centroids so nearest neighbours are meaningful, plus :queries query
+-- vectors. Ground truth is an exact (sequential) top-:k per query. It then
+-- builds the float32, halfvec and binary HNSW indexes and reports, per search
+-- path and candidate count:
+--
+-- - recall@k against the exact results
+-- - mean latency per query
+--
+-- along with the size of each index. Requires pgvector 0.7+, with
+-- 007_embeddings_quantized_search.sql applied. rem_search_embeddings_quantized()
+-- resolves the table via search_path, so it runs against the scratch table.
+-- The schema is dropped at the end.
+--
+--   psql "$POSTGRES__CONNECTION_STRING" -v rows=100000 \
+--        -f src/rem/sql/benchmarks/embeddings_quantized_recall.sql
+
+\set ON_ERROR_STOP on
+\if :{?rows}
+\else
+    \set rows 100000
+\endif
+\if :{?clusters}
+\else
+    \set clusters 200
+\endif
+\if :{?queries}
+\else
+    \set queries 50
+\endif
+\if :{?k}
+\else
+    \set k 10
+\endif
+
+DROP SCHEMA IF EXISTS rem_bench CASCADE;
+CREATE SCHEMA rem_bench;
+SET search_path = rem_bench, public;
+SET maintenance_work_mem = '2GB';
+
+-- ----------------------------------------------------------------------------
+-- Seed
+-- ----------------------------------------------------------------------------
+
+CREATE TABLE rem_bench.embeddings_resources (LIKE public.embeddings_resources INCLUDING DEFAULTS);
+
+CREATE TABLE rem_bench.centroids AS
+SELECT c AS cluster,
+       (SELECT array_agg(random() * 2 - 1) FROM generate_series(1, 1536) WHERE c > 0)::vector(1536) AS embedding
+FROM generate_series(1, :clusters) AS c;
+
+-- Point = centroid + noise; the correlated subquery (g > 0) draws fresh
+-- noise for every row
+\echo Seeding :rows embeddings...
+\timing on
+INSERT INTO rem_bench.embeddings_resources (entity_id, field_name, embedding)
+SELECT
+    gen_random_uuid(),
+    'content',
+    c.embedding + (SELECT array_agg((random() * 2 - 1) * 0.6) FROM generate_series(1, 1536) WHERE g > 0)::vector(1536)
+FROM generate_series(1, :rows) AS g
+JOIN rem_bench.centroids c ON c.cluster = 1 + g % :clusters;
+\timing off
+
+CREATE TABLE rem_bench.queries AS
+SELECT
+    q AS query_id,
+    c.embedding + (SELECT array_agg((random() * 2 - 1) * 0.6) FROM generate_series(1, 1536) WHERE q > 0)::vector(1536) AS embedding
+FROM generate_series(1, :queries) AS q
+JOIN rem_bench.centroids c ON c.cluster = 1 + (q * 7) % :clusters;
+
+ANALYZE rem_bench.embeddings_resources;
+
+-- ----------------------------------------------------------------------------
+-- Ground truth: exact search (no vector indexes exist yet)
+-- ----------------------------------------------------------------------------
+
+\echo Exact top-:k for :queries queries...
+\timing on
+CREATE TABLE rem_bench.truth AS
+SELECT q.query_id, t.entity_id
+FROM rem_bench.queries q
+CROSS JOIN LATERAL (
+    SELECT e.entity_id FROM rem_bench.embeddings_resources e
+    ORDER BY e.embedding <=> q.embedding
+    LIMIT :k
+) t;
+\timing off
+
+-- Recall@k and mean latency of one search path over all queries. `search`
+-- is a query with $1 = query vector and $2 = k, returning entity_id.
+CREATE FUNCTION rem_bench.measure(label TEXT, search TEXT, k INTEGER)
+RETURNS VOID AS $$
+DECLARE
+    q RECORD;
+    started TIMESTAMPTZ;
+    total INTERVAL := INTERVAL '0';
+    hits BIGINT := 0;
+    found UUID[];
+    n_queries INTEGER := 0;
+BEGIN
+    FOR q IN SELECT query_id, embedding FROM rem_bench.queries ORDER BY query_id LOOP
+        started := clock_timestamp();
+        EXECUTE format('SELECT array_agg(entity_id) FROM (%s) s', search) INTO found USING q.embedding, k;
+        total := total + (clock_timestamp() - started);
+        hits := hits + (
+            SELECT count(*) FROM rem_bench.truth t
+            WHERE t.query_id = q.query_id AND t.entity_id = ANY(found)
+        );
+        n_queries := n_queries + 1;
+    END LOOP;
+    RAISE NOTICE '%: recall@% %  % ms/query', rpad(label, 36), k,
+        round(hits::numeric / (n_queries * k), 3),
+        round((EXTRACT(EPOCH FROM total) * 1000 / n_queries)::numeric, 3);
+END;
+$$ LANGUAGE plpgsql;
+
+-- ----------------------------------------------------------------------------
+-- Indexes
+-- ----------------------------------------------------------------------------
+
+\timing on
+CREATE INDEX idx_bench_vector_hnsw ON rem_bench.embeddings_resources
+USING hnsw (embedding vector_cosine_ops) WITH (m = 24, ef_construction = 128);
+CREATE INDEX idx_bench_halfvec_hnsw ON rem_bench.embeddings_resources
+USING hnsw ((embedding::halfvec(1536)) halfvec_cosine_ops) WITH (m = 24, ef_construction = 128);
+CREATE INDEX idx_bench_binary_hnsw ON rem_bench.embeddings_resources
+USING hnsw ((binary_quantize(embedding)::bit(1536)) bit_hamming_ops) WITH (m = 24, ef_construction = 128);
+\timing off
+ANALYZE rem_bench.embeddings_resources;
+
+SELECT indexrelid::regclass::text AS index, pg_size_pretty(pg_relation_size(indexrelid)) AS size
+FROM pg_index WHERE indrelid = 'rem_bench.embeddings_resources'::regclass
+UNION ALL
+SELECT 'table', pg_size_pretty(pg_total_relation_size('rem_bench.embeddings_resources'));
+
+-- ----------------------------------------------------------------------------
+-- Recall / latency
+-- ----------------------------------------------------------------------------
+
+SET enable_seqscan = off;
+
+SELECT rem_bench.measure('float32 hnsw (ef_search 40)', $q$
+    SELECT entity_id FROM embeddings_resources ORDER BY embedding <=> $1 LIMIT $2
+$q$, :k) \g /dev/null
+
+SELECT set_config('hnsw.ef_search', '200', false) \g /dev/null
+SELECT rem_bench.measure('float32 hnsw (ef_search 200)', $q$
+    SELECT entity_id FROM embeddings_resources ORDER BY embedding <=> $1 LIMIT $2
+$q$, :k) \g /dev/null
+RESET hnsw.ef_search;
+
+SELECT rem_bench.measure(format('%s, %s candidates', mode, candidates), format($q$
+    SELECT entity_id FROM rem_search_embeddings_quantized('embeddings_resources', $1, $2, %s, %L)
+$q$, candidates, mode), :k)
+FROM (VALUES ('halfvec', 40), ('halfvec', 100), ('halfvec', 200), ('halfvec', 400), ('halfvec', 800),
+             ('binary', 40), ('binary', 100), ('binary', 200), ('binary', 400), ('binary', 800))
+     AS runs(mode, candidates) \g /dev/null
+
+RESET enable_seqscan;
+RESET search_path;
+DROP SCHEMA rem_bench CASCADE;
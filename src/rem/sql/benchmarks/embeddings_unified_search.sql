@@ -0,0 +1,175 @@
+-- Cross-entity vector search benchmark: nine-table fan-out vs embeddings_unified
+--
+-- Seeds :rows 1536-dimensional embeddings (default 90k), split evenly over
+-- scratch copies of the nine embeddings_<table> tables in the rem_bench
+-- schema, and mirrors them into a scratch embeddings_unified. Every table
+-- gets an HNSW index with the same parameters. It then times a global top-:k
+-- over :queries query vectors two ways:
+--
+-- - fan-out: one ANN scan per table, merged with UNION ALL + ORDER BY
+-- - unified: rem_search_embeddings_all() from embeddings_unified.sql
+--
+-- and reports how many of each path's hits match an exact search. Needs
+-- src/rem/sql/embeddings_unified.sql applied (its HNSW index is not
+-- needed); rem_search_embeddings_all() resolves embeddings_unified via
+-- search_path, so it runs against the scratch table.
+-- The schema is dropped at the end.
+--
+--   psql "$POSTGRES__CONNECTION_STRING" -v rows=90000 \
+--        -f src/rem/sql/benchmarks/embeddings_unified_search.sql
+
+\set ON_ERROR_STOP on
+\if :{?rows}
+\else
+    \set rows 90000
+\endif
+\if :{?queries}
+\else
+    \set queries 50
+\endif
+\if :{?k}
+\else
+    \set k 10
+\endif
+
+DROP SCHEMA IF EXISTS rem_bench CASCADE;
+CREATE SCHEMA rem_bench;
+SET search_path = rem_bench, public;
+SET maintenance_work_mem = '1GB';
+
+CREATE TABLE rem_bench.entity_types AS
+SELECT ordinality::int AS type_no, entity_type
+FROM unnest(ARRAY['files', 'image_resources', 'messages', 'moments', 'ontology_configs',
+                  'resources', 'schemas', 'sessions', 'users']) WITH ORDINALITY AS t(entity_type);
+
+-- ----------------------------------------------------------------------------
+-- Seed
+-- ----------------------------------------------------------------------------
+
+-- Clustered points (centroid + noise) so nearest neighbours are meaningful
+CREATE TABLE rem_bench.centroids AS
+SELECT c AS cluster,
+       (SELECT array_agg(random() * 2 - 1) FROM generate_series(1, 1536) WHERE c > 0)::vector(1536) AS embedding
+FROM generate_series(1, 100) AS c;
+
+\echo Seeding :rows embeddings...
+\timing on
+CREATE TABLE rem_bench.seed AS
+SELECT
+    gen_random_uuid() AS id,
+    t.entity_type,
+    gen_random_uuid() AS entity_id,
+    c.embedding + (SELECT array_agg((random() * 2 - 1) * 0.6) FROM generate_series(1, 1536) WHERE g > 0)::vector(1536) AS embedding
+FROM generate_series(1, :rows) AS g
+JOIN rem_bench.entity_types t ON t.type_no = 1 + g % 9
+JOIN rem_bench.centroids c ON c.cluster = 1 + (g * 31) % 100;
+
+CREATE TABLE rem_bench.embeddings_unified (LIKE public.embeddings_unified INCLUDING DEFAULTS);
+INSERT INTO rem_bench.embeddings_unified (id, entity_type, entity_id, tenant_id, field_name, provider, model, embedding)
+SELECT id, entity_type, entity_id, 'tenant-0', 'content', 'openai', 'text-embedding-3-small', embedding
+FROM rem_bench.seed;
+
+DO $$
+DECLARE
+    t RECORD;
+BEGIN
+    FOR t IN SELECT entity_type FROM rem_bench.entity_types LOOP
+        EXECUTE format('CREATE TABLE rem_bench.%I (LIKE public.%I INCLUDING DEFAULTS)',
+                       'embeddings_' || t.entity_type, 'embeddings_' || t.entity_type);
+        EXECUTE format($sql$
+            INSERT INTO rem_bench.%I (id, entity_id, field_name, embedding)
+            SELECT id, entity_id, 'content', embedding FROM rem_bench.seed WHERE entity_type = %L
+        $sql$, 'embeddings_' || t.entity_type, t.entity_type);
+    END LOOP;
+END $$;
+\timing off
+
+CREATE TABLE rem_bench.queries AS
+SELECT
+    q AS query_id,
+    c.embedding + (SELECT array_agg((random() * 2 - 1) * 0.6) FROM generate_series(1, 1536) WHERE q > 0)::vector(1536) AS embedding
+FROM generate_series(1, :queries) AS q
+JOIN rem_bench.centroids c ON c.cluster = 1 + (q * 7) % 100;
+
+-- Exact global top-k (no vector indexes yet)
+CREATE TABLE rem_bench.truth AS
+SELECT q.query_id, t.id
+FROM rem_bench.queries q
+CROSS JOIN LATERAL (
+    SELECT u.id FROM rem_bench.embeddings_unified u
+    ORDER BY u.embedding <=> q.embedding
+    LIMIT :k
+) t;
+
+-- ----------------------------------------------------------------------------
+-- Indexes (same parameters everywhere)
+-- ----------------------------------------------------------------------------
+
+\echo Building HNSW indexes...
+\timing on
+DO $$
+DECLARE
+    t RECORD;
+BEGIN
+    FOR t IN SELECT entity_type FROM rem_bench.entity_types LOOP
+        EXECUTE format('CREATE INDEX ON rem_bench.%I USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)',
+                       'embeddings_' || t.entity_type);
+    END LOOP;
+END $$;
+CREATE INDEX ON rem_bench.embeddings_unified USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+\timing off
+ANALYZE;
+
+-- Fan-out query: one ANN scan per table, merged
+SELECT string_agg(format(
+    '(SELECT id, 1 - (embedding <=> $1) AS similarity FROM rem_bench.%I ORDER BY embedding <=> $1 LIMIT $2)',
+    'embeddings_' || entity_type), E'\nUNION ALL\n' ORDER BY type_no) AS fan_out_union
+FROM rem_bench.entity_types \gset
+
+-- Mean latency and hits matching the exact top-k. `search` is a query with
+-- $1 = query vector and $2 = k, returning id.
+CREATE FUNCTION rem_bench.measure(label TEXT, search TEXT, k INTEGER)
+RETURNS VOID AS $$
+DECLARE
+    q RECORD;
+    started TIMESTAMPTZ;
+    total INTERVAL := INTERVAL '0';
+    hits BIGINT := 0;
+    found UUID[];
+    n_queries INTEGER := 0;
+BEGIN
+    FOR q IN SELECT query_id, embedding FROM rem_bench.queries ORDER BY query_id LOOP
+        started := clock_timestamp();
+        EXECUTE format('SELECT array_agg(id) FROM (%s) s', search) INTO found USING q.embedding, k;
+        total := total + (clock_timestamp() - started);
+        hits := hits + (
+            SELECT count(*) FROM rem_bench.truth t
+            WHERE t.query_id = q.query_id AND t.id = ANY(found)
+        );
+        n_queries := n_queries + 1;
+    END LOOP;
+    RAISE NOTICE '%: recall@% %  % ms/query', rpad(label, 36), k,
+        round(hits::numeric / (n_queries * k), 3),
+        round((EXTRACT(EPOCH FROM total) * 1000 / n_queries)::numeric, 3);
+END;
+$$ LANGUAGE plpgsql;
+
+-- ----------------------------------------------------------------------------
+-- Fan-out vs unified
+-- ----------------------------------------------------------------------------
+
+SET enable_seqscan = off;
+
+SELECT rem_bench.measure('fan-out over 9 tables', format($q$
+    SELECT id FROM (%s) hits ORDER BY similarity DESC LIMIT $2
+$q$, :'fan_out_union'), :k) \g /dev/null
+
+SELECT rem_bench.measure('unified', $q$
+    SELECT u.id
+    FROM rem_search_embeddings_all($1, $2) s
+    JOIN rem_bench.embeddings_unified u ON u.entity_type = s.entity_type AND u.entity_id = s.entity_id
+$q$, :k) \g /dev/null
+
+RESET enable_seqscan;
+RESET search_path;
+DROP SCHEMA rem_bench CASCADE;
@@ -0,0 +1,128 @@
+-- kv_store trigger load benchmark: row-level vs statement-level
+--
+-- Loads, updates and deletes :rows resources rows, first with the FOR EACH
+-- ROW trigger from 002_install_models.sql and then with the FOR EACH
+-- STATEMENT triggers from 003_kv_store_statement_triggers.sql, and reports
+-- rows/second for each, next to a baseline without kv_store maintenance. It
+-- also checks that both produce identical kv_store contents.
+--
+-- Everything runs in one transaction that is rolled back, so it is safe to
+-- run against a dev database with 002 and 003 applied:
+--
+--   psql "$POSTGRES__CONNECTION_STRING" -v rows=100000 \
+--        -f src/rem/sql/benchmarks/kv_store_triggers.sql
+
+\set ON_ERROR_STOP on
+\if :{?rows}
+\else
+    \set rows 100000
+\endif
+
+BEGIN;
+
+CREATE FUNCTION pg_temp.bench(label TEXT, statement TEXT)
+RETURNS VOID AS $$
+DECLARE
+    started TIMESTAMPTZ := clock_timestamp();
+    affected BIGINT;
+    seconds NUMERIC;
+BEGIN
+    EXECUTE statement;
+    GET DIAGNOSTICS affected = ROW_COUNT;
+    seconds := EXTRACT(EPOCH FROM clock_timestamp() - started);
+    RAISE NOTICE '%: % rows in % ms (% rows/s)',
+        rpad(label, 28), affected, round(seconds * 1000, 1),
+        round(affected / greatest(seconds, 0.000001));
+END;
+$$ LANGUAGE plpgsql;
+
+-- Deterministic ids so both runs produce comparable kv_store rows
+CREATE TEMP TABLE bench_statements AS
+SELECT
+    format($sql$
+        INSERT INTO resources (id, tenant_id, user_id, name, content, category, metadata, graph_edges, tags)
+        SELECT md5('kv-bench-' || g)::uuid, 'kv-bench', 'bench-user', 'kv-bench-resource-' || g,
+               'Benchmark resource ' || g, 'benchmark', jsonb_build_object('n', g),
+               jsonb_build_array(jsonb_build_object('dst', 'kv-bench-resource-' || (g + 1),
+                                                    'rel_type', 'next', 'weight', 1.0, 'properties', '{}'::jsonb)),
+               ARRAY['benchmark']
+        FROM generate_series(1, %s) AS g
+    $sql$, :rows) AS insert_sql,
+    $sql$
+        UPDATE resources SET metadata = metadata || '{"updated": true}'::jsonb
+        WHERE tenant_id = 'kv-bench'
+    $sql$ AS update_sql,
+    $sql$
+        DELETE FROM resources WHERE tenant_id = 'kv-bench'
+    $sql$ AS delete_sql;
+
+CREATE TEMP TABLE kv_snapshots (run TEXT, phase TEXT, LIKE kv_store);
+
+-- ----------------------------------------------------------------------------
+-- Baseline: no kv_store maintenance (cost of the resources writes alone)
+-- ----------------------------------------------------------------------------
+
+ALTER TABLE resources DISABLE TRIGGER trg_resources_kv_store_insert;
+ALTER TABLE resources DISABLE TRIGGER trg_resources_kv_store_update;
+ALTER TABLE resources DISABLE TRIGGER trg_resources_kv_store_delete;
+
+SELECT pg_temp.bench('no kv trigger insert', insert_sql) FROM bench_statements \g /dev/null
+SELECT pg_temp.bench('no kv trigger update', update_sql) FROM bench_statements \g /dev/null
+SELECT pg_temp.bench('no kv trigger delete', delete_sql) FROM bench_statements \g /dev/null
+
+-- ----------------------------------------------------------------------------
+-- Before: FOR EACH ROW trigger
+-- ----------------------------------------------------------------------------
+
+CREATE TRIGGER trg_resources_kv_store
+AFTER INSERT OR UPDATE OR DELETE ON resources
+FOR EACH ROW EXECUTE FUNCTION fn_resources_kv_store_upsert();
+
+SELECT pg_temp.bench('row-level insert', insert_sql) FROM bench_statements \g /dev/null
+INSERT INTO kv_snapshots SELECT 'row', 'insert', * FROM kv_store WHERE tenant_id = 'kv-bench';
+SELECT pg_temp.bench('row-level update', update_sql) FROM bench_statements \g /dev/null
+INSERT INTO kv_snapshots SELECT 'row', 'update', * FROM kv_store WHERE tenant_id = 'kv-bench';
+SELECT pg_temp.bench('row-level delete', delete_sql) FROM bench_statements \g /dev/null
+INSERT INTO kv_snapshots SELECT 'row', 'delete', * FROM kv_store WHERE tenant_id = 'kv-bench';
+
+-- ----------------------------------------------------------------------------
+-- After: FOR EACH STATEMENT triggers with transition tables
+-- ----------------------------------------------------------------------------
+
+DROP TRIGGER trg_resources_kv_store ON resources;
+ALTER TABLE resources ENABLE TRIGGER trg_resources_kv_store_insert;
+ALTER TABLE resources ENABLE TRIGGER trg_resources_kv_store_update;
+ALTER TABLE resources ENABLE TRIGGER trg_resources_kv_store_delete;
+
+SELECT pg_temp.bench('statement-level insert', insert_sql) FROM bench_statements \g /dev/null
+INSERT INTO kv_snapshots SELECT 'statement', 'insert', * FROM kv_store WHERE tenant_id = 'kv-bench';
+SELECT pg_temp.bench('statement-level update', update_sql) FROM bench_statements \g /dev/null
+INSERT INTO kv_snapshots SELECT 'statement', 'update', * FROM kv_store WHERE tenant_id = 'kv-bench';
+SELECT pg_temp.bench('statement-level delete', delete_sql) FROM bench_statements \g /dev/null
+INSERT INTO kv_snapshots SELECT 'statement', 'delete', * FROM kv_store WHERE tenant_id = 'kv-bench';
+
+-- ----------------------------------------------------------------------------
+-- kv_store must be identical after every phase (expect 0 differences)
+-- ----------------------------------------------------------------------------
+
+SELECT p.phase, count(s.entity_key) AS rows_compared, (
+    SELECT count(*) FROM (
+        (SELECT entity_key, entity_type, entity_id, tenant_id, user_id, metadata, graph_edges, created_at, updated_at
+         FROM kv_snapshots WHERE run = 'row' AND phase = p.phase
+         EXCEPT ALL
+         SELECT entity_key, entity_type, entity_id, tenant_id, user_id, metadata, graph_edges, created_at, updated_at
+         FROM kv_snapshots WHERE run = 'statement' AND phase = p.phase)
+        UNION ALL
+        (SELECT entity_key, entity_type, entity_id, tenant_id, user_id, metadata, graph_edges, created_at, updated_at
+         FROM kv_snapshots WHERE run = 'statement' AND phase = p.phase
+         EXCEPT ALL
+         SELECT entity_key, entity_type, entity_id, tenant_id, user_id, metadata, graph_edges, created_at, updated_at
+         FROM kv_snapshots WHERE run = 'row' AND phase = p.phase)
+    ) diff
+) AS differences
+FROM (VALUES ('insert'), ('update'), ('delete')) AS p(phase)
+LEFT JOIN kv_snapshots s ON s.phase = p.phase AND s.run = 'row'
+GROUP BY p.phase
+ORDER BY min(CASE p.phase WHEN 'insert' THEN 1 WHEN 'update' THEN 2 ELSE 3 END);
+
+ROLLBACK;
@@ -0,0 +1,158 @@
+-- Session history benchmark: tenant scan vs idx_messages_session_history
+--
+-- Seeds :rows messages (default 10M) into a scratch copy of `messages` in
+-- the rem_bench schema. The rows are spread over :tenants tenants and
+-- :sessions sessions, plus one hot session holding 1% of all rows. It then
+-- times "last 50 messages" loads before and after the session history index
+-- from 004_messages_session_history.sql, along with deep keyset pages and
+-- summary + recent loads through the migration's functions.
+--
+-- The functions resolve `messages` via search_path, so they run against the
+-- scratch table unchanged. The schema is dropped at the end.
+--
+--   psql "$POSTGRES__CONNECTION_STRING" -v rows=10000000 \
+--        -f src/rem/sql/benchmarks/messages_session_history.sql
+
+\set ON_ERROR_STOP on
+\if :{?rows}
+\else
+    \set rows 10000000
+\endif
+\if :{?sessions}
+\else
+    \set sessions 100000
+\endif
+\if :{?tenants}
+\else
+    \set tenants 10
+\endif
+
+DROP SCHEMA IF EXISTS rem_bench CASCADE;
+CREATE SCHEMA rem_bench;
+SET search_path = rem_bench, public;
+
+-- Average over :iterations runs of a query (results are discarded)
+CREATE FUNCTION rem_bench.time_query(label TEXT, query TEXT, iterations INTEGER DEFAULT 20)
+RETURNS VOID AS $$
+DECLARE
+    started TIMESTAMPTZ;
+    total INTERVAL := INTERVAL '0';
+BEGIN
+    EXECUTE query;  -- warm up
+    FOR i IN 1..iterations LOOP
+        started := clock_timestamp();
+        EXECUTE query;
+        total := total + (clock_timestamp() - started);
+    END LOOP;
+    RAISE NOTICE '%: % ms/query', rpad(label, 44),
+        round((EXTRACT(EPOCH FROM total) * 1000 / iterations)::numeric, 3);
+END;
+$$ LANGUAGE plpgsql;
+
+-- ----------------------------------------------------------------------------
+-- Seed
+-- ----------------------------------------------------------------------------
+
+CREATE TABLE rem_bench.messages (LIKE public.messages INCLUDING DEFAULTS);
+CREATE TABLE rem_bench.session_summaries (LIKE public.session_summaries INCLUDING ALL);
+
+\echo Seeding :rows messages...
+\timing on
+INSERT INTO rem_bench.messages (id, tenant_id, user_id, content, message_type, session_id, token_count, created_at, deleted_at)
+SELECT
+    md5('msg-' || g)::uuid,
+    'tenant-' || (g % :tenants),
+    'user-' || (g % 1000),
+    'Message ' || g || ' of the benchmark conversation',
+    CASE WHEN g % 2 = 0 THEN 'user' ELSE 'assistant' END,
+    -- Every 100th row goes to one hot session in tenant-0
+    CASE WHEN g % 100 = 0 THEN 'session-hot' ELSE 'session-' || (g % :sessions) END,
+    20 + g % 200,
+    TIMESTAMP '2024-01-01' + g * INTERVAL '3 seconds',
+    -- ~10% soft-deleted
+    CASE WHEN g % 10 = 7 THEN TIMESTAMP '2024-06-01' END
+FROM generate_series(1, :rows) AS g;
+UPDATE rem_bench.messages SET tenant_id = 'tenant-0' WHERE session_id = 'session-hot';
+\timing off
+
+-- Same btree indexes as public.messages (GIN indexes are irrelevant to these
+-- queries and only slow the seed down); the session history index comes later
+DO $$
+DECLARE
+    idx RECORD;
+BEGIN
+    FOR idx IN
+        SELECT indexname, indexdef FROM pg_indexes
+        WHERE schemaname = 'public' AND tablename = 'messages'
+          AND indexdef NOT LIKE '%USING gin%'
+          AND indexname <> 'idx_messages_session_history'
+    LOOP
+        EXECUTE replace(idx.indexdef, ' ON public.messages ', ' ON rem_bench.messages ');
+    END LOOP;
+END $$;
+ANALYZE rem_bench.messages;
+
+SELECT tenant_id = 'tenant-0' AS hot, count(*) AS messages
+FROM rem_bench.messages WHERE session_id IN ('session-hot', 'session-42')
+GROUP BY session_id, tenant_id;
+
+-- ----------------------------------------------------------------------------
+-- Before: tenant index only
+-- ----------------------------------------------------------------------------
+
+SELECT rem_bench.time_query('before: last 50, typical session', $q$
+    SELECT * FROM messages
+    WHERE tenant_id = 'tenant-2' AND session_id = 'session-42' AND deleted_at IS NULL
+    ORDER BY created_at DESC, id DESC LIMIT 50
+$q$, 3) \g /dev/null
+SELECT rem_bench.time_query('before: last 50, hot session', $q$
+    SELECT * FROM messages
+    WHERE tenant_id = 'tenant-0' AND session_id = 'session-hot' AND deleted_at IS NULL
+    ORDER BY created_at DESC, id DESC LIMIT 50
+$q$, 3) \g /dev/null
+
+-- ----------------------------------------------------------------------------
+-- After: session history index + keyset functions
+-- ----------------------------------------------------------------------------
+
+\timing on
+DO $$
+BEGIN
+    EXECUTE (
+        SELECT replace(indexdef, ' ON public.messages ', ' ON rem_bench.messages ')
+        FROM pg_indexes
+        WHERE schemaname = 'public' AND indexname = 'idx_messages_session_history'
+    );
+END $$;
+\timing off
+ANALYZE rem_bench.messages;
+
+SELECT rem_bench.time_query('after: last 50, typical session',
+    $q$SELECT * FROM rem_session_messages('tenant-2', 'session-42', 50)$q$) \g /dev/null
+SELECT rem_bench.time_query('after: last 50, hot session',
+    $q$SELECT * FROM rem_session_messages('tenant-0', 'session-hot', 50)$q$) \g /dev/null
+
+-- Cursor roughly in the middle of the hot session
+SELECT created_at AS mid_created_at, id AS mid_id
+FROM rem_bench.messages
+WHERE session_id = 'session-hot' AND deleted_at IS NULL
+ORDER BY created_at
+OFFSET (:rows / 200) LIMIT 1 \gset
+
+SELECT rem_bench.time_query('after: keyset page mid hot session', format(
+    $q$SELECT * FROM rem_session_messages('tenant-0', 'session-hot', 50, %L, %L)$q$,
+    :'mid_created_at', :'mid_id')) \g /dev/null
+
+SELECT rem_session_summary_upsert('tenant-0', 'session-hot', 'Summary of the hot session so far',
+    :'mid_created_at', :'mid_id', :rows / 200) \g /dev/null
+SELECT rem_bench.time_query('after: summary + last 50, hot session',
+    $q$SELECT * FROM rem_session_history('tenant-0', 'session-hot', 50)$q$) \g /dev/null
+
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT * FROM rem_session_messages('tenant-0', 'session-hot', 50, :'mid_created_at', :'mid_id');
+
+SELECT pg_size_pretty(pg_relation_size('rem_bench.idx_messages_session_history')) AS history_index_size,
+       pg_size_pretty(pg_relation_size('rem_bench.messages')) AS table_size;
+
+RESET search_path;
+DROP SCHEMA rem_bench CASCADE;
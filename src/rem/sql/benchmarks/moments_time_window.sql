@@ -0,0 +1,181 @@
+-- Moments time window benchmark: tenant scan vs idx_moments_time_range
+--
+-- Seeds :rows moments (default 100M) into a scratch copy of `moments` in the
+-- rem_bench schema, spread over :tenants tenants and roughly five years.
+-- Most moments last minutes to hours, every 50th spans several days and
+-- every 20th has no ends_timestamp. It then times "this week" and "this
+-- week about sprint-progress" queries before and after the indexes from
+-- 005_moments_time_range.sql, using rem_moments_in_window() for the latter.
+--
+-- rem_moments_in_window() resolves `moments` via search_path, so it runs
+-- against the scratch table unchanged. The schema is dropped at the end.
+-- 100M rows need ~40 GB of disk; pass a smaller -v rows=... for a quick run.
+--
+--   psql "$POSTGRES__CONNECTION_STRING" -v rows=100000000 \
+--        -f src/rem/sql/benchmarks/moments_time_window.sql
+
+\set ON_ERROR_STOP on
+\if :{?rows}
+\else
+    \set rows 100000000
+\endif
+\if :{?tenants}
+\else
+    \set tenants 10
+\endif
+
+DROP SCHEMA IF EXISTS rem_bench CASCADE;
+CREATE SCHEMA rem_bench;
+SET search_path = rem_bench, public;
+
+-- Average over :iterations runs of a query (results are discarded)
+CREATE FUNCTION rem_bench.time_query(label TEXT, query TEXT, iterations INTEGER DEFAULT 20)
+RETURNS VOID AS $$
+DECLARE
+    started TIMESTAMPTZ;
+    total INTERVAL := INTERVAL '0';
+BEGIN
+    EXECUTE query;  -- warm up
+    FOR i IN 1..iterations LOOP
+        started := clock_timestamp();
+        EXECUTE query;
+        total := total + (clock_timestamp() - started);
+    END LOOP;
+    RAISE NOTICE '%: % ms/query', rpad(label, 44),
+        round((EXTRACT(EPOCH FROM total) * 1000 / iterations)::numeric, 3);
+END;
+$$ LANGUAGE plpgsql;
+
+-- ----------------------------------------------------------------------------
+-- Seed
+-- ----------------------------------------------------------------------------
+
+CREATE TABLE rem_bench.moments (LIKE public.moments INCLUDING DEFAULTS);
+
+-- Start times step evenly through 2021-2025, so the table is physically
+-- ordered by starts_timestamp like an append-only moment log
+SELECT EXTRACT(EPOCH FROM INTERVAL '5 years') / :rows AS step_seconds \gset
+
+\echo Seeding :rows moments...
+\timing on
+INSERT INTO rem_bench.moments (id, tenant_id, user_id, name, moment_type, category, starts_timestamp, ends_timestamp,
+                               emotion_tags, topic_tags, summary, deleted_at)
+SELECT
+    md5('moment-' || g)::uuid,
+    'tenant-' || (g % :tenants),
+    'user-' || (g % 1000),
+    'moment-' || g,
+    'meeting',
+    'work',
+    started,
+    CASE
+        WHEN g % 20 = 0 THEN NULL
+        WHEN g % 50 = 1 THEN started + (1 + g % 5) * INTERVAL '1 day'
+        ELSE started + (5 + g % 115) * INTERVAL '1 minute'
+    END,
+    ARRAY[(ARRAY['focused', 'stressed', 'proud', 'frustrated', 'relieved', 'curious'])[1 + g / 50 % 6]],
+    ARRAY['topic-' || (g % 200), (ARRAY['sprint-progress', 'planning', 'hiring', 'incident', 'design-review'])[1 + g / 10 % 5]],
+    'Benchmark moment ' || g,
+    -- ~5% soft-deleted
+    CASE WHEN g % 20 = 7 THEN TIMESTAMP '2026-01-01' END
+FROM generate_series(1, :rows) AS g,
+     LATERAL (SELECT TIMESTAMP '2021-01-01' + g * :step_seconds * INTERVAL '1 second' AS started) s;
+\timing off
+
+-- Same btree indexes as public.moments (GIN indexes on graph_edges/metadata/
+-- tags are irrelevant to these queries and only slow the seed down)
+DO $$
+DECLARE
+    idx RECORD;
+BEGIN
+    FOR idx IN
+        SELECT indexname, indexdef FROM pg_indexes
+        WHERE schemaname = 'public' AND tablename = 'moments'
+          AND indexdef NOT LIKE '%USING gin%'
+          AND indexdef NOT LIKE '%USING gist%'
+          AND indexdef NOT LIKE '%USING brin%'
+    LOOP
+        EXECUTE replace(idx.indexdef, ' ON public.moments ', ' ON rem_bench.moments ');
+    END LOOP;
+END $$;
+ANALYZE rem_bench.moments;
+
+-- ----------------------------------------------------------------------------
+-- Before: tenant index only
+-- ----------------------------------------------------------------------------
+
+SELECT rem_bench.time_query('before: week, one tenant', $q$
+    SELECT * FROM moments
+    WHERE tenant_id = 'tenant-3' AND deleted_at IS NULL
+      AND starts_timestamp < '2024-06-17'
+      AND COALESCE(ends_timestamp, starts_timestamp) >= '2024-06-10'
+    ORDER BY starts_timestamp, id LIMIT 100
+$q$, 3) \g /dev/null
+SELECT rem_bench.time_query('before: week + sprint-progress', $q$
+    SELECT * FROM moments
+    WHERE tenant_id = 'tenant-3' AND deleted_at IS NULL
+      AND starts_timestamp < '2024-06-17'
+      AND COALESCE(ends_timestamp, starts_timestamp) >= '2024-06-10'
+      AND topic_tags && ARRAY['sprint-progress']
+    ORDER BY starts_timestamp, id LIMIT 100
+$q$, 3) \g /dev/null
+
+-- ----------------------------------------------------------------------------
+-- After: time range, BRIN and tag indexes + rem_moments_in_window()
+-- ----------------------------------------------------------------------------
+
+\timing on
+DO $$
+DECLARE
+    idx RECORD;
+BEGIN
+    FOR idx IN
+        SELECT indexdef FROM pg_indexes
+        WHERE schemaname = 'public'
+          AND indexname IN ('idx_moments_time_range', 'idx_moments_starts_brin',
+                            'idx_moments_emotion_tags', 'idx_moments_topic_tags')
+    LOOP
+        EXECUTE replace(idx.indexdef, ' ON public.moments ', ' ON rem_bench.moments ');
+    END LOOP;
+END $$;
+\timing off
+ANALYZE rem_bench.moments;
+
+SELECT rem_bench.time_query('after: week, one tenant',
+    $q$SELECT * FROM rem_moments_in_window('tenant-3', '2024-06-10', '2024-06-17')$q$) \g /dev/null
+SELECT rem_bench.time_query('after: week + sprint-progress',
+    $q$SELECT * FROM rem_moments_in_window('tenant-3', '2024-06-10', '2024-06-17',
+                                           p_topic_tags => ARRAY['sprint-progress'])$q$) \g /dev/null
+SELECT rem_bench.time_query('after: day + sprint-progress & stressed',
+    $q$SELECT * FROM rem_moments_in_window('tenant-3', '2024-06-12', '2024-06-13',
+                                           ARRAY['sprint-progress'], ARRAY['stressed'], true)$q$) \g /dev/null
+SELECT rem_bench.time_query('after: month scan via BRIN, all tenants', $q$
+    SELECT count(*) FROM moments
+    WHERE starts_timestamp >= '2024-06-01' AND starts_timestamp < '2024-07-01'
+$q$, 3) \g /dev/null
+
+-- Both paths must return the same moments (expect 0 in both only_in_* columns)
+SELECT count(fn.id) AS window_rows,
+       count(*) FILTER (WHERE scan.id IS NULL) AS only_in_function,
+       count(*) FILTER (WHERE fn.id IS NULL) AS only_in_scan
+FROM rem_moments_in_window('tenant-3', '2024-06-10', '2024-06-17',
+                           p_topic_tags => ARRAY['sprint-progress'], p_limit => 100000) fn
+FULL JOIN (
+    SELECT id FROM moments
+    WHERE tenant_id = 'tenant-3' AND deleted_at IS NULL
+      AND starts_timestamp < '2024-06-17'
+      AND COALESCE(ends_timestamp, starts_timestamp) >= '2024-06-10'
+      AND topic_tags && ARRAY['sprint-progress']
+) scan ON scan.id = fn.id;
+
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT * FROM rem_moments_in_window('tenant-3', '2024-06-10', '2024-06-17',
+                                    p_topic_tags => ARRAY['sprint-progress']);
+
+SELECT indexrelid::regclass::text AS index, pg_size_pretty(pg_relation_size(indexrelid)) AS size
+FROM pg_index WHERE indrelid = 'rem_bench.moments'::regclass
+UNION ALL
+SELECT 'table', pg_size_pretty(pg_relation_size('rem_bench.moments'));
+
+RESET search_path;
+DROP SCHEMA rem_bench CASCADE;
@@ -0,0 +1,287 @@
+-- Unified embedding store (optional)
+-- Run after the initial data load, then build its HNSW index in the
+-- background
+--
+-- Embeddings live in one table per entity type (embeddings_files,
+-- embeddings_messages, ...), each with its own HNSW index, so searching
+-- every entity type means nine ANN scans merged by the caller. This file
+-- adds:
+--
+-- 1. embeddings_unified: one row per embeddings_<table> row (same id) with
+--    entity_type and the entity's tenant_id
+-- 2. Statement-level triggers on the nine embeddings tables keeping it in
+--    sync, plus a backfill of existing rows, and on the nine entity tables
+--    keeping the copied tenant_id current
+-- 3. rem_search_embeddings_all(): globally ranked top-k over every entity
+--    type (or a subset) in one ANN scan
+--
+-- It stores every embedding a second time, adds a write to every
+-- embeddings insert, update and delete and a tenant check to every entity
+-- insert and update, so it is not part of the migrations. The per-type
+-- tables stay the source of truth and keep working as before. The single
+-- HNSW index is in embeddings_unified_indexes.sql, built concurrently like
+-- the per-type ones:
+--
+--   psql "$POSTGRES__CONNECTION_STRING" -f src/rem/sql/embeddings_unified.sql
+--   python scripts/build_indexes.py --sql-file src/rem/sql/embeddings_unified_indexes.sql
+--
+-- Re-running it is safe. Remove it again with the statements at the end.
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM rem_migrations WHERE name = 'install_models.sql') THEN
+        RAISE EXCEPTION 'Model schema not found. Run migrations/002_install_models.sql first.';
+    END IF;
+END $$;
+
+-- ============================================================================
+-- UNIFIED TABLE
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS embeddings_unified (
+    id UUID PRIMARY KEY,
+    entity_type VARCHAR(100) NOT NULL,
+    entity_id UUID NOT NULL,
+    tenant_id VARCHAR(100),
+    field_name VARCHAR(100) NOT NULL,
+    provider VARCHAR(50) NOT NULL,
+    model VARCHAR(100) NOT NULL,
+    embedding vector(1536) NOT NULL,
+    created_at TIMESTAMP,
+    updated_at TIMESTAMP
+);
+
+-- Index for entity lookup (get all embeddings for entity)
+CREATE INDEX IF NOT EXISTS idx_embeddings_unified_entity
+ON embeddings_unified (entity_type, entity_id);
+
+-- ============================================================================
+-- SYNC TRIGGERS
+-- ============================================================================
+
+-- Mirror embeddings_<table> writes into embeddings_unified. entity_type is
+-- the entity table name (as in kv_store); tenant_id is read from the entity
+-- and kept current by fn_embeddings_unified_tenant_statement().
+CREATE OR REPLACE FUNCTION fn_embeddings_unified_sync_statement()
+RETURNS TRIGGER AS $$
+DECLARE
+    entity_table TEXT := substr(TG_TABLE_NAME, length('embeddings_') + 1);
+BEGIN
+    IF (TG_OP = 'DELETE') THEN
+        DELETE FROM embeddings_unified u
+        USING old_rows o
+        WHERE u.id = o.id;
+        RETURN NULL;
+    END IF;
+
+    EXECUTE format($sql$
+        INSERT INTO embeddings_unified (
+            id,
+            entity_type,
+            entity_id,
+            tenant_id,
+            field_name,
+            provider,
+            model,
+            embedding,
+            created_at,
+            updated_at
+        )
+        SELECT n.id, %L, n.entity_id, e.tenant_id, n.field_name, n.provider, n.model,
+               n.embedding, n.created_at, n.updated_at
+        FROM new_rows n
+        LEFT JOIN %I e ON e.id = n.entity_id
+        ON CONFLICT (id)
+        DO UPDATE SET
+            entity_id = EXCLUDED.entity_id,
+            tenant_id = EXCLUDED.tenant_id,
+            field_name = EXCLUDED.field_name,
+            provider = EXCLUDED.provider,
+            model = EXCLUDED.model,
+            embedding = EXCLUDED.embedding,
+            updated_at = EXCLUDED.updated_at
+    $sql$, entity_table, entity_table);
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Copy the tenant_id of inserted entities, and of entities whose tenant_id
+-- changed, onto their embeddings. Covers embeddings written before their
+-- entity as well as tenant moves.
+CREATE OR REPLACE FUNCTION fn_embeddings_unified_tenant_statement()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF (TG_OP = 'INSERT') THEN
+        UPDATE embeddings_unified u
+        SET tenant_id = n.tenant_id
+        FROM new_rows n
+        WHERE u.entity_type = TG_TABLE_NAME
+          AND u.entity_id = n.id
+          AND u.tenant_id IS DISTINCT FROM n.tenant_id;
+    ELSE
+        UPDATE embeddings_unified u
+        SET tenant_id = n.tenant_id
+        FROM new_rows n
+        JOIN old_rows o ON o.id = n.id
+        WHERE n.tenant_id IS DISTINCT FROM o.tenant_id
+          AND u.entity_type = TG_TABLE_NAME
+          AND u.entity_id = n.id;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    embeddings_table TEXT;
+    entity_table TEXT;
+BEGIN
+    FOREACH embeddings_table IN ARRAY ARRAY[
+        'embeddings_files', 'embeddings_image_resources', 'embeddings_messages',
+        'embeddings_moments', 'embeddings_ontology_configs', 'embeddings_resources',
+        'embeddings_schemas', 'embeddings_sessions', 'embeddings_users'
+    ] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', 'trg_' || embeddings_table || '_unified_insert', embeddings_table);
+        EXECUTE format($sql$
+            CREATE TRIGGER %I
+            AFTER INSERT ON %I
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION fn_embeddings_unified_sync_statement()
+        $sql$, 'trg_' || embeddings_table || '_unified_insert', embeddings_table);
+
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', 'trg_' || embeddings_table || '_unified_update', embeddings_table);
+        EXECUTE format($sql$
+            CREATE TRIGGER %I
+            AFTER UPDATE ON %I
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION fn_embeddings_unified_sync_statement()
+        $sql$, 'trg_' || embeddings_table || '_unified_update', embeddings_table);
+
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', 'trg_' || embeddings_table || '_unified_delete', embeddings_table);
+        EXECUTE format($sql$
+            CREATE TRIGGER %I
+            AFTER DELETE ON %I
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION fn_embeddings_unified_sync_statement()
+        $sql$, 'trg_' || embeddings_table || '_unified_delete', embeddings_table);
+
+        -- Backfill existing rows
+        EXECUTE format($sql$
+            INSERT INTO embeddings_unified (id, entity_type, entity_id, tenant_id, field_name, provider, model,
+                                            embedding, created_at, updated_at)
+            SELECT x.id, %L, x.entity_id, e.tenant_id, x.field_name, x.provider, x.model,
+                   x.embedding, x.created_at, x.updated_at
+            FROM %I x
+            LEFT JOIN %I e ON e.id = x.entity_id
+            ON CONFLICT (id) DO NOTHING
+        $sql$, substr(embeddings_table, length('embeddings_') + 1), embeddings_table,
+               substr(embeddings_table, length('embeddings_') + 1));
+    END LOOP;
+
+    -- Transition tables cannot be combined with UPDATE OF tenant_id, so the
+    -- update trigger fires on every update and compares old and new rows
+    FOREACH entity_table IN ARRAY ARRAY[
+        'files', 'image_resources', 'messages', 'moments', 'ontology_configs',
+        'resources', 'schemas', 'sessions', 'users'
+    ] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', 'trg_' || entity_table || '_unified_tenant_insert', entity_table);
+        EXECUTE format($sql$
+            CREATE TRIGGER %I
+            AFTER INSERT ON %I
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION fn_embeddings_unified_tenant_statement()
+        $sql$, 'trg_' || entity_table || '_unified_tenant_insert', entity_table);
+
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', 'trg_' || entity_table || '_unified_tenant_update', entity_table);
+        EXECUTE format($sql$
+            CREATE TRIGGER %I
+            AFTER UPDATE ON %I
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION fn_embeddings_unified_tenant_statement()
+        $sql$, 'trg_' || entity_table || '_unified_tenant_update', entity_table);
+    END LOOP;
+END $$;
+
+-- ============================================================================
+-- GLOBAL TOP-K SEARCH
+-- ============================================================================
+
+-- Top p_limit embeddings across all entity types by cosine similarity,
+-- optionally restricted to some entity types, a tenant, a field or a
+-- provider. An HNSW scan only yields ef_search candidates, and on
+-- pgvector < 0.8 the filters can only discard them: with filters ef_search
+-- defaults to 10 x p_limit (at most 1000), so raise p_ef_search for very
+-- selective filters. On pgvector 0.8+ the scan is iterative and keeps going
+-- until p_limit rows pass the filters, as in rem_hybrid_search().
+--
+--   SELECT * FROM rem_search_embeddings_all('[...]'::vector, 10,
+--       p_entity_types => ARRAY['resources', 'moments'], p_tenant_id => 'acme');
+CREATE OR REPLACE FUNCTION rem_search_embeddings_all(
+    p_query vector,
+    p_limit INTEGER DEFAULT 10,
+    p_entity_types TEXT[] DEFAULT NULL,
+    p_tenant_id VARCHAR DEFAULT NULL,
+    p_field_name VARCHAR DEFAULT NULL,
+    p_provider VARCHAR DEFAULT NULL,
+    p_ef_search INTEGER DEFAULT NULL
+)
+RETURNS TABLE (
+    entity_type VARCHAR,
+    entity_id UUID,
+    tenant_id VARCHAR,
+    field_name VARCHAR,
+    similarity DOUBLE PRECISION
+) AS $$
+#variable_conflict use_column
+BEGIN
+    IF p_ef_search IS NULL THEN
+        p_ef_search := CASE
+            WHEN p_entity_types IS NOT NULL OR p_tenant_id IS NOT NULL
+                 OR p_field_name IS NOT NULL OR p_provider IS NOT NULL THEN p_limit * 10
+            ELSE p_limit
+        END;
+    END IF;
+    PERFORM set_config('hnsw.ef_search', LEAST(GREATEST(p_ef_search, 40), 1000)::TEXT, true);
+    IF (SELECT string_to_array(extversion, '.')::INTEGER[] >= ARRAY[0, 8]
+        FROM pg_extension WHERE extname = 'vector') THEN
+        PERFORM set_config('hnsw.iterative_scan', 'strict_order', true);
+    END IF;
+
+    RETURN QUERY
+    SELECT u.entity_type, u.entity_id, u.tenant_id, u.field_name, 1 - (u.embedding <=> p_query)
+    FROM embeddings_unified u
+    WHERE (p_entity_types IS NULL OR u.entity_type = ANY(p_entity_types))
+      AND (p_tenant_id IS NULL OR u.tenant_id = p_tenant_id)
+      AND (p_field_name IS NULL OR u.field_name = p_field_name)
+      AND (p_provider IS NULL OR u.provider = p_provider)
+    ORDER BY u.embedding <=> p_query
+    LIMIT p_limit;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================================================
+-- REMOVE
+-- ============================================================================
+--
+-- DO $$
+-- DECLARE
+--     embeddings_table TEXT;
+-- BEGIN
+--     FOREACH embeddings_table IN ARRAY ARRAY[
+--         'embeddings_files', 'embeddings_image_resources', 'embeddings_messages',
+--         'embeddings_moments', 'embeddings_ontology_configs', 'embeddings_resources',
+--         'embeddings_schemas', 'embeddings_sessions', 'embeddings_users'
+--     ] LOOP
+--         EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', 'trg_' || embeddings_table || '_unified_insert', embeddings_table);
+--         EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', 'trg_' || embeddings_table || '_unified_update', embeddings_table);
+--         EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', 'trg_' || embeddings_table || '_unified_delete', embeddings_table);
+--         EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', 'trg_' || substr(embeddings_table, 12) || '_unified_tenant_insert', substr(embeddings_table, 12));
+--         EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', 'trg_' || substr(embeddings_table, 12) || '_unified_tenant_update', substr(embeddings_table, 12));
+--     END LOOP;
+-- END $$;
+-- DROP FUNCTION IF EXISTS rem_search_embeddings_all(vector, INTEGER, TEXT[], VARCHAR, VARCHAR, VARCHAR, INTEGER);
+-- DROP FUNCTION IF EXISTS fn_embeddings_unified_sync_statement();
+-- DROP FUNCTION IF EXISTS fn_embeddings_unified_tenant_statement();
+-- DROP TABLE IF EXISTS embeddings_unified;
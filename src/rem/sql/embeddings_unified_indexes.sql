@@ -0,0 +1,14 @@
+-- HNSW index for the unified embedding store (optional)
+-- Run AFTER src/rem/sql/embeddings_unified.sql and its backfill
+--
+-- One ANN index over every entity type, used by rem_search_embeddings_all().
+-- Same parameters as the most queried per-type index in
+-- background_indexes.sql.
+--
+--   python scripts/build_indexes.py --sql-file src/rem/sql/embeddings_unified_indexes.sql
+
+-- HNSW vector index for embeddings_unified
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_unified_vector_hnsw
+ON embeddings_unified
+USING hnsw (embedding vector_cosine_ops)
+WITH (m = 24, ef_construction = 128);
@@ -0,0 +1,208 @@
+-- Graph adjacency table (optional)
+-- Run after migrations/010_graph_traverse.sql if TRAVERSE is hot enough to
+-- pay for it
+--
+-- kv_graph_edges holds one row per kv_store.graph_edges element, kept in
+-- sync by statement-level triggers on kv_store, and rem_traverse_edges()
+-- walks it with a primary-key range scan per hop instead of unpacking
+-- graph_edges. The price is a second copy of every edge and an extra write
+-- per edge on each kv_store insert, update or delete that changes
+-- graph_edges. kv_store is synced from the entity tables by either the
+-- statement-level triggers (003 / 006) or the row triggers (002), so this
+-- works with both.
+--
+--   psql "$POSTGRES__CONNECTION_STRING" -f src/rem/sql/graph_edges.sql
+--
+-- Re-running it is safe. Remove it again with the statements at the end.
+
+DO $$
+BEGIN
+    IF to_regprocedure('rem_traverse(varchar, varchar, integer, text[], integer, integer)') IS NULL THEN
+        RAISE EXCEPTION 'rem_traverse() not found. Run migrations/010_graph_traverse.sql first.';
+    END IF;
+END $$;
+
+-- ============================================================================
+-- ADJACENCY TABLE
+-- ============================================================================
+
+-- One row per kv_store.graph_edges element; ordinal is its 1-based position
+CREATE TABLE IF NOT EXISTS kv_graph_edges (
+    tenant_id VARCHAR(100) NOT NULL,
+    src_key VARCHAR(512) NOT NULL,
+    ordinal INTEGER NOT NULL,
+    dst_key VARCHAR(512) NOT NULL,
+    rel_type VARCHAR(100),
+    weight DOUBLE PRECISION,
+    properties JSONB,
+    PRIMARY KEY (tenant_id, src_key, ordinal)
+);
+
+-- Index for incoming edges (who links to this key)
+CREATE INDEX IF NOT EXISTS idx_kv_graph_edges_dst
+ON kv_graph_edges (tenant_id, dst_key);
+
+-- Rewrite the edges of kv_store rows whose graph_edges changed. UPDATEs
+-- that leave graph_edges alone (most metadata syncs) touch nothing.
+CREATE OR REPLACE FUNCTION fn_kv_graph_edges_sync_statement()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF (TG_OP = 'DELETE') THEN
+        DELETE FROM kv_graph_edges g
+        USING old_rows o
+        WHERE g.tenant_id = o.tenant_id
+          AND g.src_key = o.entity_key;
+        RETURN NULL;
+    END IF;
+
+    IF (TG_OP = 'UPDATE') THEN
+        DELETE FROM kv_graph_edges g
+        USING old_rows o
+        WHERE g.tenant_id = o.tenant_id
+          AND g.src_key = o.entity_key
+          AND NOT EXISTS (
+              SELECT 1 FROM new_rows n
+              WHERE n.tenant_id = o.tenant_id
+                AND n.entity_key = o.entity_key
+                AND n.graph_edges IS NOT DISTINCT FROM o.graph_edges
+          );
+
+        INSERT INTO kv_graph_edges (tenant_id, src_key, ordinal, dst_key, rel_type, weight, properties)
+        SELECT n.tenant_id, n.entity_key, a.ordinal, a.edge->>'dst', a.edge->>'rel_type',
+               CASE WHEN jsonb_typeof(a.edge->'weight') = 'number'
+                    THEN (a.edge->>'weight')::DOUBLE PRECISION END,
+               a.edge->'properties'
+        FROM new_rows n
+        CROSS JOIN LATERAL jsonb_array_elements(
+            CASE WHEN jsonb_typeof(n.graph_edges) = 'array' THEN n.graph_edges END
+        ) WITH ORDINALITY AS a(edge, ordinal)
+        WHERE jsonb_typeof(a.edge->'dst') = 'string'
+          AND NOT EXISTS (
+              SELECT 1 FROM old_rows o
+              WHERE o.tenant_id = n.tenant_id
+                AND o.entity_key = n.entity_key
+                AND o.graph_edges IS NOT DISTINCT FROM n.graph_edges
+          )
+        ON CONFLICT (tenant_id, src_key, ordinal) DO NOTHING;
+        RETURN NULL;
+    END IF;
+
+    INSERT INTO kv_graph_edges (tenant_id, src_key, ordinal, dst_key, rel_type, weight, properties)
+    SELECT n.tenant_id, n.entity_key, a.ordinal, a.edge->>'dst', a.edge->>'rel_type',
+           CASE WHEN jsonb_typeof(a.edge->'weight') = 'number'
+                THEN (a.edge->>'weight')::DOUBLE PRECISION END,
+           a.edge->'properties'
+    FROM new_rows n
+    CROSS JOIN LATERAL jsonb_array_elements(
+        CASE WHEN jsonb_typeof(n.graph_edges) = 'array' THEN n.graph_edges END
+    ) WITH ORDINALITY AS a(edge, ordinal)
+    WHERE jsonb_typeof(a.edge->'dst') = 'string'
+    ON CONFLICT (tenant_id, src_key, ordinal) DO UPDATE SET
+        dst_key = EXCLUDED.dst_key,
+        rel_type = EXCLUDED.rel_type,
+        weight = EXCLUDED.weight,
+        properties = EXCLUDED.properties;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_kv_store_graph_edges_insert ON kv_store;
+CREATE TRIGGER trg_kv_store_graph_edges_insert
+AFTER INSERT ON kv_store
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_graph_edges_sync_statement();
+
+DROP TRIGGER IF EXISTS trg_kv_store_graph_edges_update ON kv_store;
+CREATE TRIGGER trg_kv_store_graph_edges_update
+AFTER UPDATE ON kv_store
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_graph_edges_sync_statement();
+
+DROP TRIGGER IF EXISTS trg_kv_store_graph_edges_delete ON kv_store;
+CREATE TRIGGER trg_kv_store_graph_edges_delete
+AFTER DELETE ON kv_store
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_graph_edges_sync_statement();
+
+-- Backfill existing rows
+INSERT INTO kv_graph_edges (tenant_id, src_key, ordinal, dst_key, rel_type, weight, properties)
+SELECT kv.tenant_id, kv.entity_key, a.ordinal, a.edge->>'dst', a.edge->>'rel_type',
+       CASE WHEN jsonb_typeof(a.edge->'weight') = 'number'
+            THEN (a.edge->>'weight')::DOUBLE PRECISION END,
+       a.edge->'properties'
+FROM kv_store kv
+CROSS JOIN LATERAL jsonb_array_elements(
+    CASE WHEN jsonb_typeof(kv.graph_edges) = 'array' THEN kv.graph_edges END
+) WITH ORDINALITY AS a(edge, ordinal)
+WHERE jsonb_typeof(a.edge->'dst') = 'string'
+ON CONFLICT (tenant_id, src_key, ordinal) DO NOTHING;
+
+-- ============================================================================
+-- TRAVERSAL OVER KV_GRAPH_EDGES
+-- ============================================================================
+
+-- Same arguments and results as rem_traverse(); each hop is a range scan
+-- of the kv_graph_edges primary key, so a p_max_fanout limit reads only
+-- the edges it returns.
+CREATE OR REPLACE FUNCTION rem_traverse_edges(
+    p_tenant_id VARCHAR,
+    p_entity_key VARCHAR,
+    p_max_depth INTEGER DEFAULT 2,
+    p_rel_types TEXT[] DEFAULT NULL,
+    p_max_fanout INTEGER DEFAULT 50,
+    p_max_nodes INTEGER DEFAULT 1000
+)
+RETURNS TABLE (
+    depth INTEGER,
+    entity_key VARCHAR,
+    found BOOLEAN,
+    entity_type VARCHAR,
+    entity_id UUID,
+    via_key VARCHAR,
+    rel_type VARCHAR,
+    weight DOUBLE PRECISION,
+    path VARCHAR[]
+) AS $$
+    WITH RECURSIVE walk (depth, entity_key, via_key, rel_type, weight, path, edge_path) AS (
+        SELECT 0, p_entity_key, NULL::VARCHAR, NULL::VARCHAR, NULL::DOUBLE PRECISION,
+               ARRAY[p_entity_key], ARRAY[]::BIGINT[]
+        UNION ALL
+        SELECT w.depth + 1, e.dst_key, w.entity_key, e.rel_type, e.weight,
+               w.path || e.dst_key, w.edge_path || e.ordinal::BIGINT
+        FROM walk w
+        CROSS JOIN LATERAL (
+            SELECT g.dst_key, g.rel_type, g.weight, g.ordinal
+            FROM kv_graph_edges g
+            WHERE g.tenant_id = p_tenant_id
+              AND g.src_key = w.entity_key
+              AND g.dst_key <> ALL(w.path)
+              AND (p_rel_types IS NULL OR g.rel_type = ANY(p_rel_types))
+            ORDER BY g.ordinal
+            LIMIT p_max_fanout
+        ) e
+        WHERE w.depth < p_max_depth
+    ),
+    nodes AS (
+        SELECT DISTINCT ON (w.entity_key) w.*
+        FROM walk w
+        ORDER BY w.entity_key, w.depth, w.edge_path
+    )
+    SELECT n.depth, n.entity_key, kv.entity_id IS NOT NULL, kv.entity_type, kv.entity_id,
+           n.via_key, n.rel_type, n.weight, n.path
+    FROM nodes n
+    LEFT JOIN kv_store kv ON kv.tenant_id = p_tenant_id AND kv.entity_key = n.entity_key
+    ORDER BY n.depth, n.edge_path
+    LIMIT p_max_nodes;
+$$ LANGUAGE sql STABLE;
+
+-- ============================================================================
+-- REMOVE
+-- ============================================================================
+--
+-- DROP TRIGGER IF EXISTS trg_kv_store_graph_edges_insert ON kv_store;
+-- DROP TRIGGER IF EXISTS trg_kv_store_graph_edges_update ON kv_store;
+-- DROP TRIGGER IF EXISTS trg_kv_store_graph_edges_delete ON kv_store;
+-- DROP FUNCTION IF EXISTS rem_traverse_edges(VARCHAR, VARCHAR, INTEGER, TEXT[], INTEGER, INTEGER);
+-- DROP FUNCTION IF EXISTS fn_kv_graph_edges_sync_statement();
+-- DROP TABLE IF EXISTS kv_graph_edges;
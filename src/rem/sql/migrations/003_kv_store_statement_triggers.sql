@@ -0,0 +1,413 @@
+-- REM kv_store statement-level triggers (003_kv_store_statement_triggers.sql)
+--
+-- Replaces the FOR EACH ROW kv_store triggers from 002_install_models.sql with
+-- FOR EACH STATEMENT triggers that read transition tables, so a bulk INSERT,
+-- UPDATE or DELETE of N rows costs one set-based upsert/delete on kv_store
+-- instead of N trigger calls and N index probes.
+--
+-- kv_store contents are identical to the row-level triggers:
+-- - INSERT/UPDATE upsert (tenant_id, entity_key) with the same columns and
+--   ON CONFLICT behaviour; when one statement writes the same key twice, the
+--   last row wins, as it would with one trigger call per row
+-- - DELETE removes kv_store rows by entity_id
+--
+-- Transition tables are only allowed on single-event triggers, so each table
+-- gets three triggers sharing one generic function. TG_ARGV[0] names the
+-- column used as entity_key (id or name, as in the row-level functions).
+--
+-- The fn_<table>_kv_store_upsert() row functions are kept, so the old
+-- triggers can be restored if needed (see ROLLBACK at the end).
+
+-- ============================================================================
+-- PREREQUISITES CHECK
+-- ============================================================================
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM rem_migrations WHERE name = 'install_models.sql') THEN
+        RAISE EXCEPTION 'Model schema not found. Run migrations/002_install_models.sql first.';
+    END IF;
+
+    RAISE NOTICE 'Prerequisites check passed';
+END $$;
+
+-- ============================================================================
+-- GENERIC STATEMENT-LEVEL SYNC FUNCTION
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION fn_kv_store_sync_statement()
+RETURNS TRIGGER AS $$
+DECLARE
+    key_column TEXT := TG_ARGV[0];
+    changed_rows TEXT;
+BEGIN
+    IF (TG_OP = 'DELETE') THEN
+        -- Remove from KV_STORE on delete
+        DELETE FROM kv_store kv
+        USING old_rows o
+        WHERE kv.entity_id = o.id;
+        RETURN NULL;
+    END IF;
+
+    IF key_column = 'id' THEN
+        -- Primary key: one row per entity_key already
+        changed_rows := 'SELECT id::VARCHAR AS entity_key, id, tenant_id, user_id, metadata, graph_edges FROM new_rows';
+    ELSE
+        -- A statement may write the same key twice; keep the last row, as
+        -- sequential row-level upserts would (transition tables hold rows
+        -- in processing order)
+        changed_rows := format($sql$
+            SELECT DISTINCT ON (tenant_id, entity_key)
+                entity_key, id, tenant_id, user_id, metadata, graph_edges
+            FROM (
+                SELECT %I::VARCHAR AS entity_key, id, tenant_id, user_id, metadata, graph_edges,
+                       row_number() OVER () AS ordinal
+                FROM new_rows
+            ) numbered
+            ORDER BY tenant_id, entity_key, ordinal DESC
+        $sql$, key_column);
+    END IF;
+
+    -- Upsert to KV_STORE, one statement for all rows
+    EXECUTE format($sql$
+        INSERT INTO kv_store (
+            entity_key,
+            entity_type,
+            entity_id,
+            tenant_id,
+            user_id,
+            metadata,
+            graph_edges,
+            updated_at
+        )
+        SELECT
+            entity_key,
+            %L,
+            id,
+            tenant_id,
+            user_id,
+            metadata,
+            COALESCE(graph_edges, '[]'::jsonb),
+            CURRENT_TIMESTAMP
+        FROM (%s) changed
+        ON CONFLICT (tenant_id, entity_key)
+        DO UPDATE SET
+            entity_id = EXCLUDED.entity_id,
+            user_id = EXCLUDED.user_id,
+            metadata = EXCLUDED.metadata,
+            graph_edges = EXCLUDED.graph_edges,
+            updated_at = CURRENT_TIMESTAMP
+    $sql$, TG_TABLE_NAME, changed_rows);
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ======================================================================
+-- FEEDBACKS
+-- ======================================================================
+
+DROP TRIGGER IF EXISTS trg_feedbacks_kv_store ON feedbacks;
+
+DROP TRIGGER IF EXISTS trg_feedbacks_kv_store_insert ON feedbacks;
+CREATE TRIGGER trg_feedbacks_kv_store_insert
+AFTER INSERT ON feedbacks
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('id');
+
+DROP TRIGGER IF EXISTS trg_feedbacks_kv_store_update ON feedbacks;
+CREATE TRIGGER trg_feedbacks_kv_store_update
+AFTER UPDATE ON feedbacks
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('id');
+
+DROP TRIGGER IF EXISTS trg_feedbacks_kv_store_delete ON feedbacks;
+CREATE TRIGGER trg_feedbacks_kv_store_delete
+AFTER DELETE ON feedbacks
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('id');
+
+-- ======================================================================
+-- FILES
+-- ======================================================================
+
+DROP TRIGGER IF EXISTS trg_files_kv_store ON files;
+
+DROP TRIGGER IF EXISTS trg_files_kv_store_insert ON files;
+CREATE TRIGGER trg_files_kv_store_insert
+AFTER INSERT ON files
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('id');
+
+DROP TRIGGER IF EXISTS trg_files_kv_store_update ON files;
+CREATE TRIGGER trg_files_kv_store_update
+AFTER UPDATE ON files
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('id');
+
+DROP TRIGGER IF EXISTS trg_files_kv_store_delete ON files;
+CREATE TRIGGER trg_files_kv_store_delete
+AFTER DELETE ON files
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('id');
+
+-- ======================================================================
+-- IMAGE RESOURCES
+-- ======================================================================
+
+DROP TRIGGER IF EXISTS trg_image_resources_kv_store ON image_resources;
+
+DROP TRIGGER IF EXISTS trg_image_resources_kv_store_insert ON image_resources;
+CREATE TRIGGER trg_image_resources_kv_store_insert
+AFTER INSERT ON image_resources
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('name');
+
+DROP TRIGGER IF EXISTS trg_image_resources_kv_store_update ON image_resources;
+CREATE TRIGGER trg_image_resources_kv_store_update
+AFTER UPDATE ON image_resources
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('name');
+
+DROP TRIGGER IF EXISTS trg_image_resources_kv_store_delete ON image_resources;
+CREATE TRIGGER trg_image_resources_kv_store_delete
+AFTER DELETE ON image_resources
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('name');
+
+-- ======================================================================
+-- MESSAGES
+-- ======================================================================
+
+DROP TRIGGER IF EXISTS trg_messages_kv_store ON messages;
+
+DROP TRIGGER IF EXISTS trg_messages_kv_store_insert ON messages;
+CREATE TRIGGER trg_messages_kv_store_insert
+AFTER INSERT ON messages
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('id');
+
+DROP TRIGGER IF EXISTS trg_messages_kv_store_update ON messages;
+CREATE TRIGGER trg_messages_kv_store_update
+AFTER UPDATE ON messages
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('id');
+
+DROP TRIGGER IF EXISTS trg_messages_kv_store_delete ON messages;
+CREATE TRIGGER trg_messages_kv_store_delete
+AFTER DELETE ON messages
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('id');
+
+-- ======================================================================
+-- MOMENTS
+-- ======================================================================
+
+DROP TRIGGER IF EXISTS trg_moments_kv_store ON moments;
+
+DROP TRIGGER IF EXISTS trg_moments_kv_store_insert ON moments;
+CREATE TRIGGER trg_moments_kv_store_insert
+AFTER INSERT ON moments
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('name');
+
+DROP TRIGGER IF EXISTS trg_moments_kv_store_update ON moments;
+CREATE TRIGGER trg_moments_kv_store_update
+AFTER UPDATE ON moments
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('name');
+
+DROP TRIGGER IF EXISTS trg_moments_kv_store_delete ON moments;
+CREATE TRIGGER trg_moments_kv_store_delete
+AFTER DELETE ON moments
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('name');
+
+-- ======================================================================
+-- ONTOLOGIES
+-- ======================================================================
+
+DROP TRIGGER IF EXISTS trg_ontologies_kv_store ON ontologies;
+
+DROP TRIGGER IF EXISTS trg_ontologies_kv_store_insert ON ontologies;
+CREATE TRIGGER trg_ontologies_kv_store_insert
+AFTER INSERT ON ontologies
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('id');
+
+DROP TRIGGER IF EXISTS trg_ontologies_kv_store_update ON ontologies;
+CREATE TRIGGER trg_ontologies_kv_store_update
+AFTER UPDATE ON ontologies
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('id');
+
+DROP TRIGGER IF EXISTS trg_ontologies_kv_store_delete ON ontologies;
+CREATE TRIGGER trg_ontologies_kv_store_delete
+AFTER DELETE ON ontologies
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('id');
+
+-- ======================================================================
+-- ONTOLOGY CONFIGS
+-- ======================================================================
+
+DROP TRIGGER IF EXISTS trg_ontology_configs_kv_store ON ontology_configs;
+
+DROP TRIGGER IF EXISTS trg_ontology_configs_kv_store_insert ON ontology_configs;
+CREATE TRIGGER trg_ontology_configs_kv_store_insert
+AFTER INSERT ON ontology_configs
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('id');
+
+DROP TRIGGER IF EXISTS trg_ontology_configs_kv_store_update ON ontology_configs;
+CREATE TRIGGER trg_ontology_configs_kv_store_update
+AFTER UPDATE ON ontology_configs
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('id');
+
+DROP TRIGGER IF EXISTS trg_ontology_configs_kv_store_delete ON ontology_configs;
+CREATE TRIGGER trg_ontology_configs_kv_store_delete
+AFTER DELETE ON ontology_configs
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('id');
+
+-- ======================================================================
+-- RESOURCES
+-- ======================================================================
+
+DROP TRIGGER IF EXISTS trg_resources_kv_store ON resources;
+
+DROP TRIGGER IF EXISTS trg_resources_kv_store_insert ON resources;
+CREATE TRIGGER trg_resources_kv_store_insert
+AFTER INSERT ON resources
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('name');
+
+DROP TRIGGER IF EXISTS trg_resources_kv_store_update ON resources;
+CREATE TRIGGER trg_resources_kv_store_update
+AFTER UPDATE ON resources
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('name');
+
+DROP TRIGGER IF EXISTS trg_resources_kv_store_delete ON resources;
+CREATE TRIGGER trg_resources_kv_store_delete
+AFTER DELETE ON resources
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('name');
+
+-- ======================================================================
+-- SCHEMAS
+-- ======================================================================
+
+DROP TRIGGER IF EXISTS trg_schemas_kv_store ON schemas;
+
+DROP TRIGGER IF EXISTS trg_schemas_kv_store_insert ON schemas;
+CREATE TRIGGER trg_schemas_kv_store_insert
+AFTER INSERT ON schemas
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('id');
+
+DROP TRIGGER IF EXISTS trg_schemas_kv_store_update ON schemas;
+CREATE TRIGGER trg_schemas_kv_store_update
+AFTER UPDATE ON schemas
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('id');
+
+DROP TRIGGER IF EXISTS trg_schemas_kv_store_delete ON schemas;
+CREATE TRIGGER trg_schemas_kv_store_delete
+AFTER DELETE ON schemas
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('id');
+
+-- ======================================================================
+-- SESSIONS
+-- ======================================================================
+
+DROP TRIGGER IF EXISTS trg_sessions_kv_store ON sessions;
+
+DROP TRIGGER IF EXISTS trg_sessions_kv_store_insert ON sessions;
+CREATE TRIGGER trg_sessions_kv_store_insert
+AFTER INSERT ON sessions
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('name');
+
+DROP TRIGGER IF EXISTS trg_sessions_kv_store_update ON sessions;
+CREATE TRIGGER trg_sessions_kv_store_update
+AFTER UPDATE ON sessions
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('name');
+
+DROP TRIGGER IF EXISTS trg_sessions_kv_store_delete ON sessions;
+CREATE TRIGGER trg_sessions_kv_store_delete
+AFTER DELETE ON sessions
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('name');
+
+-- ======================================================================
+-- SHARED SESSIONS
+-- ======================================================================
+
+DROP TRIGGER IF EXISTS trg_shared_sessions_kv_store ON shared_sessions;
+
+DROP TRIGGER IF EXISTS trg_shared_sessions_kv_store_insert ON shared_sessions;
+CREATE TRIGGER trg_shared_sessions_kv_store_insert
+AFTER INSERT ON shared_sessions
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('id');
+
+DROP TRIGGER IF EXISTS trg_shared_sessions_kv_store_update ON shared_sessions;
+CREATE TRIGGER trg_shared_sessions_kv_store_update
+AFTER UPDATE ON shared_sessions
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('id');
+
+DROP TRIGGER IF EXISTS trg_shared_sessions_kv_store_delete ON shared_sessions;
+CREATE TRIGGER trg_shared_sessions_kv_store_delete
+AFTER DELETE ON shared_sessions
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('id');
+
+-- ======================================================================
+-- USERS
+-- ======================================================================
+
+DROP TRIGGER IF EXISTS trg_users_kv_store ON users;
+
+DROP TRIGGER IF EXISTS trg_users_kv_store_insert ON users;
+CREATE TRIGGER trg_users_kv_store_insert
+AFTER INSERT ON users
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('name');
+
+DROP TRIGGER IF EXISTS trg_users_kv_store_update ON users;
+CREATE TRIGGER trg_users_kv_store_update
+AFTER UPDATE ON users
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('name');
+
+DROP TRIGGER IF EXISTS trg_users_kv_store_delete ON users;
+CREATE TRIGGER trg_users_kv_store_delete
+AFTER DELETE ON users
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION fn_kv_store_sync_statement('name');
+
+-- ============================================================================
+-- RECORD MIGRATION
+-- ============================================================================
+
+INSERT INTO rem_migrations (name, type, version)
+VALUES ('kv_store_statement_triggers.sql', 'models', '1.0.0')
+ON CONFLICT (name) DO UPDATE
+SET applied_at = CURRENT_TIMESTAMP,
+    applied_by = CURRENT_USER;
+
+-- ============================================================================
+-- ROLLBACK (manual): restore the row-level triggers for a table, e.g.
+--
+--   DROP TRIGGER IF EXISTS trg_resources_kv_store_insert ON resources;
+--   DROP TRIGGER IF EXISTS trg_resources_kv_store_update ON resources;
+--   DROP TRIGGER IF EXISTS trg_resources_kv_store_delete ON resources;
+--   CREATE TRIGGER trg_resources_kv_store
+--   AFTER INSERT OR UPDATE OR DELETE ON resources
+--   FOR EACH ROW EXECUTE FUNCTION fn_resources_kv_store_upsert();
+-- ============================================================================
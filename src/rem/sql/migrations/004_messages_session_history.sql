@@ -0,0 +1,197 @@
+-- REM session history access path (004_messages_session_history.sql)
+--
+-- Loading an agent turn's history used to filter all of a tenant's messages,
+-- because nothing indexed session_id or created_at. This migration adds:
+--
+-- 1. idx_messages_session_history on (tenant_id, session_id, created_at, id)
+--    for live (non-deleted) messages
+-- 2. rem_session_messages(): keyset pagination, the last N messages before a
+--    (created_at, id) cursor, in chronological order
+-- 3. session_summaries + rem_session_summary_upsert(): one rolling summary
+--    row per session covering every message up to a cursor
+-- 4. rem_session_history(): summary row (if any) followed by the last N
+--    messages after it
+--
+-- Every read is an index range scan bounded by the page size, so history
+-- loads cost O(page) however long the conversation gets.
+
+-- ============================================================================
+-- PREREQUISITES CHECK
+-- ============================================================================
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM rem_migrations WHERE name = 'install_models.sql') THEN
+        RAISE EXCEPTION 'Model schema not found. Run migrations/002_install_models.sql first.';
+    END IF;
+
+    RAISE NOTICE 'Prerequisites check passed';
+END $$;
+
+-- ============================================================================
+-- SESSION HISTORY INDEX
+-- ============================================================================
+
+-- id breaks ties between messages with the same created_at, so cursors are
+-- exact. Descending pages are served by a backward scan.
+CREATE INDEX IF NOT EXISTS idx_messages_session_history
+ON messages (tenant_id, session_id, created_at, id)
+WHERE deleted_at IS NULL;
+
+-- ============================================================================
+-- KEYSET PAGINATION
+-- ============================================================================
+
+-- Last p_limit messages of a session strictly before the cursor
+-- (p_before_created_at, p_before_id), returned oldest first. Without a
+-- cursor, returns the latest messages. To page further back, pass the
+-- created_at and id of the first (oldest) row of the previous page.
+CREATE OR REPLACE FUNCTION rem_session_messages(
+    p_tenant_id VARCHAR,
+    p_session_id VARCHAR,
+    p_limit INTEGER DEFAULT 50,
+    p_before_created_at TIMESTAMP DEFAULT NULL,
+    p_before_id UUID DEFAULT NULL
+)
+RETURNS SETOF messages AS $$
+    SELECT page.*
+    FROM (
+        SELECT m.*
+        FROM messages m
+        WHERE m.tenant_id = p_tenant_id
+          AND m.session_id = p_session_id
+          AND m.deleted_at IS NULL
+          AND (m.created_at, m.id) < (
+              COALESCE(p_before_created_at, 'infinity'::timestamp),
+              COALESCE(p_before_id, '00000000-0000-0000-0000-000000000000'::uuid)
+          )
+        ORDER BY m.created_at DESC, m.id DESC
+        LIMIT p_limit
+    ) page
+    ORDER BY page.created_at, page.id;
+$$ LANGUAGE sql STABLE;
+
+-- ============================================================================
+-- ROLLING SESSION SUMMARIES
+-- ============================================================================
+
+-- One row per session summarising every message up to and including the
+-- (through_created_at, through_id) cursor. The summary text is written by
+-- the application (e.g. an LLM call) as the conversation grows.
+CREATE TABLE IF NOT EXISTS session_summaries (
+    tenant_id VARCHAR(100) NOT NULL,
+    session_id VARCHAR(256) NOT NULL,
+    summary TEXT NOT NULL,
+    through_created_at TIMESTAMP NOT NULL,
+    through_id UUID NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    token_count INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (tenant_id, session_id)
+);
+
+-- Store a session summary. The cursor only moves forward: a summary covering
+-- fewer messages than the stored one is ignored (returns false), so
+-- concurrent summarisers cannot roll it back.
+CREATE OR REPLACE FUNCTION rem_session_summary_upsert(
+    p_tenant_id VARCHAR,
+    p_session_id VARCHAR,
+    p_summary TEXT,
+    p_through_created_at TIMESTAMP,
+    p_through_id UUID,
+    p_message_count INTEGER,
+    p_token_count INTEGER DEFAULT NULL
+)
+RETURNS BOOLEAN AS $$
+    WITH upserted AS (
+        INSERT INTO session_summaries (
+            tenant_id,
+            session_id,
+            summary,
+            through_created_at,
+            through_id,
+            message_count,
+            token_count
+        ) VALUES (
+            p_tenant_id,
+            p_session_id,
+            p_summary,
+            p_through_created_at,
+            p_through_id,
+            p_message_count,
+            p_token_count
+        )
+        ON CONFLICT (tenant_id, session_id)
+        DO UPDATE SET
+            summary = EXCLUDED.summary,
+            through_created_at = EXCLUDED.through_created_at,
+            through_id = EXCLUDED.through_id,
+            message_count = EXCLUDED.message_count,
+            token_count = EXCLUDED.token_count,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE (session_summaries.through_created_at, session_summaries.through_id)
+              <= (EXCLUDED.through_created_at, EXCLUDED.through_id)
+        RETURNING 1
+    )
+    SELECT EXISTS (SELECT 1 FROM upserted);
+$$ LANGUAGE sql;
+
+-- History for an agent turn: the session summary (kind = 'summary', if one
+-- exists) followed by up to p_limit most recent messages after it
+-- (kind = 'message'), oldest first.
+CREATE OR REPLACE FUNCTION rem_session_history(
+    p_tenant_id VARCHAR,
+    p_session_id VARCHAR,
+    p_limit INTEGER DEFAULT 50
+)
+RETURNS TABLE (
+    kind TEXT,
+    id UUID,
+    message_type VARCHAR,
+    content TEXT,
+    created_at TIMESTAMP,
+    token_count INTEGER
+) AS $$
+#variable_conflict use_column
+DECLARE
+    s session_summaries%ROWTYPE;
+BEGIN
+    SELECT * INTO s
+    FROM session_summaries
+    WHERE tenant_id = p_tenant_id
+      AND session_id = p_session_id;
+
+    IF FOUND THEN
+        RETURN QUERY
+        SELECT 'summary'::TEXT, NULL::UUID, 'summary'::VARCHAR, s.summary, s.through_created_at, s.token_count;
+    END IF;
+
+    RETURN QUERY
+    SELECT 'message'::TEXT, recent.id, recent.message_type, recent.content, recent.created_at, recent.token_count
+    FROM (
+        SELECT m.id, m.message_type, m.content, m.created_at, m.token_count
+        FROM messages m
+        WHERE m.tenant_id = p_tenant_id
+          AND m.session_id = p_session_id
+          AND m.deleted_at IS NULL
+          AND (m.created_at, m.id) > (
+              COALESCE(s.through_created_at, '-infinity'::timestamp),
+              COALESCE(s.through_id, '00000000-0000-0000-0000-000000000000'::uuid)
+          )
+        ORDER BY m.created_at DESC, m.id DESC
+        LIMIT p_limit
+    ) recent
+    ORDER BY recent.created_at, recent.id;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- ============================================================================
+-- RECORD MIGRATION
+-- ============================================================================
+
+INSERT INTO rem_migrations (name, type, version)
+VALUES ('messages_session_history.sql', 'models', '1.0.0')
+ON CONFLICT (name) DO UPDATE
+SET applied_at = CURRENT_TIMESTAMP,
+    applied_by = CURRENT_USER;
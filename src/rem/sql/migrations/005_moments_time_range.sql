@@ -0,0 +1,121 @@
+-- REM moments temporal access path (005_moments_time_range.sql)
+--
+-- Timeline questions ("what happened this week about sprint-progress") used
+-- to scan every moment of a tenant: nothing indexed starts_timestamp,
+-- ends_timestamp or the tag arrays. This migration adds:
+--
+-- 1. idx_moments_time_range: GiST over the moment's time span as a tsrange,
+--    prefixed with tenant_id when btree_gist is available
+-- 2. idx_moments_starts_brin: BRIN on starts_timestamp for cheap scans of
+--    time-ordered bulk loads
+-- 3. GIN indexes on emotion_tags and topic_tags
+-- 4. rem_moments_in_window(): moments overlapping a window, with optional
+--    topic/emotion tag filters
+--
+-- Moments without ends_timestamp (or ending before they start) are treated
+-- as instants at starts_timestamp.
+
+-- ============================================================================
+-- PREREQUISITES CHECK
+-- ============================================================================
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM rem_migrations WHERE name = 'install_models.sql') THEN
+        RAISE EXCEPTION 'Model schema not found. Run migrations/002_install_models.sql first.';
+    END IF;
+
+    RAISE NOTICE 'Prerequisites check passed';
+END $$;
+
+-- ============================================================================
+-- TIME RANGE INDEXES
+-- ============================================================================
+
+-- The span expression must match rem_moments_in_window() exactly for the
+-- index to be used. GREATEST ignores a NULL ends_timestamp.
+DO $$
+BEGIN
+    BEGIN
+        CREATE EXTENSION IF NOT EXISTS btree_gist;
+    EXCEPTION WHEN undefined_file OR feature_not_supported OR insufficient_privilege THEN
+        RAISE NOTICE 'btree_gist not available: idx_moments_time_range will not include tenant_id';
+    END;
+
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'btree_gist') THEN
+        CREATE INDEX IF NOT EXISTS idx_moments_time_range
+        ON moments USING GIST (
+            tenant_id,
+            tsrange(starts_timestamp, GREATEST(starts_timestamp, ends_timestamp), '[]')
+        )
+        WHERE deleted_at IS NULL;
+    ELSE
+        CREATE INDEX IF NOT EXISTS idx_moments_time_range
+        ON moments USING GIST (
+            tsrange(starts_timestamp, GREATEST(starts_timestamp, ends_timestamp), '[]')
+        )
+        WHERE deleted_at IS NULL;
+    END IF;
+END $$;
+
+CREATE INDEX IF NOT EXISTS idx_moments_starts_brin
+ON moments USING BRIN (starts_timestamp);
+
+-- ============================================================================
+-- TAG INDEXES
+-- ============================================================================
+
+CREATE INDEX IF NOT EXISTS idx_moments_emotion_tags
+ON moments USING GIN (emotion_tags)
+WHERE deleted_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_moments_topic_tags
+ON moments USING GIN (topic_tags)
+WHERE deleted_at IS NULL;
+
+-- ============================================================================
+-- WINDOWED QUERY
+-- ============================================================================
+
+-- Moments of a tenant whose span overlaps [p_window_start, p_window_end),
+-- ordered by start time. Tag filters are optional: with p_match_all = false
+-- a moment needs any of the given tags, with true it needs all of them.
+--
+--   SELECT name, starts_timestamp FROM rem_moments_in_window(
+--       'acme', date_trunc('week', now()::timestamp), now()::timestamp,
+--       p_topic_tags => ARRAY['sprint-progress']);
+CREATE OR REPLACE FUNCTION rem_moments_in_window(
+    p_tenant_id VARCHAR,
+    p_window_start TIMESTAMP,
+    p_window_end TIMESTAMP,
+    p_topic_tags TEXT[] DEFAULT NULL,
+    p_emotion_tags TEXT[] DEFAULT NULL,
+    p_match_all BOOLEAN DEFAULT false,
+    p_limit INTEGER DEFAULT 100
+)
+RETURNS SETOF moments AS $$
+    SELECT m.*
+    FROM moments m
+    WHERE m.tenant_id = p_tenant_id
+      AND m.deleted_at IS NULL
+      AND tsrange(m.starts_timestamp, GREATEST(m.starts_timestamp, m.ends_timestamp), '[]')
+          && tsrange(p_window_start, p_window_end, '[)')
+      AND (p_topic_tags IS NULL
+           OR (p_match_all AND m.topic_tags @> p_topic_tags)
+           OR (NOT p_match_all AND m.topic_tags && p_topic_tags))
+      AND (p_emotion_tags IS NULL
+           OR (p_match_all AND m.emotion_tags @> p_emotion_tags)
+           OR (NOT p_match_all AND m.emotion_tags && p_emotion_tags))
+    ORDER BY m.starts_timestamp, m.id
+    LIMIT p_limit;
+$$ LANGUAGE sql STABLE;
+
+-- ============================================================================
+-- RECORD MIGRATION
+-- ============================================================================
+
+INSERT INTO rem_migrations (name, type, version)
+VALUES ('moments_time_range.sql', 'models', '1.0.0')
+ON CONFLICT (name) DO UPDATE
+SET applied_at = CURRENT_TIMESTAMP,
+    applied_by = CURRENT_USER;
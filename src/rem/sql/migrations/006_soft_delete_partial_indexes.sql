@@ -0,0 +1,343 @@
+-- REM soft-delete aware indexes and tombstone compaction (006_soft_delete_partial_indexes.sql)
+--
+-- Every entity table carries deleted_at, but the indexes from
+-- 002_install_models.sql and the kv_store triggers also cover tombstoned
+-- rows. Where most messages and sessions are soft-deleted, hot indexes are
+-- mostly dead entries and LOOKUP still resolves deleted entities. This
+-- migration:
+--
+-- 1. Rebuilds idx_<table>_tenant, _user, _graph_edges, _metadata and _tags as
+--    partial indexes WHERE deleted_at IS NULL (same names, so nothing that
+--    refers to them changes). Queries must filter on deleted_at IS NULL to
+--    use them.
+-- 2. Adds idx_<table>_tombstones on deleted_at for the deleted rows only,
+--    which is what compaction and "trash" listings scan.
+-- 3. Makes fn_kv_store_sync_statement() (003) keep only live rows in
+--    kv_store, and removes the kv_store rows of already deleted entities.
+-- 4. Adds tombstone_archive and rem_compact_tombstones(), which hard-deletes
+--    (optionally archiving) rows deleted longer ago than a retention
+--    interval, in batches that commit separately.
+--
+-- 002_install_models.sql is generated; the schema generator should emit the
+-- same partial indexes so fresh installs match.
+--
+-- Index rebuilds here take a write lock per table. On large deployments,
+-- create the partial indexes CONCURRENTLY under temporary names first; this
+-- migration then skips any index that is already partial.
+
+-- ============================================================================
+-- PREREQUISITES CHECK
+-- ============================================================================
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM rem_migrations WHERE name = 'install_models.sql') THEN
+        RAISE EXCEPTION 'Model schema not found. Run migrations/002_install_models.sql first.';
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM rem_migrations WHERE name = 'kv_store_statement_triggers.sql') THEN
+        RAISE EXCEPTION 'Statement-level kv_store triggers not found. Run migrations/003_kv_store_statement_triggers.sql first.';
+    END IF;
+
+    RAISE NOTICE 'Prerequisites check passed';
+END $$;
+
+-- ============================================================================
+-- PARTIAL INDEXES
+-- ============================================================================
+
+DO $$
+DECLARE
+    entity_table TEXT;
+    index_suffix TEXT;
+    index_name TEXT;
+    index_method TEXT;
+    index_column TEXT;
+BEGIN
+    FOREACH entity_table IN ARRAY ARRAY[
+        'feedbacks', 'files', 'image_resources', 'messages', 'moments', 'ontologies',
+        'ontology_configs', 'resources', 'schemas', 'sessions', 'shared_sessions', 'users'
+    ] LOOP
+        FOREACH index_suffix IN ARRAY ARRAY['tenant', 'user', 'graph_edges', 'metadata', 'tags'] LOOP
+            index_name := format('idx_%s_%s', entity_table, index_suffix);
+            index_method := CASE WHEN index_suffix IN ('tenant', 'user') THEN 'btree' ELSE 'gin' END;
+            index_column := CASE index_suffix
+                WHEN 'tenant' THEN 'tenant_id'
+                WHEN 'user' THEN 'user_id'
+                ELSE index_suffix
+            END;
+
+            IF EXISTS (
+                SELECT 1 FROM pg_index i
+                WHERE i.indexrelid = to_regclass(index_name)
+                  AND i.indpred IS NOT NULL
+            ) THEN
+                CONTINUE;
+            END IF;
+
+            -- Build the replacement first (dropping leftovers of an
+            -- interrupted run), then swap names
+            IF to_regclass(index_name || '_live') IS NOT NULL THEN
+                EXECUTE format('DROP INDEX %I', index_name || '_live');
+            END IF;
+            EXECUTE format('CREATE INDEX %I ON %I USING %s (%I) WHERE deleted_at IS NULL',
+                           index_name || '_live', entity_table, index_method, index_column);
+            EXECUTE format('DROP INDEX IF EXISTS %I', index_name);
+            EXECUTE format('ALTER INDEX %I RENAME TO %I', index_name || '_live', index_name);
+        END LOOP;
+
+        EXECUTE format('CREATE INDEX IF NOT EXISTS %I ON %I (deleted_at) WHERE deleted_at IS NOT NULL',
+                       format('idx_%s_tombstones', entity_table), entity_table);
+    END LOOP;
+END $$;
+
+-- ============================================================================
+-- KV_STORE: LIVE ROWS ONLY
+-- ============================================================================
+
+-- Same as in 003, except that soft-deleted rows are removed from kv_store
+-- instead of upserted, and restored rows (deleted_at set back to NULL) are
+-- upserted again.
+CREATE OR REPLACE FUNCTION fn_kv_store_sync_statement()
+RETURNS TRIGGER AS $$
+DECLARE
+    key_column TEXT := TG_ARGV[0];
+    changed_rows TEXT;
+BEGIN
+    IF (TG_OP = 'DELETE') THEN
+        -- Remove from KV_STORE on delete
+        DELETE FROM kv_store kv
+        USING old_rows o
+        WHERE kv.entity_id = o.id;
+        RETURN NULL;
+    END IF;
+
+    -- Remove soft-deleted rows from KV_STORE
+    DELETE FROM kv_store kv
+    USING new_rows n
+    WHERE n.deleted_at IS NOT NULL
+      AND kv.entity_id = n.id;
+
+    IF key_column = 'id' THEN
+        -- Primary key: one row per entity_key already
+        changed_rows := $sql$
+            SELECT id::VARCHAR AS entity_key, id, tenant_id, user_id, metadata, graph_edges
+            FROM new_rows
+            WHERE deleted_at IS NULL
+        $sql$;
+    ELSE
+        -- A statement may write the same key twice; keep the last row, as
+        -- sequential row-level upserts would (transition tables hold rows
+        -- in processing order)
+        changed_rows := format($sql$
+            SELECT DISTINCT ON (tenant_id, entity_key)
+                entity_key, id, tenant_id, user_id, metadata, graph_edges
+            FROM (
+                SELECT %I::VARCHAR AS entity_key, id, tenant_id, user_id, metadata, graph_edges,
+                       deleted_at, row_number() OVER () AS ordinal
+                FROM new_rows
+            ) numbered
+            WHERE deleted_at IS NULL
+            ORDER BY tenant_id, entity_key, ordinal DESC
+        $sql$, key_column);
+    END IF;
+
+    -- Upsert to KV_STORE, one statement for all rows
+    EXECUTE format($sql$
+        INSERT INTO kv_store (
+            entity_key,
+            entity_type,
+            entity_id,
+            tenant_id,
+            user_id,
+            metadata,
+            graph_edges,
+            updated_at
+        )
+        SELECT
+            entity_key,
+            %L,
+            id,
+            tenant_id,
+            user_id,
+            metadata,
+            COALESCE(graph_edges, '[]'::jsonb),
+            CURRENT_TIMESTAMP
+        FROM (%s) changed
+        ON CONFLICT (tenant_id, entity_key)
+        DO UPDATE SET
+            entity_id = EXCLUDED.entity_id,
+            user_id = EXCLUDED.user_id,
+            metadata = EXCLUDED.metadata,
+            graph_edges = EXCLUDED.graph_edges,
+            updated_at = CURRENT_TIMESTAMP
+    $sql$, TG_TABLE_NAME, changed_rows);
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Drop kv_store rows of entities that were soft-deleted before this migration
+DO $$
+DECLARE
+    entity_table TEXT;
+    removed BIGINT;
+BEGIN
+    FOREACH entity_table IN ARRAY ARRAY[
+        'feedbacks', 'files', 'image_resources', 'messages', 'moments', 'ontologies',
+        'ontology_configs', 'resources', 'schemas', 'sessions', 'shared_sessions', 'users'
+    ] LOOP
+        EXECUTE format($sql$
+            DELETE FROM kv_store kv
+            USING %I t
+            WHERE t.deleted_at IS NOT NULL
+              AND kv.entity_id = t.id
+              AND kv.entity_type = %L
+        $sql$, entity_table, entity_table);
+        GET DIAGNOSTICS removed = ROW_COUNT;
+
+        IF removed > 0 THEN
+            RAISE NOTICE 'Removed % soft-deleted % from kv_store', removed, entity_table;
+        END IF;
+    END LOOP;
+END $$;
+
+-- ============================================================================
+-- TOMBSTONE COMPACTION
+-- ============================================================================
+
+-- Full rows of compacted entities, for audit or undelete after compaction.
+-- Embeddings are not archived (they cascade with the entity and can be
+-- regenerated).
+CREATE TABLE IF NOT EXISTS tombstone_archive (
+    entity_type VARCHAR(100) NOT NULL,
+    entity_id UUID NOT NULL,
+    tenant_id VARCHAR(100),
+    deleted_at TIMESTAMP,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    data JSONB NOT NULL,
+    PRIMARY KEY (entity_type, entity_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_tombstone_archive_tenant
+ON tombstone_archive (tenant_id, entity_type);
+
+-- Hard-delete up to p_batch_size rows of one table that were soft-deleted
+-- more than p_older_than ago (deleted_at is a local TIMESTAMP, so the cutoff
+-- is LOCALTIMESTAMP - p_older_than), oldest first, copying them to
+-- tombstone_archive when p_archive is true. Returns the number of rows
+-- removed. Rows locked by other transactions are skipped.
+CREATE OR REPLACE FUNCTION rem_compact_tombstones_batch(
+    p_table TEXT,
+    p_older_than INTERVAL DEFAULT INTERVAL '30 days',
+    p_batch_size INTEGER DEFAULT 5000,
+    p_archive BOOLEAN DEFAULT true
+)
+RETURNS INTEGER AS $$
+DECLARE
+    removed INTEGER;
+BEGIN
+    IF p_batch_size IS NULL OR p_batch_size < 1 THEN
+        RAISE EXCEPTION 'p_batch_size must be at least 1, got %', p_batch_size;
+    END IF;
+
+    IF p_archive THEN
+        EXECUTE format($sql$
+            WITH doomed AS (
+                SELECT id FROM %1$I
+                WHERE deleted_at IS NOT NULL
+                  AND deleted_at < LOCALTIMESTAMP - $1
+                ORDER BY deleted_at
+                LIMIT $2
+                FOR UPDATE SKIP LOCKED
+            ), removed AS (
+                DELETE FROM %1$I t
+                USING doomed d
+                WHERE t.id = d.id
+                RETURNING t.*
+            )
+            INSERT INTO tombstone_archive (entity_type, entity_id, tenant_id, deleted_at, data)
+            SELECT %2$L, r.id, r.tenant_id, r.deleted_at, to_jsonb(r)
+            FROM removed r
+            ON CONFLICT (entity_type, entity_id)
+            DO UPDATE SET
+                tenant_id = EXCLUDED.tenant_id,
+                deleted_at = EXCLUDED.deleted_at,
+                archived_at = CURRENT_TIMESTAMP,
+                data = EXCLUDED.data
+        $sql$, p_table, p_table)
+        USING p_older_than, p_batch_size;
+    ELSE
+        EXECUTE format($sql$
+            WITH doomed AS (
+                SELECT id FROM %1$I
+                WHERE deleted_at IS NOT NULL
+                  AND deleted_at < LOCALTIMESTAMP - $1
+                ORDER BY deleted_at
+                LIMIT $2
+                FOR UPDATE SKIP LOCKED
+            )
+            DELETE FROM %1$I t
+            USING doomed d
+            WHERE t.id = d.id
+        $sql$, p_table)
+        USING p_older_than, p_batch_size;
+    END IF;
+
+    GET DIAGNOSTICS removed = ROW_COUNT;
+    RETURN removed;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Compact every entity table (or only p_table), committing after each batch
+-- so locks stay short and autovacuum can reclaim space as it goes. Run
+-- outside a transaction block, e.g. nightly:
+--
+--   CALL rem_compact_tombstones();                          -- archive, 30 days
+--   CALL rem_compact_tombstones(INTERVAL '7 days', p_archive => false, p_table => 'messages');
+CREATE OR REPLACE PROCEDURE rem_compact_tombstones(
+    p_older_than INTERVAL DEFAULT INTERVAL '30 days',
+    p_batch_size INTEGER DEFAULT 5000,
+    p_archive BOOLEAN DEFAULT true,
+    p_table TEXT DEFAULT NULL
+)
+AS $$
+DECLARE
+    entity_table TEXT;
+    removed INTEGER;
+    total BIGINT;
+BEGIN
+    IF p_batch_size IS NULL OR p_batch_size < 1 THEN
+        RAISE EXCEPTION 'p_batch_size must be at least 1, got %', p_batch_size;
+    END IF;
+
+    FOREACH entity_table IN ARRAY ARRAY[
+        'feedbacks', 'files', 'image_resources', 'messages', 'moments', 'ontologies',
+        'ontology_configs', 'resources', 'schemas', 'sessions', 'shared_sessions', 'users'
+    ] LOOP
+        CONTINUE WHEN p_table IS NOT NULL AND entity_table <> p_table;
+
+        total := 0;
+        LOOP
+            removed := rem_compact_tombstones_batch(entity_table, p_older_than, p_batch_size, p_archive);
+            total := total + removed;
+            COMMIT;
+            EXIT WHEN removed < p_batch_size;
+        END LOOP;
+
+        IF total > 0 THEN
+            RAISE NOTICE 'Compacted % tombstones from %', total, entity_table;
+        END IF;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================================================
+-- RECORD MIGRATION
+-- ============================================================================
+
+INSERT INTO rem_migrations (name, type, version)
+VALUES ('soft_delete_partial_indexes.sql', 'models', '1.0.0')
+ON CONFLICT (name) DO UPDATE
+SET applied_at = CURRENT_TIMESTAMP,
+    applied_by = CURRENT_USER;
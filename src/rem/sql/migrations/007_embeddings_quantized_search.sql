@@ -0,0 +1,103 @@
+-- REM reduced-precision embedding search (007_embeddings_quantized_search.sql)
+--
+-- Every embeddings_<table> stores vector(1536) as float32 (~6 KB per row),
+-- so the float32 HNSW indexes are large. src/rem/sql/quantized_indexes.sql
+-- adds optional expression indexes over reduced copies of the same column:
+--
+-- - embedding::halfvec(1536)                  (halfvec_cosine_ops)
+-- - binary_quantize(embedding)::bit(1536)     (bit_hamming_ops)
+--
+-- This migration adds rem_search_embeddings_quantized(), a two-stage search:
+-- 1. candidate scan on the reduced index (Hamming distance for 'binary',
+--    halfvec cosine distance for 'halfvec'), p_candidates rows
+-- 2. exact cosine re-rank of the candidates on the full vectors in the table
+--
+-- More candidates trade latency for recall; see
+-- src/rem/sql/benchmarks/embeddings_quantized_recall.sql. halfvec and
+-- binary_quantize need pgvector 0.7+. The function uses dynamic SQL, so this
+-- migration applies on older versions and only calling it fails.
+
+-- ============================================================================
+-- PREREQUISITES CHECK
+-- ============================================================================
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM rem_migrations WHERE name = 'install_models.sql') THEN
+        RAISE EXCEPTION 'Model schema not found. Run migrations/002_install_models.sql first.';
+    END IF;
+
+    IF (SELECT string_to_array(extversion, '.')::int[] < ARRAY[0, 7]
+        FROM pg_extension WHERE extname = 'vector') THEN
+        RAISE NOTICE 'pgvector % is older than 0.7: rem_search_embeddings_quantized() needs halfvec and binary_quantize',
+            (SELECT extversion FROM pg_extension WHERE extname = 'vector');
+    END IF;
+
+    RAISE NOTICE 'Prerequisites check passed';
+END $$;
+
+-- ============================================================================
+-- TWO-STAGE SEARCH
+-- ============================================================================
+
+-- Top p_limit rows of embeddings_<table> by cosine similarity to p_query,
+-- re-ranked from p_candidates candidates found on the reduced index.
+-- p_table is the embeddings table name, e.g. 'embeddings_resources'.
+--
+--   SELECT * FROM rem_search_embeddings_quantized(
+--       'embeddings_resources', '[...]'::vector, p_limit => 10, p_candidates => 200);
+CREATE OR REPLACE FUNCTION rem_search_embeddings_quantized(
+    p_table TEXT,
+    p_query vector,
+    p_limit INTEGER DEFAULT 10,
+    p_candidates INTEGER DEFAULT 100,
+    p_mode TEXT DEFAULT 'binary',
+    p_field_name VARCHAR DEFAULT NULL,
+    p_provider VARCHAR DEFAULT NULL
+)
+RETURNS TABLE (
+    entity_id UUID,
+    field_name VARCHAR,
+    similarity DOUBLE PRECISION
+) AS $$
+DECLARE
+    candidate_order TEXT;
+BEGIN
+    -- Must match the index expressions in quantized_indexes.sql
+    candidate_order := CASE p_mode
+        WHEN 'binary' THEN 'binary_quantize(e.embedding)::bit(1536) <~> binary_quantize($1)'
+        WHEN 'halfvec' THEN 'e.embedding::halfvec(1536) <=> $1::halfvec(1536)'
+    END;
+    IF candidate_order IS NULL THEN
+        RAISE EXCEPTION 'Unknown search mode: % (expected binary or halfvec)', p_mode;
+    END IF;
+
+    -- An HNSW scan returns at most ef_search rows
+    PERFORM set_config('hnsw.ef_search', LEAST(GREATEST(p_candidates, 40), 1000)::TEXT, true);
+
+    RETURN QUERY EXECUTE format($sql$
+        SELECT c.entity_id, c.field_name, 1 - (c.embedding <=> $1)
+        FROM (
+            SELECT e.entity_id, e.field_name, e.embedding
+            FROM %I e
+            WHERE ($3::VARCHAR IS NULL OR e.field_name = $3)
+              AND ($4::VARCHAR IS NULL OR e.provider = $4)
+            ORDER BY %s
+            LIMIT $2
+        ) c
+        ORDER BY c.embedding <=> $1
+        LIMIT $5
+    $sql$, p_table, candidate_order)
+    USING p_query, p_candidates, p_field_name, p_provider, p_limit;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================================================
+-- RECORD MIGRATION
+-- ============================================================================
+
+INSERT INTO rem_migrations (name, type, version)
+VALUES ('embeddings_quantized_search.sql', 'models', '1.0.0')
+ON CONFLICT (name) DO UPDATE
+SET applied_at = CURRENT_TIMESTAMP,
+    applied_by = CURRENT_USER;
@@ -0,0 +1,195 @@
+-- REM hybrid lexical + vector search (008_hybrid_search.sql)
+--
+-- FUZZY/lexical and SEARCH/semantic queries run separately and agents merge
+-- them client-side, and nothing indexes the text of content-bearing tables.
+-- This migration adds:
+--
+-- 1. search_vector: a generated tsvector column (entity name weighted above
+--    body text) with a GIN index for live rows on resources, messages,
+--    moments and files
+-- 2. rem_hybrid_search(): full-text ranking and HNSW search in one query,
+--    fused with Reciprocal Rank Fusion (RRF)
+--
+-- Adding a stored generated column rewrites the table, holding an exclusive
+-- lock; apply during a maintenance window on large tables.
+
+-- ============================================================================
+-- PREREQUISITES CHECK
+-- ============================================================================
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM rem_migrations WHERE name = 'install_models.sql') THEN
+        RAISE EXCEPTION 'Model schema not found. Run migrations/002_install_models.sql first.';
+    END IF;
+
+    RAISE NOTICE 'Prerequisites check passed';
+END $$;
+
+-- ============================================================================
+-- FULL-TEXT COLUMNS
+-- ============================================================================
+
+-- The same text that is embedded (content, or summary for moments), with
+-- the entity name as a higher-weighted field where there is one
+ALTER TABLE resources ADD COLUMN IF NOT EXISTS search_vector tsvector
+GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(content, '')), 'B')
+) STORED;
+
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS search_vector tsvector
+GENERATED ALWAYS AS (
+    to_tsvector('english', coalesce(content, ''))
+) STORED;
+
+ALTER TABLE moments ADD COLUMN IF NOT EXISTS search_vector tsvector
+GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(summary, '')), 'B')
+) STORED;
+
+ALTER TABLE files ADD COLUMN IF NOT EXISTS search_vector tsvector
+GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(content, '')), 'B')
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_resources_search_vector
+ON resources USING GIN (search_vector)
+WHERE deleted_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_messages_search_vector
+ON messages USING GIN (search_vector)
+WHERE deleted_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_moments_search_vector
+ON moments USING GIN (search_vector)
+WHERE deleted_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_files_search_vector
+ON files USING GIN (search_vector)
+WHERE deleted_at IS NULL;
+
+-- ============================================================================
+-- HYBRID SEARCH
+-- ============================================================================
+
+-- Top p_limit live entities of one table for a tenant, ranked by RRF over
+-- two candidate lists of p_candidates rows each:
+--
+-- - lexical: websearch_to_tsquery match on search_vector, ranked by
+--   ts_rank_cd with document length normalisation
+-- - semantic: HNSW cosine search on embeddings_<table> (field p_field_name,
+--   by default the table's embedded text field, and provider p_provider
+--   when given), one row per entity at its closest embedding
+--
+-- The semantic list is filtered to the tenant's live entities inside the
+-- vector search, before its limit. An HNSW scan only yields ef_search
+-- candidates, though, and on pgvector < 0.8 the filter can only discard
+-- them: ef_search defaults to 10 x p_candidates (at most 1000), which is
+-- enough while the tenant holds more than about a tenth of the table.
+-- Raise p_ef_search for smaller tenants. On pgvector 0.8+ the scan is
+-- iterative and keeps going until p_candidates rows pass the filter.
+--
+-- rrf_score = sum over lists of 1 / (p_rrf_k + rank). Either query may be
+-- NULL to search with the other alone. Ranks and scores of both lists are
+-- returned for debugging and re-weighting.
+--
+--   SELECT r.name, h.rrf_score
+--   FROM rem_hybrid_search('resources', 'acme', 'challenging negative thoughts', '[...]'::vector) h
+--   JOIN resources r ON r.id = h.id;
+CREATE OR REPLACE FUNCTION rem_hybrid_search(
+    p_table TEXT,
+    p_tenant_id VARCHAR,
+    p_query_text TEXT,
+    p_query_embedding vector,
+    p_limit INTEGER DEFAULT 10,
+    p_candidates INTEGER DEFAULT 50,
+    p_rrf_k INTEGER DEFAULT 60,
+    p_field_name VARCHAR DEFAULT NULL,
+    p_ef_search INTEGER DEFAULT NULL,
+    p_provider VARCHAR DEFAULT NULL
+)
+RETURNS TABLE (
+    id UUID,
+    rrf_score DOUBLE PRECISION,
+    lexical_rank BIGINT,
+    lexical_score REAL,
+    semantic_rank BIGINT,
+    similarity DOUBLE PRECISION
+) AS $$
+BEGIN
+    IF p_table NOT IN ('resources', 'messages', 'moments', 'files') THEN
+        RAISE EXCEPTION 'Hybrid search is not available for table: %', p_table;
+    END IF;
+
+    p_field_name := COALESCE(p_field_name, CASE p_table WHEN 'moments' THEN 'summary' ELSE 'content' END);
+
+    -- An HNSW scan returns at most ef_search rows before the tenant filter
+    PERFORM set_config('hnsw.ef_search', LEAST(GREATEST(COALESCE(p_ef_search, p_candidates * 10), 40), 1000)::TEXT, true);
+    IF (SELECT string_to_array(extversion, '.')::INTEGER[] >= ARRAY[0, 8]
+        FROM pg_extension WHERE extname = 'vector') THEN
+        PERFORM set_config('hnsw.iterative_scan', 'strict_order', true);
+    END IF;
+
+    RETURN QUERY EXECUTE format($sql$
+        WITH lexical AS (
+            SELECT t.id, ts_rank_cd(t.search_vector, q.query, 1) AS score,
+                   row_number() OVER (ORDER BY ts_rank_cd(t.search_vector, q.query, 1) DESC, t.id) AS rank
+            FROM %1$I t, websearch_to_tsquery('english', $2) AS q(query)
+            WHERE $2 IS NOT NULL
+              AND t.tenant_id = $1
+              AND t.deleted_at IS NULL
+              AND t.search_vector @@ q.query
+            ORDER BY score DESC, t.id
+            LIMIT $4
+        ),
+        nearest AS (
+            SELECT e.entity_id, e.embedding <=> $3 AS distance
+            FROM %2$I e
+            JOIN %1$I t ON t.id = e.entity_id
+            WHERE $3 IS NOT NULL
+              AND e.field_name = $6
+              AND ($8 IS NULL OR e.provider = $8)
+              AND t.tenant_id = $1
+              AND t.deleted_at IS NULL
+            ORDER BY e.embedding <=> $3
+            LIMIT $4
+        ),
+        -- An entity embedded by several providers is ranked once
+        closest AS (
+            SELECT DISTINCT ON (n.entity_id) n.entity_id, n.distance
+            FROM nearest n
+            ORDER BY n.entity_id, n.distance
+        ),
+        semantic AS (
+            SELECT c.entity_id AS id, 1 - c.distance AS similarity,
+                   row_number() OVER (ORDER BY c.distance, c.entity_id) AS rank
+            FROM closest c
+        )
+        SELECT
+            COALESCE(l.id, s.id),
+            (COALESCE(1.0 / ($5 + l.rank), 0) + COALESCE(1.0 / ($5 + s.rank), 0))::DOUBLE PRECISION,
+            l.rank,
+            l.score,
+            s.rank,
+            s.similarity
+        FROM lexical l
+        FULL OUTER JOIN semantic s ON s.id = l.id
+        ORDER BY 2 DESC, COALESCE(l.rank, s.rank), 1
+        LIMIT $7
+    $sql$, p_table, 'embeddings_' || p_table)
+    USING p_tenant_id, p_query_text, p_query_embedding, p_candidates, p_rrf_k, p_field_name, p_limit, p_provider;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================================================
+-- RECORD MIGRATION
+-- ============================================================================
+
+INSERT INTO rem_migrations (name, type, version)
+VALUES ('hybrid_search.sql', 'models', '1.0.0')
+ON CONFLICT (name) DO UPDATE
+SET applied_at = CURRENT_TIMESTAMP,
+    applied_by = CURRENT_USER;
@@ -0,0 +1,107 @@
+-- REM batched kv_store lookups (009_kv_store_lookup_many.sql)
+--
+-- kv_store is the O(1) entity_key cache maintained by the per-table
+-- triggers, but LOOKUP resolves one key per query, so a TRAVERSE that
+-- follows parent / child / related edges costs one round-trip per key.
+-- This migration adds:
+--
+-- 1. rem_kv_lookup_many(): any number of (tenant_id, entity_key) pairs
+--    resolved in one call, in input order, with misses marked
+-- 2. rem_kv_get_many(): the same for a list of keys in a single tenant
+--
+-- Both are a single join of the input against the kv_store primary key.
+-- See scripts/bench_kv_lookup.py for per-key vs batched traversal latency.
+
+-- ============================================================================
+-- PREREQUISITES CHECK
+-- ============================================================================
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM rem_migrations WHERE name = 'install_models.sql') THEN
+        RAISE EXCEPTION 'Model schema not found. Run migrations/002_install_models.sql first.';
+    END IF;
+
+    RAISE NOTICE 'Prerequisites check passed';
+END $$;
+
+-- ============================================================================
+-- BATCHED LOOKUP
+-- ============================================================================
+
+-- One row per input pair (p_tenant_ids[i], p_entity_keys[i]), ordered by
+-- ordinal = i. Keys that are not in kv_store come back with found = false
+-- and NULL kv_store columns; duplicate pairs are returned once per
+-- occurrence.
+--
+--   SELECT ordinal, entity_key, found, entity_type, entity_id
+--   FROM rem_kv_lookup_many(ARRAY['acme', 'acme', 'public'],
+--                           ARRAY['cbt-essential-skills', 'automatic-thoughts', 'cognitive-distortions']);
+CREATE OR REPLACE FUNCTION rem_kv_lookup_many(
+    p_tenant_ids VARCHAR[],
+    p_entity_keys VARCHAR[]
+)
+RETURNS TABLE (
+    ordinal BIGINT,
+    tenant_id VARCHAR,
+    entity_key VARCHAR,
+    found BOOLEAN,
+    entity_type VARCHAR,
+    entity_id UUID,
+    user_id VARCHAR,
+    metadata JSONB,
+    graph_edges JSONB,
+    updated_at TIMESTAMP
+) AS $$
+#variable_conflict use_column
+BEGIN
+    IF COALESCE(cardinality(p_tenant_ids), 0) <> COALESCE(cardinality(p_entity_keys), 0) THEN
+        RAISE EXCEPTION 'rem_kv_lookup_many: % tenant ids for % entity keys',
+            COALESCE(cardinality(p_tenant_ids), 0), COALESCE(cardinality(p_entity_keys), 0);
+    END IF;
+
+    RETURN QUERY
+    SELECT k.ordinal, k.tenant_id, k.entity_key, kv.entity_id IS NOT NULL,
+           kv.entity_type, kv.entity_id, kv.user_id, kv.metadata, kv.graph_edges, kv.updated_at
+    FROM unnest(p_tenant_ids, p_entity_keys) WITH ORDINALITY AS k(tenant_id, entity_key, ordinal)
+    LEFT JOIN kv_store kv ON kv.tenant_id = k.tenant_id AND kv.entity_key = k.entity_key
+    ORDER BY k.ordinal;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- rem_kv_lookup_many() for keys of a single tenant, e.g. the dst keys of
+-- one entity's graph_edges:
+--
+--   SELECT g.* FROM kv_store kv,
+--        rem_kv_get_many(kv.tenant_id,
+--                        ARRAY(SELECT e->>'dst' FROM jsonb_array_elements(kv.graph_edges) e)) g
+--   WHERE kv.tenant_id = 'acme' AND kv.entity_key = 'cbt-essential-skills';
+CREATE OR REPLACE FUNCTION rem_kv_get_many(
+    p_tenant_id VARCHAR,
+    p_entity_keys VARCHAR[]
+)
+RETURNS TABLE (
+    ordinal BIGINT,
+    tenant_id VARCHAR,
+    entity_key VARCHAR,
+    found BOOLEAN,
+    entity_type VARCHAR,
+    entity_id UUID,
+    user_id VARCHAR,
+    metadata JSONB,
+    graph_edges JSONB,
+    updated_at TIMESTAMP
+) AS $$
+    SELECT *
+    FROM rem_kv_lookup_many(array_fill(p_tenant_id, ARRAY[COALESCE(cardinality(p_entity_keys), 0)]), p_entity_keys);
+$$ LANGUAGE sql STABLE;
+
+-- ============================================================================
+-- RECORD MIGRATION
+-- ============================================================================
+
+INSERT INTO rem_migrations (name, type, version)
+VALUES ('kv_store_lookup_many.sql', 'models', '1.0.0')
+ON CONFLICT (name) DO UPDATE
+SET applied_at = CURRENT_TIMESTAMP,
+    applied_by = CURRENT_USER;
@@ -0,0 +1,122 @@
+-- REM server-side graph traversal (010_graph_traverse.sql)
+--
+-- graph_edges ({dst, rel_type, weight, properties} objects keyed by
+-- entity_key) is mirrored into kv_store, but TRAVERSE had no server-side
+-- implementation: each hop was a LOOKUP plus client-side edge parsing.
+-- This migration adds rem_traverse(): a recursive CTE over
+-- kv_store.graph_edges returning the whole subgraph around one entity_key in
+-- one query, with cycle detection, depth and fan-out limits and edge-type
+-- filters.
+--
+-- src/rem/sql/graph_edges.sql is an opt-in companion: an adjacency table
+-- (one row per edge) synced from kv_store by triggers, and
+-- rem_traverse_edges() over it. It costs an extra write per edge on every
+-- kv_store change, so it is not part of the migrations.
+
+-- ============================================================================
+-- PREREQUISITES CHECK
+-- ============================================================================
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM rem_migrations WHERE name = 'install_models.sql') THEN
+        RAISE EXCEPTION 'Model schema not found. Run migrations/002_install_models.sql first.';
+    END IF;
+
+    RAISE NOTICE 'Prerequisites check passed';
+END $$;
+
+-- ============================================================================
+-- TRAVERSAL OVER KV_STORE.GRAPH_EDGES
+-- ============================================================================
+
+-- Entities reachable from p_entity_key within p_max_depth hops, following
+-- at most p_max_fanout edges per entity (in graph_edges order, not counting
+-- edges back into the current path) whose rel_type is in p_rel_types (all
+-- edges when NULL).
+--
+-- Each entity_key is returned once, at its shallowest depth, with the edge
+-- it was first reached by (via_key, rel_type, weight) and the key path from
+-- the start; the start itself is depth 0. Rows are in breadth-first order.
+-- Paths never revisit a key, so cycles end the walk; the work is still up
+-- to p_max_fanout ^ p_max_depth paths on densely connected graphs, and at
+-- most p_max_nodes rows are returned. Edges to keys that are not in
+-- kv_store come back with found = false and are not expanded. graph_edges
+-- values that are not arrays, elements without a dst and non-numeric
+-- weights are skipped (weight is NULL) rather than failing the walk.
+--
+--   SELECT depth, entity_key, rel_type, via_key
+--   FROM rem_traverse('acme', 'cbt-essential-skills', 2, ARRAY['child', 'related']);
+CREATE OR REPLACE FUNCTION rem_traverse(
+    p_tenant_id VARCHAR,
+    p_entity_key VARCHAR,
+    p_max_depth INTEGER DEFAULT 2,
+    p_rel_types TEXT[] DEFAULT NULL,
+    p_max_fanout INTEGER DEFAULT 50,
+    p_max_nodes INTEGER DEFAULT 1000
+)
+RETURNS TABLE (
+    depth INTEGER,
+    entity_key VARCHAR,
+    found BOOLEAN,
+    entity_type VARCHAR,
+    entity_id UUID,
+    via_key VARCHAR,
+    rel_type VARCHAR,
+    weight DOUBLE PRECISION,
+    path VARCHAR[]
+) AS $$
+    WITH RECURSIVE walk (depth, entity_key, via_key, rel_type, weight, path, edge_path) AS (
+        SELECT 0, p_entity_key, NULL::VARCHAR, NULL::VARCHAR, NULL::DOUBLE PRECISION,
+               ARRAY[p_entity_key], ARRAY[]::BIGINT[]
+        UNION ALL
+        SELECT w.depth + 1, e.dst, w.entity_key, e.rel_type, e.weight,
+               w.path || e.dst, w.edge_path || e.ordinal
+        FROM walk w
+        JOIN kv_store kv ON kv.tenant_id = p_tenant_id AND kv.entity_key = w.entity_key
+        CROSS JOIN LATERAL (
+            SELECT a.edge->>'dst' AS dst,
+                   a.edge->>'rel_type' AS rel_type,
+                   CASE WHEN jsonb_typeof(a.edge->'weight') = 'number'
+                        THEN (a.edge->>'weight')::DOUBLE PRECISION END AS weight,
+                   a.ordinal
+            FROM jsonb_array_elements(
+                     CASE WHEN jsonb_typeof(kv.graph_edges) = 'array' THEN kv.graph_edges END
+                 ) WITH ORDINALITY AS a(edge, ordinal)
+            WHERE jsonb_typeof(a.edge->'dst') = 'string'
+              AND a.edge->>'dst' <> ALL(w.path)
+              AND (p_rel_types IS NULL OR a.edge->>'rel_type' = ANY(p_rel_types))
+            ORDER BY a.ordinal
+            LIMIT p_max_fanout
+        ) e
+        WHERE w.depth < p_max_depth
+    ),
+    nodes AS (
+        SELECT DISTINCT ON (w.entity_key) w.*
+        FROM walk w
+        ORDER BY w.entity_key, w.depth, w.edge_path
+    )
+    SELECT n.depth, n.entity_key, kv.entity_id IS NOT NULL, kv.entity_type, kv.entity_id,
+           n.via_key, n.rel_type, n.weight, n.path
+    FROM nodes n
+    LEFT JOIN kv_store kv ON kv.tenant_id = p_tenant_id AND kv.entity_key = n.entity_key
+    ORDER BY n.depth, n.edge_path
+    LIMIT p_max_nodes;
+$$ LANGUAGE sql STABLE;
+
+-- ============================================================================
+-- RECORD MIGRATION
+-- ============================================================================
+
+INSERT INTO rem_migrations (name, type, version)
+VALUES ('graph_traverse.sql', 'models', '1.0.0')
+ON CONFLICT (name) DO UPDATE
+SET applied_at = CURRENT_TIMESTAMP,
+    applied_by = CURRENT_USER;
+
+-- ============================================================================
+-- ROLLBACK
+-- ============================================================================
+--
+-- DROP FUNCTION IF EXISTS rem_traverse(VARCHAR, VARCHAR, INTEGER, TEXT[], INTEGER, INTEGER);
+-- DELETE FROM rem_migrations WHERE name = 'graph_traverse.sql';
@@ -0,0 +1,69 @@
+-- REM embedding dedup and cache (011_embedding_cache.sql)
+--
+-- embeddings_<table> rows are unique on (entity_id, field_name, provider)
+-- but do not record what text they were computed from, so every reload
+-- re-embeds unchanged content. This migration adds:
+--
+-- 1. content_hash on the nine embeddings tables: hex sha256 of the UTF-8
+--    text the vector was computed from
+-- 2. embedding_cache: vectors shared across entities and tenants, keyed by
+--    (model, content_hash)
+--
+-- Ingestion (scripts/embedding_cache.py) skips rows whose content_hash is
+-- unchanged, takes vectors for new text from the cache when it can, and
+-- only calls the provider for text it has never embedded with that model.
+-- Rows written before this migration have a NULL content_hash and are
+-- embedded once more.
+
+-- ============================================================================
+-- PREREQUISITES CHECK
+-- ============================================================================
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM rem_migrations WHERE name = 'install_models.sql') THEN
+        RAISE EXCEPTION 'Model schema not found. Run migrations/002_install_models.sql first.';
+    END IF;
+
+    RAISE NOTICE 'Prerequisites check passed';
+END $$;
+
+-- ============================================================================
+-- CONTENT HASHES
+-- ============================================================================
+
+DO $$
+DECLARE
+    embeddings_table TEXT;
+BEGIN
+    FOREACH embeddings_table IN ARRAY ARRAY[
+        'embeddings_files', 'embeddings_image_resources', 'embeddings_messages',
+        'embeddings_moments', 'embeddings_ontology_configs', 'embeddings_resources',
+        'embeddings_schemas', 'embeddings_sessions', 'embeddings_users'
+    ] LOOP
+        EXECUTE format('ALTER TABLE %I ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)', embeddings_table);
+    END LOOP;
+END $$;
+
+-- ============================================================================
+-- EMBEDDING CACHE
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS embedding_cache (
+    model VARCHAR(100) NOT NULL,
+    content_hash VARCHAR(64) NOT NULL,
+    provider VARCHAR(50) NOT NULL,
+    embedding vector(1536) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (model, content_hash)
+);
+
+-- ============================================================================
+-- RECORD MIGRATION
+-- ============================================================================
+
+INSERT INTO rem_migrations (name, type, version)
+VALUES ('embedding_cache.sql', 'models', '1.0.0')
+ON CONFLICT (name) DO UPDATE
+SET applied_at = CURRENT_TIMESTAMP,
+    applied_by = CURRENT_USER;
@@ -0,0 +1,129 @@
+-- Reduced-precision HNSW indexes (optional, requires pgvector 0.7+)
+-- Run AFTER initial data load to avoid blocking writes
+--
+-- Two expression indexes per embeddings table, used by
+-- rem_search_embeddings_quantized() (007_embeddings_quantized_search.sql):
+--
+-- - halfvec: embedding::halfvec(1536), 2 bytes per dimension (~2x smaller
+--   than the float32 index from background_indexes.sql)
+-- - binary:  binary_quantize(embedding)::bit(1536), 1 bit per dimension
+--   (~30x smaller vectors), searched by Hamming distance and re-ranked
+--   against the full vectors in the table
+--
+-- Nothing extra is stored in the tables: the reduced copies live only in
+-- the indexes. Build the ones you search with; a table searched only
+-- through the two-stage binary search can drop its float32 HNSW index.
+--
+--   python scripts/build_indexes.py --sql-file src/rem/sql/quantized_indexes.sql
+--
+-- Build memory and parallelism come from the server settings or the
+-- --maintenance-work-mem / --parallel-workers flags (see
+-- background_indexes.sql).
+
+-- Binary-quantized HNSW index for embeddings_resources
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_resources_binary_hnsw
+ON embeddings_resources
+USING hnsw ((binary_quantize(embedding)::bit(1536)) bit_hamming_ops)
+WITH (m = 24, ef_construction = 128);
+
+-- halfvec HNSW index for embeddings_resources
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_resources_halfvec_hnsw
+ON embeddings_resources
+USING hnsw ((embedding::halfvec(1536)) halfvec_cosine_ops)
+WITH (m = 24, ef_construction = 128);
+
+-- Binary-quantized HNSW index for embeddings_moments
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_moments_binary_hnsw
+ON embeddings_moments
+USING hnsw ((binary_quantize(embedding)::bit(1536)) bit_hamming_ops)
+WITH (m = 16, ef_construction = 100);
+
+-- halfvec HNSW index for embeddings_moments
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_moments_halfvec_hnsw
+ON embeddings_moments
+USING hnsw ((embedding::halfvec(1536)) halfvec_cosine_ops)
+WITH (m = 16, ef_construction = 100);
+
+-- Binary-quantized HNSW index for embeddings_messages
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_messages_binary_hnsw
+ON embeddings_messages
+USING hnsw ((binary_quantize(embedding)::bit(1536)) bit_hamming_ops)
+WITH (m = 16, ef_construction = 100);
+
+-- halfvec HNSW index for embeddings_messages
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_messages_halfvec_hnsw
+ON embeddings_messages
+USING hnsw ((embedding::halfvec(1536)) halfvec_cosine_ops)
+WITH (m = 16, ef_construction = 100);
+
+-- Binary-quantized HNSW index for embeddings_sessions
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_sessions_binary_hnsw
+ON embeddings_sessions
+USING hnsw ((binary_quantize(embedding)::bit(1536)) bit_hamming_ops)
+WITH (m = 16, ef_construction = 64);
+
+-- halfvec HNSW index for embeddings_sessions
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_sessions_halfvec_hnsw
+ON embeddings_sessions
+USING hnsw ((embedding::halfvec(1536)) halfvec_cosine_ops)
+WITH (m = 16, ef_construction = 64);
+
+-- Binary-quantized HNSW index for embeddings_files
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_files_binary_hnsw
+ON embeddings_files
+USING hnsw ((binary_quantize(embedding)::bit(1536)) bit_hamming_ops)
+WITH (m = 16, ef_construction = 64);
+
+-- halfvec HNSW index for embeddings_files
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_files_halfvec_hnsw
+ON embeddings_files
+USING hnsw ((embedding::halfvec(1536)) halfvec_cosine_ops)
+WITH (m = 16, ef_construction = 64);
+
+-- Binary-quantized HNSW index for embeddings_image_resources
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_image_resources_binary_hnsw
+ON embeddings_image_resources
+USING hnsw ((binary_quantize(embedding)::bit(1536)) bit_hamming_ops)
+WITH (m = 16, ef_construction = 64);
+
+-- halfvec HNSW index for embeddings_image_resources
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_image_resources_halfvec_hnsw
+ON embeddings_image_resources
+USING hnsw ((embedding::halfvec(1536)) halfvec_cosine_ops)
+WITH (m = 16, ef_construction = 64);
+
+-- Binary-quantized HNSW index for embeddings_ontology_configs
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_ontology_configs_binary_hnsw
+ON embeddings_ontology_configs
+USING hnsw ((binary_quantize(embedding)::bit(1536)) bit_hamming_ops)
+WITH (m = 16, ef_construction = 64);
+
+-- halfvec HNSW index for embeddings_ontology_configs
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_ontology_configs_halfvec_hnsw
+ON embeddings_ontology_configs
+USING hnsw ((embedding::halfvec(1536)) halfvec_cosine_ops)
+WITH (m = 16, ef_construction = 64);
+
+-- Binary-quantized HNSW index for embeddings_schemas
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_schemas_binary_hnsw
+ON embeddings_schemas
+USING hnsw ((binary_quantize(embedding)::bit(1536)) bit_hamming_ops)
+WITH (m = 16, ef_construction = 64);
+
+-- halfvec HNSW index for embeddings_schemas
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_schemas_halfvec_hnsw
+ON embeddings_schemas
+USING hnsw ((embedding::halfvec(1536)) halfvec_cosine_ops)
+WITH (m = 16, ef_construction = 64);
+
+-- Binary-quantized HNSW index for embeddings_users
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_users_binary_hnsw
+ON embeddings_users
+USING hnsw ((binary_quantize(embedding)::bit(1536)) bit_hamming_ops)
+WITH (m = 16, ef_construction = 64);
+
+-- halfvec HNSW index for embeddings_users
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_users_halfvec_hnsw
+ON embeddings_users
+USING hnsw ((embedding::halfvec(1536)) halfvec_cosine_ops)
+WITH (m = 16, ef_construction = 64);
@@ -0,0 +1,93 @@
+"""iter_row_batches must yield the same rows as yaml.safe_load, whatever the block layout."""
+
+import sys
+from pathlib import Path
+
+import pytest
+import yaml
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'scripts'))
+
+from bulk_load import iter_row_batches  # noqa: E402
+
+LAYOUTS = {
+    'block': """
+- table: resources
+  rows:
+  - name: a
+    tags:
+    - x
+  - name: b
+""",
+    'flow': """
+- table: resources
+  rows: [{name: a}, {name: b}]
+- table: moments
+  rows: [
+    {name: c},
+  ]
+""",
+    'rows_before_table': """
+- rows:
+  - name: c
+  - name: d
+  table: moments
+- table: resources
+  rows:
+  - name: e
+""",
+    'indentless_rows': """
+# comment
+- table: resources
+
+  rows:
+    - name: a
+      # nested comment
+    - name: b
+  description: after the rows
+""",
+    'empty_rows': """
+- table: resources
+  rows: []
+- table: moments
+  rows:
+""",
+}
+
+
+def expected(text: str) -> list[tuple[str, dict]]:
+    return [(block['table'], row) for block in yaml.safe_load(text) or [] for row in block.get('rows') or []]
+
+
+def streamed(path: Path, batch_rows: int) -> list[tuple[str, dict]]:
+    return [(table, row) for table, rows in iter_row_batches(path, batch_rows) for row in rows]
+
+
+@pytest.mark.parametrize('batch_rows', [1, 2, 1000])
+@pytest.mark.parametrize('layout', LAYOUTS)
+def test_layouts_match_safe_load(tmp_path, layout, batch_rows):
+    path = tmp_path / f'{layout}.yaml'
+    path.write_text(LAYOUTS[layout])
+    assert streamed(path, batch_rows) == expected(LAYOUTS[layout])
+
+
+@pytest.mark.parametrize('path', sorted(ROOT.glob('datasets/**/*.yaml')), ids=lambda p: p.name)
+def test_datasets_match_safe_load(path):
+    text = path.read_text()
+    blocks = yaml.safe_load(text)
+    if not isinstance(blocks, list) or not all(isinstance(b, dict) and 'table' in b for b in blocks):
+        pytest.skip('not a {table, rows} dataset')
+    assert streamed(path, 7) == expected(text)
+
+
+@pytest.mark.parametrize('text', [
+    "- rows:\n  - name: a\n",
+    "- table: resources\n  rows:\n  - name: a\n- rows: [{name: b}]\n",
+    "[{rows: [{name: a}]}]\n",
+])
+def test_block_without_table_is_an_error(tmp_path, text):
+    path = tmp_path / 'data.yaml'
+    path.write_text(text)
+    with pytest.raises(ValueError, match='without a table'):
+        list(iter_row_batches(path))
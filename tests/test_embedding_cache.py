@@ -0,0 +1,100 @@
+"""embed_rows must skip unchanged text and re-embed changed text, against a stub connection."""
+
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip('psycopg')
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'scripts'))
+
+from embedding_cache import FakeEmbeddingProvider, content_hash, embed_rows  # noqa: E402
+
+
+class StubConnection:
+    """In-memory embeddings_<table> and embedding_cache for the four statements embed_rows runs."""
+
+    def __init__(self):
+        self.embeddings = {}  # (entity_id, field_name, provider) -> (model, vector, content_hash)
+        self.cache = {}       # (model, content_hash) -> vector
+        self.vector_writes = 0
+
+    def cursor(self):
+        return StubCursor(self)
+
+
+class StubCursor:
+    def __init__(self, conn: StubConnection):
+        self.conn = conn
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params):
+        query = query if isinstance(query, str) else query.as_string(None)
+        if 'FROM embedding_cache' in query:
+            model, digests = params
+            self.rows = [(d, self.conn.cache[model, d]) for d in digests if (model, d) in self.conn.cache]
+        else:
+            provider, model, entity_ids = params
+            self.rows = [
+                (entity_id, field_name, stored_hash)
+                for (entity_id, field_name, stored_provider), (stored_model, _, stored_hash)
+                in self.conn.embeddings.items()
+                if stored_provider == provider and stored_model == model and entity_id in entity_ids
+            ]
+
+    def executemany(self, query, params_seq):
+        query = query if isinstance(query, str) else query.as_string(None)
+        for params in params_seq:
+            if 'INTO embedding_cache' in query:
+                model, digest, _, vector = params
+                self.conn.cache.setdefault((model, digest), vector)
+            else:
+                entity_id, field_name, provider, model, vector, digest = params
+                self.conn.embeddings[entity_id, field_name, provider] = (model, vector, digest)
+                self.conn.vector_writes += 1
+
+    def fetchall(self):
+        return self.rows
+
+
+def rows(texts: list[str]) -> list[tuple]:
+    return [(str(uuid.uuid5(uuid.NAMESPACE_URL, f'resource-{i}')), 'content', text) for i, text in enumerate(texts)]
+
+
+def test_second_pass_skips_unchanged_text():
+    conn, provider = StubConnection(), FakeEmbeddingProvider(dimensions=8)
+    texts = rows(['alpha', 'beta', 'alpha', 'gamma'])
+
+    first = embed_rows(conn, 'resources', texts, provider)
+    assert (first.embedded, first.written) == (3, 4)  # 'alpha' is embedded once
+    calls, writes = provider.calls, conn.vector_writes
+
+    second = embed_rows(conn, 'resources', texts, provider)
+    assert (second.unchanged, second.embedded, second.written) == (4, 0, 0)
+    assert provider.calls == calls
+    assert conn.vector_writes == writes
+
+
+def test_changed_text_is_re_embedded():
+    conn, provider = StubConnection(), FakeEmbeddingProvider(dimensions=8)
+    embed_rows(conn, 'resources', rows(['alpha', 'beta', 'gamma']), provider)
+    texts_before = provider.texts
+
+    # Unchanged, edited, and changed to text that is already in the cache
+    stats = embed_rows(conn, 'resources', rows(['alpha', 'beta (edited)', 'alpha']), provider)
+    assert (stats.unchanged, stats.cache_hits, stats.embedded, stats.written) == (1, 1, 1, 2)
+    assert provider.texts == texts_before + 1
+
+    entity_id = rows(['', 'beta (edited)'])[1][0]
+    _, vector, _ = conn.embeddings[entity_id, 'content', 'fake']
+    assert vector == conn.cache['fake-embedding', content_hash('beta (edited)')]
+
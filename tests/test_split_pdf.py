@@ -0,0 +1,39 @@
+"""Serial and parallel split_pdf.py runs must write the same _toc.md, whatever the library."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pymupdf = pytest.importorskip('pymupdf')
+
+ROOT = Path(__file__).resolve().parent.parent
+SPLIT_PDF = ROOT / 'scripts' / 'split_pdf.py'
+
+
+@pytest.fixture
+def pdf_with_toc(tmp_path) -> Path:
+    path = tmp_path / 'book.pdf'
+    doc = pymupdf.open()
+    for number in range(1, 7):
+        doc.new_page().insert_text((72, 72), f"Page {number}")
+    doc.set_toc([[1, 'Part One', 1], [2, 'Chapter 1', 2], [2, 'Chapter 2', 4], [1, 'Part Two', 5]])
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def split(pdf: Path, output_dir: Path, *options: str) -> str:
+    subprocess.run([sys.executable, str(SPLIT_PDF), str(pdf), '--output-dir', str(output_dir), *options],
+                   check=True, capture_output=True)
+    return (output_dir / '_toc.md').read_text()
+
+
+@pytest.mark.parametrize('library', ['pymupdf', 'pypdf', 'pdfplumber'])
+def test_serial_and_parallel_toc_match(tmp_path, pdf_with_toc, library):
+    pytest.importorskip(library)
+    serial = split(pdf_with_toc, tmp_path / 'serial', '--library', library, '--workers', '1')
+    parallel = split(pdf_with_toc, tmp_path / 'parallel', '--library', library, '--workers', '2')
+    assert serial == parallel
+    assert '- [Chapter 2](page_0004.md) (page 4)' in serial